@@ -1,6 +1,7 @@
 """AST-based code chunking using tree-sitter"""
 import logging
 import os
+import re
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 from pathlib import Path
@@ -23,6 +24,32 @@ class CodeChunk:
     class_name: Optional[str] = None
     imports: List[str] = None
     context: Optional[str] = None  # surrounding context
+    signature: Optional[str] = None  # declaration header and doc comment of a definition
+
+
+@dataclass
+class FileReferences:
+    """Definitions, imports and calls of a file, for the code graph"""
+    file_path: str
+    language: str
+    imports: List[str]  # import statements as written
+    definitions: List[Tuple[str, str, int, int]]  # (qualified name, kind, start line, end line)
+    calls: List[Tuple[str, str, int]]  # (qualified caller or '<module>', callee name, line)
+
+
+CALLEE_NAME_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+# Longest one-line preview stored with a chunk
+PREVIEW_LENGTH = 120
+
+
+def preview_line(code: str, max_length: int = PREVIEW_LENGTH) -> str:
+    """First non-blank line of a chunk, shortened"""
+    for line in code.splitlines():
+        line = line.strip()
+        if line:
+            return line if len(line) <= max_length else line[:max_length] + "..."
+    return ""
 
 
 class CodeChunker:
@@ -89,6 +116,28 @@ class CodeChunker:
         'swift': ['class_declaration', 'struct_declaration', 'protocol_declaration'],
     }
     
+    # Call expressions and the field holding the called name
+    CALL_NODES = {
+        'python': {'call': 'function'},
+        'javascript': {'call_expression': 'function', 'new_expression': 'constructor'},
+        'typescript': {'call_expression': 'function', 'new_expression': 'constructor'},
+        'tsx': {'call_expression': 'function', 'new_expression': 'constructor'},
+        'java': {'method_invocation': 'name', 'object_creation_expression': 'type'},
+        'cpp': {'call_expression': 'function'},
+        'c': {'call_expression': 'function'},
+        'c_sharp': {'invocation_expression': 'function', 'object_creation_expression': 'type'},
+        'go': {'call_expression': 'function'},
+        'rust': {'call_expression': 'function'},
+        'ruby': {'call': 'method'},
+        'php': {'function_call_expression': 'function', 'member_call_expression': 'name'},
+        'swift': {'call_expression': None},
+        'kotlin': {'call_expression': None},
+        'scala': {'call_expression': 'function'},
+    }
+    
+    # Longest signature (header plus doc comment) kept for signature vectors
+    MAX_SIGNATURE_CHARS = 500
+    
     def __init__(self, max_chunk_size: int = 1000, min_chunk_size: int = 50):
         self.max_chunk_size = max_chunk_size
         self.min_chunk_size = min_chunk_size
@@ -114,22 +163,60 @@ class CodeChunker:
     
     def chunk_file(self, file_path: str, content: str) -> List[CodeChunk]:
         """Chunk a file into semantic code blocks"""
+        chunks, _ = self.chunk_file_with_references(file_path, content)
+        return chunks
+    
+    def chunk_file_with_references(
+        self,
+        file_path: str,
+        content: str
+    ) -> Tuple[List[CodeChunk], Optional[FileReferences]]:
+        """Chunk a file and extract its code graph references from the same parse
+        
+        References are None for files chunked by lines.
+        """
         language = self.get_language_from_file(file_path)
         
         if not language or language not in self.parsers:
             # Fallback to line-based chunking for unsupported languages
-            return self._chunk_by_lines(file_path, content, language or 'text')
+            return self._chunk_by_lines(file_path, content, language or 'text'), None
         
         try:
-            return self._chunk_with_ast(file_path, content, language)
+            tree = self.parsers[language].parse(content.encode())
+            chunks = self._chunk_with_ast(file_path, content, language, tree)
         except Exception as e:
             logger.warning(f"AST chunking failed for {file_path}: {str(e)}, falling back to line chunking")
-            return self._chunk_by_lines(file_path, content, language)
+            return self._chunk_by_lines(file_path, content, language), None
+        
+        try:
+            references = self._extract_references(tree.root_node, file_path, content, language)
+        except Exception as e:
+            logger.warning(f"Reference extraction failed for {file_path}: {str(e)}")
+            references = None
+        return chunks, references
     
-    def _chunk_with_ast(self, file_path: str, content: str, language: str) -> List[CodeChunk]:
+    def extract_references(self, file_path: str, content: str) -> Optional[FileReferences]:
+        """Extract code graph references of a file without chunking it"""
+        language = self.get_language_from_file(file_path)
+        if not language or language not in self.parsers:
+            return None
+        try:
+            tree = self.parsers[language].parse(content.encode())
+            return self._extract_references(tree.root_node, file_path, content, language)
+        except Exception as e:
+            logger.warning(f"Reference extraction failed for {file_path}: {str(e)}")
+            return None
+    
+    def _chunk_with_ast(
+        self,
+        file_path: str,
+        content: str,
+        language: str,
+        tree: Optional[ts.Tree] = None
+    ) -> List[CodeChunk]:
         """Chunk code using AST analysis"""
-        parser = self.parsers[language]
-        tree = parser.parse(content.encode())
+        if tree is None:
+            tree = self.parsers[language].parse(content.encode())
         lines = content.split('\n')
         
         chunks = []
@@ -232,9 +319,32 @@ class CodeChunker:
             language=language,
             chunk_type=chunk_type,
             function_name=name,
-            imports=imports
+            imports=imports,
+            signature=self._extract_signature(node, content)
         )
     
+    def _extract_signature(self, node: ts.Node, content: str) -> Optional[str]:
+        """Declaration header of a definition plus its docstring or preceding doc comment"""
+        body = node.child_by_field_name('body')
+        header = content[node.start_byte:body.start_byte if body else node.end_byte].strip()
+        if not header:
+            return None
+        
+        doc = None
+        first_statement = body.named_children[0] if body is not None and body.named_children else None
+        if first_statement is not None and first_statement.type == 'expression_statement' \
+                and first_statement.named_children and first_statement.named_children[0].type == 'string':
+            doc = content[first_statement.start_byte:first_statement.end_byte]
+        else:
+            comments = []
+            sibling = node.prev_named_sibling
+            while sibling is not None and sibling.type == 'comment' and len(comments) < 10:
+                comments.append(content[sibling.start_byte:sibling.end_byte])
+                sibling = sibling.prev_named_sibling
+            doc = "\n".join(reversed(comments)) or None
+        
+        return "\n".join(part for part in (header, doc) if part)[:self.MAX_SIGNATURE_CHARS]
+    
     def _extract_name_from_node(self, node: ts.Node, content: str) -> Optional[str]:
         """Extract function or class name from AST node"""
         # Look for identifier nodes that represent names
@@ -285,6 +395,49 @@ class CodeChunker:
         
         return imports
     
+    def _extract_references(
+        self,
+        root_node: ts.Node,
+        file_path: str,
+        content: str,
+        language: str
+    ) -> FileReferences:
+        """Extract definitions and call sites, attributing each call to its innermost definition"""
+        function_types = self.FUNCTION_NODES.get(language, [])
+        class_types = self.CLASS_NODES.get(language, [])
+        call_nodes = self.CALL_NODES.get(language, {})
+        
+        definitions = []
+        calls = []
+        
+        def traverse(node: ts.Node, scope: List[str], caller: str):
+            if node.type in class_types or node.type in function_types:
+                name = self._extract_name_from_node(node, content)
+                if name:
+                    scope = scope + [name]
+                    kind = 'class' if node.type in class_types else ('method' if len(scope) > 1 else 'function')
+                    caller = ".".join(scope)
+                    definitions.append((caller, kind, node.start_point[0] + 1, node.end_point[0] + 1))
+            elif node.type in call_nodes:
+                field = call_nodes[node.type]
+                target = node.child_by_field_name(field) if field else None
+                target = target or (node.children[0] if node.children else None)
+                if target is not None:
+                    names = CALLEE_NAME_PATTERN.findall(content[target.start_byte:target.end_byte])
+                    if names:
+                        calls.append((caller, names[-1], node.start_point[0] + 1))
+            for child in node.children:
+                traverse(child, scope, caller)
+        
+        traverse(root_node, [], '<module>')
+        return FileReferences(
+            file_path=file_path,
+            language=language,
+            imports=self._extract_imports(root_node, content, language),
+            definitions=definitions,
+            calls=calls
+        )
+    
     def _is_within_any_node(self, target_node: ts.Node, container_nodes: List[ts.Node]) -> bool:
         """Check if target node is within any of the container nodes"""
         for container in container_nodes:
@@ -324,7 +477,8 @@ class CodeChunker:
             language=language,
             chunk_type=chunk_type + '_partial',
             function_name=name,
-            imports=imports
+            imports=imports,
+            signature=self._extract_signature(node, content)
         )
     
     def _chunk_uncovered_lines(
@@ -0,0 +1,323 @@
+"""Persistent import and call graph for navigating related code without vector search"""
+import json
+import logging
+import os
+import posixpath
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from code_chunker import FileReferences
+
+logger = logging.getLogger(__name__)
+
+QUOTED_MODULE_PATTERN = re.compile(r"""["'`]([^"'`\s]+)["'`]""")
+PYTHON_FROM_PATTERN = re.compile(r"from\s+(\.*)([\w.]*)\s+import\s+\(?([\w\s,.*]+)", re.S)
+PYTHON_IMPORT_PATTERN = re.compile(r"import\s+([\w\s,.]+)")
+JAVA_IMPORT_PATTERN = re.compile(r"import\s+(?:static\s+)?([\w.]+)")
+RUST_USE_PATTERN = re.compile(r"use\s+([\w:]+)")
+
+# File stems that stand for their directory as a module
+PACKAGE_STEMS = ("__init__", "index", "mod")
+
+
+def module_keys(file_path: str, language: Optional[str] = None) -> List[str]:
+    """Dotted module names a file can be imported by, longest first
+    
+    ``src/auth/service.py`` is ``src.auth.service``, ``auth.service`` and
+    ``service``, so imports resolve whatever source root they are written
+    against. Package files (``__init__``, ``index``, ``mod``) and Go files
+    also answer for their directory.
+    """
+    stem_path = posixpath.splitext(file_path.replace(os.sep, "/"))[0]
+    parts = [part for part in stem_path.split("/") if part and part != "."]
+    paths = [parts]
+    if parts and (parts[-1] in PACKAGE_STEMS or language == "go"):
+        paths.append(parts[:-1])
+    keys = []
+    for path_parts in paths:
+        keys.extend(".".join(path_parts[i:]) for i in range(len(path_parts)))
+    return [key for key in dict.fromkeys(keys) if key]
+
+
+def _resolve_relative(file_path: str, target: str) -> str:
+    """Resolve a ``./``-style import against the importing file's directory"""
+    directory = posixpath.dirname(file_path.replace(os.sep, "/"))
+    resolved = posixpath.normpath(posixpath.join(directory, target))
+    return posixpath.splitext(resolved)[0].lstrip("./").replace("/", ".")
+
+
+def import_keys(file_path: str, language: str, statements: Iterable[str]) -> List[str]:
+    """Dotted module names imported by a file's import statements"""
+    keys: List[str] = []
+    package = posixpath.dirname(file_path.replace(os.sep, "/")).split("/")
+    for statement in statements:
+        if language == "python":
+            match = PYTHON_FROM_PATTERN.match(statement)
+            if match:
+                dots, module, names = match.groups()
+                if dots:
+                    base = package[:len(package) - (len(dots) - 1)] if len(dots) > 1 else package
+                    module = ".".join([part for part in base if part] + ([module] if module else []))
+                if module:
+                    keys.append(module)
+                # ``from pkg import mod`` may name a submodule
+                for name in re.split(r"[\s,]+", names):
+                    name = name.split(" as ")[0].strip("() ")
+                    if name and name != "*" and name != "as":
+                        keys.append(f"{module}.{name}" if module else name)
+                continue
+            match = PYTHON_IMPORT_PATTERN.match(statement)
+            if match:
+                keys.extend(
+                    part.split(" as ")[0].strip()
+                    for part in match.group(1).split(",") if part.strip()
+                )
+        elif language == "java":
+            match = JAVA_IMPORT_PATTERN.match(statement)
+            if match:
+                keys.append(match.group(1))
+        elif language == "rust":
+            match = RUST_USE_PATTERN.match(statement)
+            if match:
+                parts = [part for part in match.group(1).split("::") if part not in ("crate", "self", "super", "")]
+                keys.append(".".join(parts))
+        else:
+            for target in QUOTED_MODULE_PATTERN.findall(statement):
+                if target.startswith("."):
+                    keys.append(_resolve_relative(file_path, target))
+                else:
+                    keys.append(posixpath.splitext(target)[0].replace("/", "."))
+    return [key for key in dict.fromkeys(keys) if key]
+
+
+class CodeGraph:
+    """On-disk import and call graph of an index
+    
+    Each file records the modules it imports, the definitions it holds and
+    its call sites as (caller, callee name, line). Reverse adjacency maps
+    (module key to importing files and to defining files, callee name to
+    call sites, definition name to definitions) are built in memory on
+    first lookup, so every lookup touches only the edges it returns. Calls
+    are resolved by name: a call to ``save`` is an edge to every definition
+    called ``save``.
+    """
+    
+    VERSION = 1
+    
+    # Loaded graphs, keyed by file path and invalidated by modification time
+    _loaded: Dict[str, Tuple[float, "CodeGraph"]] = {}
+    
+    def __init__(self, index_name: str):
+        self.index_name = index_name
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._importers: Dict[str, Set[str]] = {}
+        self._modules: Dict[str, Set[str]] = {}
+        self._call_sites: Dict[str, List[Tuple[str, str, int]]] = {}
+        self._definitions: Dict[str, List[Tuple[str, str, str, int, int]]] = {}
+        self._current = False
+    
+    def __len__(self) -> int:
+        return len(self.files)
+    
+    @staticmethod
+    def path_for(state_dir: str, index_name: str) -> str:
+        """Get the graph file path for an index"""
+        return os.path.join(os.path.expanduser(state_dir), f"{index_name}.graph.json")
+    
+    def add_file(self, references: FileReferences) -> None:
+        """Record the imports, definitions and calls of a file, replacing any earlier version"""
+        self.files[references.file_path] = {
+            "language": references.language,
+            "imports": import_keys(references.file_path, references.language, references.imports),
+            "definitions": [list(definition) for definition in references.definitions],
+            "calls": [list(call) for call in references.calls],
+        }
+        self._current = False
+    
+    def remove_files(self, file_paths: Iterable[str]) -> None:
+        """Drop every edge from the given files"""
+        for file_path in file_paths:
+            if self.files.pop(file_path, None) is not None:
+                self._current = False
+    
+    def _ensure_adjacency(self) -> None:
+        """Build the reverse adjacency maps after files changed"""
+        if self._current:
+            return
+        self._importers, self._modules, self._call_sites, self._definitions = {}, {}, {}, {}
+        for file_path, record in self.files.items():
+            for key in module_keys(file_path, record["language"]):
+                self._modules.setdefault(key, set()).add(file_path)
+            for key in record["imports"]:
+                self._importers.setdefault(key, set()).add(file_path)
+            for caller, callee, line in record["calls"]:
+                self._call_sites.setdefault(callee, []).append((file_path, caller, line))
+            for qualified, kind, start_line, end_line in record["definitions"]:
+                definition = (file_path, qualified, kind, start_line, end_line)
+                self._definitions.setdefault(qualified.rsplit(".", 1)[-1], []).append(definition)
+        self._current = True
+    
+    def definitions(self, name: str) -> List[Tuple[str, str, str, int, int]]:
+        """Definitions matching a name or ``Class.method``, as (file, qualified name, kind, start, end)"""
+        self._ensure_adjacency()
+        candidates = self._definitions.get(name.rsplit(".", 1)[-1], [])
+        if "." in name:
+            candidates = [
+                definition for definition in candidates
+                if definition[1] == name or definition[1].endswith(f".{name}")
+            ]
+        return candidates
+    
+    def callers_of(self, name: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Call sites of a function or method name"""
+        self._ensure_adjacency()
+        results = []
+        for file_path, caller, line in self._call_sites.get(name.rsplit(".", 1)[-1], []):
+            results.append({
+                "index_name": self.index_name,
+                "file_path": file_path,
+                "caller": caller,
+                "line": line,
+            })
+            if len(results) >= limit:
+                break
+        return results
+    
+    def callees_of(self, name: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Names called from a definition, with where each is defined in the index"""
+        results = []
+        seen: Set[Tuple[str, str]] = set()
+        for file_path, qualified, _, _, _ in self.definitions(name):
+            for caller, callee, line in self.files[file_path]["calls"]:
+                if caller != qualified and not caller.startswith(f"{qualified}."):
+                    continue
+                if (qualified, callee) in seen:
+                    continue
+                seen.add((qualified, callee))
+                results.append({
+                    "index_name": self.index_name,
+                    "caller": qualified,
+                    "callee": callee,
+                    "file_path": file_path,
+                    "line": line,
+                    "defined_in": [
+                        {"file_path": target[0], "name": target[1], "kind": target[2], "start_line": target[3]}
+                        for target in self._definitions.get(callee, [])
+                    ],
+                })
+                if len(results) >= limit:
+                    return results
+        return results
+    
+    def _files_for(self, target: str) -> List[str]:
+        """Indexed files a path or dotted module name refers to"""
+        self._ensure_adjacency()
+        if target in self.files:
+            return [target]
+        key = posixpath.splitext(target)[0].replace("/", ".") if "/" in target else target
+        return sorted(self._modules.get(key, ()))
+    
+    def dependents_of(self, target: str, depth: int = 1, limit: int = 100) -> List[Dict[str, Any]]:
+        """Files importing a file or module, following imports up to ``depth`` hops"""
+        self._ensure_adjacency()
+        frontier = deque((file_path, 0) for file_path in self._files_for(target))
+        seen = {file_path for file_path, _ in frontier}
+        results = []
+        while frontier and len(results) < limit:
+            file_path, distance = frontier.popleft()
+            if distance >= depth:
+                continue
+            for key in module_keys(file_path, self.files[file_path]["language"]):
+                for importer in sorted(self._importers.get(key, ())):
+                    if importer in seen:
+                        continue
+                    seen.add(importer)
+                    results.append({
+                        "index_name": self.index_name,
+                        "file_path": importer,
+                        "depth": distance + 1,
+                        "imports": file_path,
+                        "via": key,
+                    })
+                    frontier.append((importer, distance + 1))
+        return results[:limit]
+    
+    def neighbours(self, file_path: str, function_name: Optional[str] = None) -> Dict[str, str]:
+        """Files adjacent to a file or function, mapped to how they relate"""
+        self._ensure_adjacency()
+        related: Dict[str, str] = {}
+        record = self.files.get(file_path)
+        if record is None:
+            return related
+        if function_name:
+            for result in self.callers_of(function_name):
+                related.setdefault(result["file_path"], "caller")
+            for result in self.callees_of(function_name):
+                for target in result["defined_in"]:
+                    related.setdefault(target["file_path"], "callee")
+        for result in self.dependents_of(file_path):
+            related.setdefault(result["file_path"], "dependent")
+        for key in record["imports"]:
+            for dependency in self._modules.get(key, ()):
+                related.setdefault(dependency, "dependency")
+        related.pop(file_path, None)
+        return related
+    
+    def save(self, state_dir: str) -> str:
+        """Atomically write the graph to the state directory"""
+        path = self.path_for(state_dir, self.index_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": self.VERSION,
+                "index_name": self.index_name,
+                "files": self.files,
+            }, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        self._loaded[path] = (os.path.getmtime(path), self)
+        return path
+    
+    @classmethod
+    def load(cls, state_dir: str, index_name: str) -> Optional["CodeGraph"]:
+        """Load the graph of an index, reusing the in-memory copy if unchanged"""
+        path = cls.path_for(state_dir, index_name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        cached = cls._loaded.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable code graph {path}: {str(e)}")
+            return None
+        if data.get("version") != cls.VERSION:
+            logger.info(f"Ignoring code graph {path} from an older version")
+            return None
+        
+        graph = cls(index_name)
+        graph.files = data["files"]
+        cls._loaded[path] = (mtime, graph)
+        return graph
+    
+    @classmethod
+    def list_indexes(cls, state_dir: str) -> List[str]:
+        """Names of all indexes with a code graph"""
+        state_dir = os.path.expanduser(state_dir)
+        if not os.path.isdir(state_dir):
+            return []
+        suffix = ".graph.json"
+        return sorted(name[:-len(suffix)] for name in os.listdir(state_dir) if name.endswith(suffix))
+    
+    @classmethod
+    def delete(cls, state_dir: str, index_name: str) -> None:
+        """Remove the graph of an index"""
+        path = cls.path_for(state_dir, index_name)
+        cls._loaded.pop(path, None)
+        if os.path.exists(path):
+            os.remove(path)
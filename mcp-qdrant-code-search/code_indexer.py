@@ -8,11 +8,19 @@ from pathlib import Path
 from typing import Dict, List, Optional, Any, Set
 import fnmatch
 import uuid
-from qdrant_client.models import PointStruct
+from qdrant_client.models import PointStruct, SparseVector
 from config import Config
 from qdrant_service import QdrantService
-from code_chunker import CodeChunker, CodeChunk
+from code_chunker import CodeChunker, CodeChunk, preview_line
+from code_graph import CodeGraph
+from duplicates import DuplicateJob
 from embeddings import EmbeddingService
+from file_summaries import FileSummaries
+from index_manifest import IndexManifest
+from symbol_index import SymbolIndex
+from index_snapshot import SnapshotWriter, iter_snapshot_points, read_snapshot_header
+from scheduler import RequestScheduler
+from sparse_vectors import SparseEncoder
 
 logger = logging.getLogger(__name__)
 
@@ -20,14 +28,24 @@ logger = logging.getLogger(__name__)
 class CodeIndexer:
     """Indexes codebases into Qdrant vector database"""
     
-    def __init__(self, config: Config, qdrant_service: QdrantService):
+    # Leading lines embedded as the signature of chunks that are not definitions
+    SIGNATURE_FALLBACK_LINES = 3
+    
+    def __init__(
+        self,
+        config: Config,
+        qdrant_service: QdrantService,
+        scheduler: Optional[RequestScheduler] = None
+    ):
         self.config = config
         self.qdrant = qdrant_service
+        self.scheduler = scheduler
         self.chunker = CodeChunker(
             max_chunk_size=config.chunk_size,
             min_chunk_size=50
         )
         self.embedding_service = EmbeddingService(config)
+        self.sparse_encoder = SparseEncoder()
         
         # Default file patterns to include
         self.default_include_patterns = [
@@ -77,7 +95,8 @@ class CodeIndexer:
         path: str,
         collection_name: Optional[str] = None,
         file_patterns: Optional[List[str]] = None,
-        exclude_patterns: Optional[List[str]] = None
+        exclude_patterns: Optional[List[str]] = None,
+        storage_profile: Optional[str] = None
     ) -> Dict[str, Any]:
         """Index a codebase into Qdrant"""
         start_time = time.time()
@@ -94,12 +113,10 @@ class CodeIndexer:
             collection_name = self.qdrant.get_collection_name_for_path(path)
         
         # Combine patterns
+        requested_patterns = (file_patterns, exclude_patterns)
         include_patterns = file_patterns or self.default_include_patterns
         exclude_patterns = (exclude_patterns or []) + self.default_exclude_patterns
         
-        # Create collection
-        await self.qdrant.create_collection_if_not_exists(collection_name)
-        
         # Discover files
         files_to_process = self._discover_files(path, include_patterns, exclude_patterns)
         logger.info(f"Found {len(files_to_process)} files to process")
@@ -113,31 +130,78 @@ class CodeIndexer:
                 "message": "No files found to process"
             }
         
+        # Build into a shadow generation so searches keep hitting the live index
+        # until the rebuild is complete. In the shared layout new points are
+        # tagged with the generation, which reads skip until it is made live.
+        generation = None
+        if self.qdrant.is_shared_layout:
+            target_collection, _ = self.qdrant.resolve_scope(collection_name)
+            await self.qdrant.create_collection_if_not_exists(target_collection, storage_profile)
+            generation = self.qdrant.begin_generation(collection_name)
+        else:
+            target_collection = await self.qdrant.create_generation(collection_name, storage_profile)
+        
         # Process files in batches
         total_chunks = 0
         processed_files = 0
+        failed_batches = 0
+        failed_files: List[str] = []
+        symbols = SymbolIndex(collection_name)
+        graph = CodeGraph(collection_name)
+        summaries = FileSummaries(collection_name)
         
         for i in range(0, len(files_to_process), self.config.batch_size):
             batch_files = files_to_process[i:i + self.config.batch_size]
             
             try:
-                batch_chunks = await self._process_file_batch(batch_files, path)
+                batch_chunks = await self._process_file_batch(batch_files, path, graph, failed_files)
                 if batch_chunks:
-                    await self._index_chunks(collection_name, batch_chunks)
-                    total_chunks += len(batch_chunks)
+                    total_chunks += await self._index_chunks(
+                        target_collection, batch_chunks, collection_name, generation, summaries
+                    )
+                    symbols.add_chunks(batch_chunks)
                 
                 processed_files += len(batch_files)
                 logger.info(f"Processed {processed_files}/{len(files_to_process)} files, {total_chunks} chunks total")
                 
             except Exception as e:
                 logger.error(f"Failed to process batch starting at index {i}: {str(e)}")
+                failed_batches += 1
                 continue
         
+        if failed_batches:
+            # Never replace a complete live index with an incomplete rebuild
+            if self.qdrant.is_shared_layout:
+                await self.qdrant.delete_repo_points(collection_name, generation=generation)
+                self.qdrant.finish_generation(collection_name, generation, live=False)
+            else:
+                await self.qdrant.delete_collection(target_collection)
+            raise RuntimeError(
+                f"{failed_batches} batch(es) failed while rebuilding '{collection_name}'; "
+                f"the live index was left unchanged"
+            )
+        
+        if self.qdrant.is_shared_layout:
+            self.qdrant.finish_generation(collection_name, generation)
+            await self.qdrant.delete_repo_points(collection_name, keep_generation=generation)
+        else:
+            await self.qdrant.switch_alias(collection_name, target_collection)
+            await self.qdrant.delete_old_generations(collection_name, keep=self.config.index_keep_generations)
+        
+        # Files that could not be chunked stay out of the manifest, so the next update retries them
+        failed_set = set(failed_files)
+        indexed_files = [file_path for file_path in files_to_process if file_path not in failed_set]
+        self._save_manifest(collection_name, path, indexed_files, *requested_patterns)
+        self._save_symbols(symbols)
+        self._save_graph(graph)
+        await self._replace_file_summaries(summaries)
+        
         end_time = time.time()
         
         result = {
             "collection_name": collection_name,
             "files_processed": processed_files,
+            "files_failed": len(failed_files),
             "chunks_created": total_chunks,
             "time_taken": end_time - start_time
         }
@@ -185,48 +249,72 @@ class CodeIndexer:
         
         return discovered_files
     
-    async def _process_file_batch(self, file_paths: List[str], root_path: str) -> List[CodeChunk]:
-        """Process a batch of files and return code chunks"""
+    async def _process_file_batch(
+        self,
+        file_paths: List[str],
+        root_path: str,
+        graph: Optional[CodeGraph] = None,
+        failed_files: Optional[List[str]] = None
+    ) -> List[CodeChunk]:
+        """Process a batch of files and return code chunks, recording their references in ``graph``
+        
+        Files that cannot be read or chunked are skipped and added to ``failed_files``.
+        """
         all_chunks = []
         
         for file_path in file_paths:
             try:
-                chunks = await self._process_single_file(file_path, root_path)
+                chunks = await self._process_single_file(file_path, root_path, graph)
                 all_chunks.extend(chunks)
             except Exception as e:
                 logger.warning(f"Failed to process file {file_path}: {str(e)}")
+                if failed_files is not None:
+                    failed_files.append(file_path)
                 continue
         
         return all_chunks
     
-    async def _process_single_file(self, file_path: str, root_path: str) -> List[CodeChunk]:
-        """Process a single file and return code chunks"""
-        try:
-            # Read file content
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            # Skip empty files
-            if not content.strip():
-                return []
-            
-            # Convert to relative path for storage
-            rel_path = os.path.relpath(file_path, root_path)
-            
-            # Chunk the file
-            chunks = self.chunker.chunk_file(rel_path, content)
-            
-            logger.debug(f"Created {len(chunks)} chunks for {rel_path}")
-            return chunks
-            
-        except Exception as e:
-            logger.error(f"Error processing file {file_path}: {str(e)}")
+    async def _process_single_file(
+        self,
+        file_path: str,
+        root_path: str,
+        graph: Optional[CodeGraph] = None
+    ) -> List[CodeChunk]:
+        """Process a single file and return code chunks; read and chunking errors propagate"""
+        # Read file content
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+        
+        # Skip empty files
+        if not content.strip():
             return []
+        
+        # Convert to relative path for storage
+        rel_path = os.path.relpath(file_path, root_path)
+        
+        # Chunk the file, collecting graph references from the same parse
+        chunks, references = self.chunker.chunk_file_with_references(rel_path, content)
+        if graph is not None and references is not None:
+            graph.add_file(references)
+        
+        logger.debug(f"Created {len(chunks)} chunks for {rel_path}")
+        return chunks
     
-    async def _index_chunks(self, collection_name: str, chunks: List[CodeChunk]) -> None:
-        """Index code chunks into Qdrant"""
+    async def _index_chunks(
+        self,
+        collection_name: str,
+        chunks: List[CodeChunk],
+        index_name: Optional[str] = None,
+        generation: Optional[int] = None,
+        summaries: Optional[FileSummaries] = None
+    ) -> int:
+        """Index code chunks into Qdrant, adding their vectors to the file ``summaries``
+        
+        Returns the number of points written. Raises if the chunks could not
+        be embedded, so callers never record them as indexed.
+        """
         if not chunks:
-            return
+            return 0
         
         # Prepare texts for embedding
         texts = []
@@ -238,29 +326,45 @@ class CodeIndexer:
             )
             texts.append(text)
         
+        # Signatures are embedded in the same request as the chunks; this
+        # doubles the inputs per batch, though signatures are only a few lines
+        with_signatures = await self.qdrant.has_signature_vectors(collection_name)
+        if with_signatures:
+            texts.extend(self._signature_text(chunk) for chunk in chunks)
+        
+        # Let waiting searches use the embedder and Qdrant first
+        if self.scheduler is not None:
+            await self.scheduler.yield_to_interactive()
+        
         # Generate embeddings
         try:
             embeddings = await self.embedding_service.generate_embeddings(texts)
         except Exception as e:
             logger.error(f"Failed to generate embeddings: {str(e)}")
-            return
+            raise
         
-        if len(embeddings) != len(chunks):
-            logger.error(f"Embedding count mismatch: {len(embeddings)} vs {len(chunks)}")
-            return
+        if len(embeddings) != len(texts):
+            raise RuntimeError(f"Embedding count mismatch: {len(embeddings)} vs {len(texts)}")
+        signature_embeddings = embeddings[len(chunks):]
         
         # Create points for Qdrant
         points = []
-        for chunk, embedding in zip(chunks, embeddings):
-            if not embedding:  # Skip empty embeddings
-                continue
-            
+        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+            vector = {
+                "": embedding,
+                SparseEncoder.VECTOR_NAME: self._create_sparse_vector(chunk.content, chunk.file_path),
+            }
+            if with_signatures and signature_embeddings[i]:
+                vector[QdrantService.SIGNATURE_VECTOR_NAME] = self.qdrant.signature_vector(signature_embeddings[i])
             point = PointStruct(
                 id=str(uuid.uuid4()),
-                vector=embedding,
+                vector=vector,
                 payload={
+                    "repo": index_name or collection_name,
                     "filePath": chunk.file_path,
                     "codeChunk": chunk.content,
+                    "codeLength": len(chunk.content),
+                    "preview": preview_line(chunk.content),
                     "startLine": chunk.start_line,
                     "endLine": chunk.end_line,
                     "language": chunk.language,
@@ -270,16 +374,36 @@ class CodeIndexer:
                     "imports": chunk.imports or [],
                     "context": chunk.context,
                     "pathSegments": self._create_path_segments(chunk.file_path),
+                    "fileExtension": Path(chunk.file_path).suffix.lstrip('.').lower(),
                     "fileHash": self._hash_file_content(chunk.content),
-                    "indexedAt": int(time.time())
+                    "indexedAt": int(time.time()),
+                    "indexGeneration": generation
                 }
             )
             points.append(point)
         
         # Upsert to Qdrant
-        if points:
-            await self.qdrant.upsert_points(collection_name, points)
-            logger.debug(f"Indexed {len(points)} chunks to collection '{collection_name}'")
+        await self.qdrant.upsert_points(collection_name, points)
+        logger.debug(f"Indexed {len(points)} chunks to collection '{collection_name}'")
+        if summaries is not None:
+            summaries.add_many((chunk.file_path, embedding, chunk.language) for chunk, embedding in zip(chunks, embeddings))
+        return len(points)
+    
+    def _create_sparse_vector(self, content: str, file_path: str) -> SparseVector:
+        """Create the lexical sparse vector of a chunk from its code and path"""
+        return self.sparse_encoder.encode_document(f"{file_path}\n{content}")
+    
+    def _signature_text(self, chunk: CodeChunk) -> str:
+        """Text embedded for a chunk's signature vector
+        
+        Definitions use their header and doc comment; other chunks their
+        first lines, so every point can be found through the signature vector.
+        """
+        signature = chunk.signature
+        if not signature:
+            lines = [line for line in chunk.content.split('\n') if line.strip()]
+            signature = '\n'.join(lines[:self.SIGNATURE_FALLBACK_LINES]) or chunk.file_path
+        return self.embedding_service.prepare_text_for_embedding(signature, chunk.language)
     
     def _create_context_string(self, chunk: CodeChunk) -> str:
         """Create context string for a code chunk"""
@@ -318,6 +442,135 @@ class CodeIndexer:
         """Create hash of file content for change detection"""
         return hashlib.md5(content.encode()).hexdigest()
     
+    def _save_manifest(
+        self,
+        index_name: str,
+        root_path: str,
+        file_paths: List[str],
+        file_patterns: Optional[List[str]],
+        exclude_patterns: Optional[List[str]],
+        files: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Record the content hash of every indexed file"""
+        if files is None:
+            files = {}
+            for file_path in file_paths:
+                try:
+                    files[os.path.relpath(file_path, root_path)] = IndexManifest.hash_file(file_path)
+                except OSError as e:
+                    logger.warning(f"Failed to hash {file_path}: {str(e)}")
+        manifest = IndexManifest(
+            index_name=index_name,
+            root_path=root_path,
+            files=files,
+            file_patterns=file_patterns,
+            exclude_patterns=exclude_patterns,
+            embedding_model=self.config.embedding_model,
+            vector_size=self.config.vector_size
+        )
+        try:
+            manifest.save(self.config.index_state_dir)
+        except OSError as e:
+            logger.warning(f"Failed to save manifest for '{index_name}': {str(e)}")
+    
+    def _save_symbols(self, symbols: SymbolIndex) -> None:
+        """Persist the symbol table of an index"""
+        try:
+            symbols.save(self.config.index_state_dir)
+        except OSError as e:
+            logger.warning(f"Failed to save symbol table for '{symbols.index_name}': {str(e)}")
+    
+    async def _load_symbols(self, index_name: str) -> SymbolIndex:
+        """Load the symbol table of an index, rebuilding it from stored payloads if missing"""
+        symbols = SymbolIndex.load(self.config.index_state_dir, index_name)
+        if symbols is not None:
+            return symbols
+        
+        logger.info(f"No symbol table for '{index_name}', rebuilding it from the index")
+        symbols = SymbolIndex(index_name)
+        source_collection, scope_filter = self.qdrant.resolve_scope(index_name)
+        offset = None
+        while True:
+            points, offset = await self.qdrant.scroll_points(
+                source_collection,
+                filter_conditions=scope_filter,
+                limit=self.config.batch_size,
+                offset=offset,
+                with_payload=list(SymbolIndex.PAYLOAD_FIELDS)
+            )
+            symbols.add_payloads(point.payload for point in points)
+            if offset is None:
+                break
+        return symbols
+    
+    def _save_graph(self, graph: CodeGraph) -> None:
+        """Persist the code graph of an index"""
+        try:
+            graph.save(self.config.index_state_dir)
+        except OSError as e:
+            logger.warning(f"Failed to save code graph for '{graph.index_name}': {str(e)}")
+    
+    def _load_graph(self, index_name: str, root_path: str, rel_paths: List[str]) -> CodeGraph:
+        """Load the code graph of an index, re-parsing the given files if it is missing
+        
+        Vectors and payloads do not hold call sites, so a missing graph is
+        rebuilt from the checkout rather than from the index.
+        """
+        graph = CodeGraph.load(self.config.index_state_dir, index_name)
+        if graph is not None:
+            return graph
+        
+        logger.info(f"No code graph for '{index_name}', rebuilding it from {root_path}")
+        graph = CodeGraph(index_name)
+        for rel_path in rel_paths:
+            try:
+                with open(os.path.join(root_path, rel_path), 'r', encoding='utf-8', errors='ignore') as f:
+                    content = f.read()
+            except OSError as e:
+                logger.warning(f"Failed to read {rel_path}: {str(e)}")
+                continue
+            references = self.chunker.extract_references(rel_path, content)
+            if references is not None:
+                graph.add_file(references)
+        return graph
+    
+    async def _replace_file_summaries(self, summaries: FileSummaries) -> None:
+        """Write the file summaries of a rebuilt index; two-stage search falls back without them"""
+        try:
+            await self.qdrant.replace_file_summaries(summaries.index_name, summaries.points())
+        except Exception as e:
+            logger.warning(f"Failed to write file summaries for '{summaries.index_name}': {str(e)}")
+    
+    async def _rebuild_file_summaries(self, index_name: str) -> None:
+        """Build the file summaries of an index from its stored chunk vectors"""
+        logger.info(f"No file summaries for '{index_name}', building them from the index")
+        summaries = FileSummaries(index_name)
+        source_collection, scope_filter = self.qdrant.resolve_scope(index_name)
+        offset = None
+        while True:
+            points, offset = await self.qdrant.scroll_points(
+                source_collection,
+                filter_conditions=scope_filter,
+                limit=self.config.batch_size,
+                offset=offset,
+                with_vectors=True,
+                with_payload=["filePath", "language"]
+            )
+            summaries.add_many(
+                (point.payload.get("filePath", ""), vector, point.payload.get("language"))
+                for point, vector in ((point, self.qdrant.dense_vector(point.vector)) for point in points)
+                if vector
+            )
+            if offset is None:
+                break
+        await self._replace_file_summaries(summaries)
+    
+    async def _index_exists(self, index_name: str) -> bool:
+        """Check whether an index has been built"""
+        if self.qdrant.is_shared_layout:
+            return self.qdrant.shared_collection_name in await self.qdrant.catalog.get_names()
+        return index_name in await self.qdrant.catalog.get_index_names()
+    
     async def update_index(
         self,
         path: str,
@@ -325,15 +578,297 @@ class CodeIndexer:
         file_patterns: Optional[List[str]] = None,
         exclude_patterns: Optional[List[str]] = None
     ) -> Dict[str, Any]:
-        """Update index with only changed files"""
-        # For now, this is a full reindex
-        # Could be enhanced to track file hashes and only update changed files
-        return await self.index_codebase(path, collection_name, file_patterns, exclude_patterns)
+        """Update index with only changed files
+        
+        Files are compared against the content hashes in the index manifest;
+        chunks of changed and removed files are deleted and only changed files
+        are re-embedded. Falls back to a full rebuild without a manifest.
+        """
+        start_time = time.time()
+        
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Path does not exist: {path}")
+        
+        path = os.path.abspath(path)
+        if not collection_name:
+            collection_name = self.qdrant.get_collection_name_for_path(path)
+        
+        manifest = IndexManifest.load(self.config.index_state_dir, collection_name)
+        if manifest is None or not await self._index_exists(collection_name):
+            logger.info(f"No manifest for '{collection_name}', running a full index")
+            return await self.index_codebase(path, collection_name, file_patterns, exclude_patterns)
+        
+        file_patterns = file_patterns or manifest.file_patterns
+        exclude_patterns = exclude_patterns or manifest.exclude_patterns
+        include = file_patterns or self.default_include_patterns
+        exclude = (exclude_patterns or []) + self.default_exclude_patterns
+        
+        current_files = {}
+        for file_path in self._discover_files(path, include, exclude):
+            try:
+                current_files[os.path.relpath(file_path, path)] = IndexManifest.hash_file(file_path)
+            except OSError as e:
+                logger.warning(f"Failed to hash {file_path}: {str(e)}")
+        
+        changed = [rel for rel, digest in current_files.items() if manifest.files.get(rel) != digest]
+        removed = [rel for rel in manifest.files if rel not in current_files]
+        logger.info(f"Updating '{collection_name}': {len(changed)} changed, {len(removed)} removed files")
+        
+        # Changed files join the live generation, so reads see them at once
+        generation = None
+        if self.qdrant.is_shared_layout:
+            target_collection = self.qdrant.shared_collection_name
+            repo_scope = collection_name
+            generation = self.qdrant.live_generation(collection_name)
+        else:
+            target_collection = await self.qdrant.resolve_alias(collection_name)
+            repo_scope = None
+        
+        symbols = await self._load_symbols(collection_name)
+        symbols.remove_files(changed + removed)
+        changed_set = set(changed)
+        graph = self._load_graph(
+            collection_name, path, [rel for rel in current_files if rel not in changed_set]
+        )
+        graph.remove_files(changed + removed)
+        
+        await self.qdrant.delete_file_points(target_collection, changed + removed, repo_scope)
+        
+        summaries = FileSummaries(collection_name)
+        total_chunks = 0
+        failed_files: List[str] = []
+        changed_paths = [os.path.join(path, rel) for rel in changed]
+        for i in range(0, len(changed_paths), self.config.batch_size):
+            batch_files = changed_paths[i:i + self.config.batch_size]
+            batch_chunks = await self._process_file_batch(batch_files, path, graph, failed_files)
+            if not batch_chunks:
+                continue
+            try:
+                total_chunks += await self._index_chunks(
+                    target_collection, batch_chunks, collection_name, generation, summaries
+                )
+            except Exception as e:
+                logger.error(f"Failed to index batch starting at {batch_files[0]}: {str(e)}")
+                failed_files.extend(batch_files)
+                graph.remove_files([os.path.relpath(file_path, path) for file_path in batch_files])
+                continue
+            symbols.add_chunks(batch_chunks)
+        
+        # Files whose points were not written keep no hash, so the next update retries them
+        for file_path in failed_files:
+            current_files.pop(os.path.relpath(file_path, path), None)
+        self._save_manifest(
+            collection_name, path, [], file_patterns, exclude_patterns, files=current_files
+        )
+        self._save_symbols(symbols)
+        self._save_graph(graph)
+        if await self.qdrant.has_file_summaries(collection_name):
+            await self.qdrant.update_file_summaries(
+                collection_name,
+                summaries.points(),
+                [FileSummaries.point_id(collection_name, rel) for rel in changed + removed]
+            )
+        else:
+            await self._rebuild_file_summaries(collection_name)
+        
+        result = {
+            "collection_name": collection_name,
+            "files_processed": len(changed),
+            "files_failed": len(set(failed_files)),
+            "files_removed": len(removed),
+            "chunks_created": total_chunks,
+            "time_taken": time.time() - start_time
+        }
+        logger.info(f"Incremental update completed: {result}")
+        return result
     
     async def delete_index(self, collection_name: str) -> bool:
         """Delete an entire index collection"""
         try:
-            return await self.qdrant.delete_collection(collection_name)
+            if self.qdrant.is_shared_layout:
+                deleted = await self.qdrant.delete_repo_points(collection_name)
+            else:
+                deleted = await self.qdrant.delete_collection(collection_name)
+            IndexManifest.delete(self.config.index_state_dir, collection_name)
+            SymbolIndex.delete(self.config.index_state_dir, collection_name)
+            CodeGraph.delete(self.config.index_state_dir, collection_name)
+            DuplicateJob.delete(self.config.index_state_dir, collection_name)
+            await self.qdrant.delete_file_summaries(collection_name)
+            return deleted
         except Exception as e:
             logger.error(f"Failed to delete collection '{collection_name}': {str(e)}")
-            raise
\ No newline at end of file
+            raise
+    
+    async def export_index(self, collection_name: str, output_path: str) -> Dict[str, Any]:
+        """Export an index's vectors, payloads and manifest to a compressed snapshot file"""
+        start_time = time.time()
+        
+        manifest = IndexManifest.load(self.config.index_state_dir, collection_name)
+        source_collection, scope_filter = self.qdrant.resolve_scope(collection_name)
+        
+        header = {
+            "index_name": collection_name,
+            "embedding_model": self.config.embedding_model,
+            "vector_size": self.config.vector_size,
+            "manifest": manifest.to_dict() if manifest else None,
+            "exported_at": int(time.time()),
+        }
+        
+        output_path = os.path.abspath(os.path.expanduser(output_path))
+        with SnapshotWriter(output_path, header) as writer:
+            offset = None
+            while True:
+                points, offset = await self.qdrant.scroll_points(
+                    source_collection,
+                    filter_conditions=scope_filter,
+                    limit=self.config.batch_size,
+                    offset=offset,
+                    with_vectors=True
+                )
+                # Sparse vectors are cheap to recompute, so only the dense ones are exported
+                writer.write_points(
+                    {
+                        "id": point.id,
+                        "vector": self.qdrant.dense_vector(point.vector),
+                        "signature": self.qdrant.signature_of(point.vector),
+                        "payload": point.payload
+                    }
+                    for point in points
+                )
+                if offset is None:
+                    break
+        count = writer.count
+        
+        result = {
+            "collection_name": collection_name,
+            "output_path": output_path,
+            "points_exported": count,
+            "size_bytes": os.path.getsize(output_path),
+            "time_taken": time.time() - start_time
+        }
+        logger.info(f"Export completed: {result}")
+        return result
+    
+    async def import_index(
+        self,
+        input_path: str,
+        path: Optional[str] = None,
+        collection_name: Optional[str] = None,
+        storage_profile: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Bulk-load a snapshot, then re-embed only files changed since the export
+        
+        The snapshot is loaded into a new generation behind the index alias
+        (or a new generation of the repo in the shared layout). When ``path``
+        is given, the exported manifest is applied to it and an incremental
+        update brings the index up to date with the local checkout.
+        """
+        start_time = time.time()
+        input_path = os.path.abspath(os.path.expanduser(input_path))
+        header = read_snapshot_header(input_path)
+        
+        if header.get("embedding_model") != self.config.embedding_model or \
+                header.get("vector_size") != self.config.vector_size:
+            raise ValueError(
+                f"Snapshot was built with {header.get('embedding_model')} "
+                f"({header.get('vector_size')} dims) but this server uses "
+                f"{self.config.embedding_model} ({self.config.vector_size} dims)"
+            )
+        
+        if path:
+            path = os.path.abspath(path)
+        if not collection_name:
+            collection_name = (
+                self.qdrant.get_collection_name_for_path(path) if path else header["index_name"]
+            )
+        
+        generation = None
+        if self.qdrant.is_shared_layout:
+            target_collection = self.qdrant.shared_collection_name
+            await self.qdrant.create_collection_if_not_exists(target_collection, storage_profile)
+            generation = self.qdrant.begin_generation(collection_name)
+        else:
+            target_collection = await self.qdrant.create_generation(collection_name, storage_profile)
+        
+        imported = 0
+        with_signatures = await self.qdrant.has_signature_vectors(target_collection)
+        symbols = SymbolIndex(collection_name)
+        summaries = FileSummaries(collection_name)
+        try:
+            batch = []
+            for point in iter_snapshot_points(input_path):
+                payload = dict(point["payload"], repo=collection_name, indexGeneration=generation)
+                payload.setdefault("fileExtension", Path(payload.get("filePath", "")).suffix.lstrip('.').lower())
+                payload.setdefault("codeLength", len(payload.get("codeChunk", "")))
+                payload.setdefault("preview", preview_line(payload.get("codeChunk", "")))
+                symbols.add_payloads([payload])
+                summaries.add(payload.get("filePath", ""), point["vector"], payload.get("language"))
+                sparse_vector = self._create_sparse_vector(
+                    payload.get("codeChunk", ""), payload.get("filePath", "")
+                )
+                vector = {"": point["vector"], SparseEncoder.VECTOR_NAME: sparse_vector}
+                if with_signatures:
+                    # Snapshots from before signature vectors get a shortened full vector
+                    signature = point.get("signature")
+                    if not signature or len(signature) != self.qdrant.signature_vector_size:
+                        signature = self.qdrant.signature_vector(point["vector"])
+                    vector[QdrantService.SIGNATURE_VECTOR_NAME] = signature
+                # Fresh IDs, so an import under another name never takes over the source repo's points
+                batch.append(PointStruct(id=str(uuid.uuid4()), vector=vector, payload=payload))
+                if len(batch) >= self.config.batch_size:
+                    if self.scheduler is not None:
+                        await self.scheduler.yield_to_interactive()
+                    await self.qdrant.upsert_points(target_collection, batch)
+                    imported += len(batch)
+                    batch = []
+            if batch:
+                await self.qdrant.upsert_points(target_collection, batch)
+                imported += len(batch)
+        except Exception:
+            if self.qdrant.is_shared_layout:
+                await self.qdrant.delete_repo_points(collection_name, generation=generation)
+                self.qdrant.finish_generation(collection_name, generation, live=False)
+            else:
+                await self.qdrant.delete_collection(target_collection)
+            raise
+        
+        if self.qdrant.is_shared_layout:
+            self.qdrant.finish_generation(collection_name, generation)
+            await self.qdrant.delete_repo_points(collection_name, keep_generation=generation)
+        else:
+            await self.qdrant.switch_alias(collection_name, target_collection)
+            await self.qdrant.delete_old_generations(collection_name, keep=self.config.index_keep_generations)
+        
+        self._save_symbols(symbols)
+        # Snapshots carry no call sites; the update below rebuilds the graph
+        # from the checkout, and without a path the index has no graph
+        CodeGraph.delete(self.config.index_state_dir, collection_name)
+        await self._replace_file_summaries(summaries)
+        
+        result = {
+            "collection_name": collection_name,
+            "points_imported": imported,
+        }
+        
+        exported_manifest = header.get("manifest")
+        if exported_manifest:
+            manifest = IndexManifest.from_dict(exported_manifest)
+            self._save_manifest(
+                collection_name,
+                path or manifest.root_path,
+                [],
+                manifest.file_patterns,
+                manifest.exclude_patterns,
+                files=manifest.files
+            )
+            if path:
+                update = await self.update_index(path, collection_name)
+                result.update({
+                    "files_processed": update["files_processed"],
+                    "files_removed": update.get("files_removed", 0),
+                    "chunks_created": update["chunks_created"],
+                })
+        
+        result["time_taken"] = time.time() - start_time
+        logger.info(f"Import completed: {result}")
+        return result
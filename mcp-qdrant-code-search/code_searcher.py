@@ -1,10 +1,27 @@
 """Code search functionality for MCP Qdrant server"""
+import copy
 import logging
-from typing import Dict, List, Optional, Any
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Any, Tuple
 from qdrant_client.models import Filter, FieldCondition, MatchValue, MatchAny
+from code_graph import CodeGraph
 from config import Config
-from qdrant_service import QdrantService
+from deadlines import Deadline, DeadlineExceeded
+from diversity import DIVERSITY_MODES, merge_overlapping_spans, mmr_select
+from duplicates import DuplicateFinder, DuplicateJob
+from qdrant_service import QdrantService, SearchResults
 from embeddings import EmbeddingService
+from pagination import decode_cursor, encode_cursor
+from query_planner import QueryPlan, plan_query
+from path_filters import PathPattern, compile_path_pattern
+from reranker import CrossEncoderReranker
+from scheduler import RequestScheduler
+from search_cache import SearchCache
+from sparse_vectors import SparseEncoder
+from suggestions import merge_completions
+from symbol_index import SymbolIndex, lookup_symbols, symbol_kind
 
 logger = logging.getLogger(__name__)
 
@@ -12,10 +29,51 @@ logger = logging.getLogger(__name__)
 class CodeSearcher:
     """Searches for code using semantic similarity"""
     
-    def __init__(self, config: Config, qdrant_service: QdrantService):
+    # Over-fetch factor for file patterns that are only partly expressible as
+    # payload conditions and must be checked against the full glob afterwards
+    PATH_POST_FILTER_FACTOR = 4
+    
+    # Growing over-fetches of a post-filtered search before it reports a short page
+    PATH_POST_FILTER_ROUNDS = 3
+    
+    # Stored chunks of a file/function used as examples by find_related_code
+    RELATED_SOURCE_LIMIT = 16
+    
+    # Query embeddings kept for paging and repeated queries
+    QUERY_VECTOR_CACHE_SIZE = 256
+    
+    # Candidates per requested result that MMR chooses from
+    MMR_CANDIDATE_FACTOR = 4
+    
+    # Hits fetched per file in file-grouped searches
+    FILE_GROUP_SIZE = 3
+    
+    # Lexical candidates per requested result checked against a regex query
+    REGEX_CANDIDATE_FACTOR = 10
+    
+    # Score added to related results that are import/call neighbours of the source
+    GRAPH_BOOST = 0.1
+    
+    # Candidates per requested result that graph boosting can reorder
+    GRAPH_CANDIDATE_FACTOR = 2
+    
+    # Share of a search deadline kept back for the lexical fallback and the response
+    DEADLINE_RESERVE_FRACTION = 0.1
+    
+    def __init__(
+        self,
+        config: Config,
+        qdrant_service: QdrantService,
+        scheduler: Optional[RequestScheduler] = None
+    ):
         self.config = config
         self.qdrant = qdrant_service
         self.embedding_service = EmbeddingService(config)
+        self.sparse_encoder = SparseEncoder()
+        self.reranker = CrossEncoderReranker(config)
+        self.cache = SearchCache(int(config.search_cache_mb * 1024 * 1024), config.search_cache_ttl)
+        self.query_vectors: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.duplicates = DuplicateFinder(config, qdrant_service, scheduler)
     
     async def search(
         self,
@@ -27,61 +85,972 @@ class CodeSearcher:
         function_name: Optional[str] = None,
         class_name: Optional[str] = None,
         limit: int = 10,
-        similarity_threshold: float = 0.7
+        similarity_threshold: float = 0.7,
+        hnsw_ef: Optional[int] = None,
+        exact: bool = False,
+        search_mode: Optional[str] = None,
+        rerank: Optional[bool] = None,
+        offset: int = 0,
+        diversity: Optional[str] = None,
+        route: Optional[str] = None,
+        deadline_ms: Optional[float] = None,
+        exclude_ids: Optional[List[Any]] = None,
+        deadline: Optional[Deadline] = None,
+        with_code: bool = True
     ) -> List[Dict[str, Any]]:
-        """Search for code using semantic similarity"""
+        """Search for code, routing exact lookups away from vector search
         
-        # Generate query embedding
-        try:
-            query_embedding = await self.embedding_service.generate_single_embedding(query)
-            if not query_embedding:
-                raise ValueError("Failed to generate embedding for query")
-        except Exception as e:
-            logger.error(f"Failed to generate query embedding: {str(e)}")
-            raise
+        The query planner classifies the query first: identifiers such as
+        ``UserService.authenticate`` are answered from the symbol index, paths
+        and globs such as ``src/auth/`` by a payload-filtered scroll and regexes
+        by a lexical search checked against the regex. These routes embed
+        nothing; if one finds nothing the query falls back to vector search.
+        ``route`` forces a route (``vector`` disables routing). The plan and
+        its timings are reported in ``results.plan`` and ``results.timings``.
+        
+        Vector search options:
+        
+        ``hnsw_ef`` raises (or lowers) the HNSW beam width for this request and
+        ``exact`` bypasses the index entirely, trading latency for full recall.
+        ``search_mode="hybrid"`` also matches exact identifiers and strings
+        through the lexical sparse vectors and fuses both rankings with RRF.
+        ``search_mode="signature"`` shortlists candidates on the small
+        signature vectors and rescores them with the full vector.
+        ``search_mode="two_stage"`` first picks the files whose mean chunk
+        vectors are closest to the query, then searches only their chunks;
+        it needs a ``collection_name`` and otherwise runs a dense search.
+        ``rerank`` (default: on when a rerank model is configured) reorders the
+        top candidates with the cross-encoder; only the first page is reranked.
+        The results carry a ``next_cursor`` for ``search_page``. After a
+        reranked first page, later pages follow vector order from the top,
+        skipping the ``exclude_ids`` the first page returned.
+        ``diversity="mmr"`` picks from over-fetched candidates by maximal
+        marginal relevance and ``diversity="file"`` returns one result per file
+        through Qdrant's grouping query; both merge overlapping chunks of a
+        file into one result and are not paged.
+        
+        ``deadline_ms`` (default: ``search_deadline_ms``) bounds the whole
+        search, routed lookups included. Embedding, Qdrant and rerank calls
+        get what is left of it; if the query embedding runs out of time the
+        lexical matches are returned instead, collections that run out of
+        time are skipped, a scroll returns the chunks read so far, and a
+        rerank that would overrun keeps the vector order. Such results are
+        flagged ``partial`` and the deadline report is in ``results.deadline``.
+        A ``deadline`` started by the caller with ``start_deadline`` replaces
+        ``deadline_ms``, so time spent before the search (such as waiting for
+        a slot) counts against it.
+        
+        ``with_code=False`` leaves out the code bodies unless a stage needs
+        them (rerank, diversity, regex matching); results then carry a
+        ``preview`` and ``code_length``, and ``load_code_chunks`` fills in
+        the bodies a response has room for.
+        """
+        deadline = deadline or self.start_deadline(deadline_ms)
+        route = route or self.config.query_route
+        plan_start = time.perf_counter()
+        plan = plan_query(query, route)
+        plan_report = {"kind": plan.kind, "route": plan.route, "reason": plan.reason}
+        timings = {"plan_ms": round((time.perf_counter() - plan_start) * 1000, 3)}
+        
+        if plan.route != "vector" and offset == 0 and not exclude_ids:
+            route_start = time.perf_counter()
+            routed, fallback_reason = await self._search_route(
+                plan, collection_name, file_pattern, language, chunk_type, function_name, class_name, limit,
+                deadline, with_code
+            )
+            timings["route_ms"] = round((time.perf_counter() - route_start) * 1000, 1)
+            if routed:
+                routed.plan = plan_report
+                routed.timings.update(timings)
+                routed.deadline = deadline.report()
+                return routed
+            if deadline.exceeded:
+                fallback_reason = "the deadline ran out"
+            plan_report.update(route="vector", fallback=f"{plan.route} route: {fallback_reason}")
+        
+        results = await self._vector_search(
+            query, collection_name, file_pattern, language, chunk_type, function_name, class_name,
+            limit, similarity_threshold, hnsw_ef, exact, search_mode, rerank, offset, diversity, deadline,
+            exclude_ids, with_code
+        )
+        results.plan = plan_report
+        results.timings.update(timings)
+        results.deadline = deadline.report()
+        return results
+    
+    def start_deadline(self, deadline_ms: Optional[float] = None) -> Deadline:
+        """Start the deadline of a request"""
+        budget_ms = self.config.search_deadline_ms if deadline_ms is None else deadline_ms
+        return Deadline(budget_ms, budget_ms * self.DEADLINE_RESERVE_FRACTION)
+    
+    def _payload_fields(self, with_code: bool) -> List[str]:
+        """Payload fields to read for results, with or without their code bodies"""
+        return self.qdrant.RESULT_PAYLOAD_FIELDS if with_code else self.qdrant.COMPACT_PAYLOAD_FIELDS
+    
+    async def load_code_chunks(self, results: List[Dict[str, Any]]) -> None:
+        """Fill in the code bodies of results read without them
+        
+        Bodies are read by point ID with one call per collection.
+        """
+        by_collection: Dict[str, List[Dict[str, Any]]] = {}
+        for result in results:
+            if result.get('code_chunk') is None and result.get('id') is not None:
+                index_name = (result.get('payload') or {}).get('repo') or result.get('collection')
+                if index_name:
+                    target_collection, _ = self.qdrant.resolve_scope(index_name)
+                    by_collection.setdefault(target_collection, []).append(result)
+        for target_collection, missing in by_collection.items():
+            payloads = await self.qdrant.retrieve_payloads(
+                target_collection, [result['id'] for result in missing], with_payload=["codeChunk"]
+            )
+            for result in missing:
+                result['code_chunk'] = payloads.get(result['id'], {}).get('codeChunk', '')
+    
+    async def _vector_search(
+        self,
+        query: str,
+        collection_name: Optional[str],
+        file_pattern: Optional[str],
+        language: Optional[str],
+        chunk_type: Optional[str],
+        function_name: Optional[str],
+        class_name: Optional[str],
+        limit: int,
+        similarity_threshold: float,
+        hnsw_ef: Optional[int],
+        exact: bool,
+        search_mode: Optional[str],
+        rerank: Optional[bool],
+        offset: int,
+        diversity: Optional[str],
+        deadline: Deadline,
+        exclude_ids: Optional[List[Any]] = None,
+        with_code: bool = True
+    ) -> SearchResults:
+        """Dense or hybrid search with optional reranking and diversification"""
+        exclude = set(exclude_ids or ())
+        rerank = self.reranker.enabled and rerank is not False and offset == 0 and not exclude
+        search_mode = search_mode or self.config.search_mode
+        diversity = diversity or self.config.search_diversity
+        if diversity not in DIVERSITY_MODES:
+            raise ValueError(f"Unknown diversity '{diversity}'. Available: {', '.join(DIVERSITY_MODES)}")
+        if diversity != "none" and offset:
+            raise ValueError("Diversified searches cannot be paged")
+        # The cross-encoder and span merging read the code bodies
+        with_code = with_code or rerank or diversity != "none"
+        with_payload = self._payload_fields(with_code)
+        page_params = {
+            "collection_name": collection_name,
+            "file_pattern": file_pattern,
+            "language": language,
+            "chunk_type": chunk_type,
+            "function_name": function_name,
+            "class_name": class_name,
+            "limit": limit,
+            "similarity_threshold": similarity_threshold,
+            "hnsw_ef": hnsw_ef,
+            "exact": exact,
+            "search_mode": search_mode,
+        }
+        
+        cache_key = None
+        if self.cache.enabled:
+            cache_key = (
+                self._normalize_query(query), collection_name, file_pattern, language, chunk_type,
+                function_name, class_name, limit, similarity_threshold, hnsw_ef, exact,
+                search_mode, rerank, offset, diversity, tuple(exclude_ids or ()), with_code,
+                await self.qdrant.get_write_version(collection_name)
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                # Callers annotate and mutate results, so each hit gets its own copy
+                results = copy.deepcopy(cached)
+                results.timings = {}
+                return results
+        
+        sparse_vector = self.sparse_encoder.encode_query(query) if search_mode == "hybrid" else None
         
         # Create filter conditions
+        path_pattern = await self._compile_path_pattern(file_pattern, collection_name)
         filter_conditions = self._create_search_filter(
-            file_pattern=file_pattern,
+            path_pattern=path_pattern,
             language=language,
             chunk_type=chunk_type,
             function_name=function_name,
             class_name=class_name
         )
         
+        # Generate query embedding
+        try:
+            query_embedding = await deadline.run(self._get_query_embedding(query), "embedding")
+        except DeadlineExceeded:
+            logger.warning("Query embedding ran past the search deadline; returning lexical matches")
+            return await self._lexical_fallback(
+                query, collection_name, filter_conditions, path_pattern, offset, limit, deadline, with_code
+            )
+        
+        candidate_limit = max(limit, self.reranker.top_n) if rerank else limit + len(exclude)
+        
+        # Qdrant can skip earlier pages itself unless results are merged
+        # across collections or post-filtered here
+        qdrant_offset, skip = 0, offset
+        if collection_name and not (path_pattern and path_pattern.needs_post_filter):
+            qdrant_offset, skip = offset, 0
+        pool_limit = skip + candidate_limit
+        if diversity == "mmr":
+            pool_limit *= self.MMR_CANDIDATE_FACTOR
+        
         # Perform search
+        start = time.perf_counter()
+        coarse_ms = None
         try:
+            if search_mode == "two_stage":
+                search_mode = "dense"
+                if collection_name and await self.qdrant.has_file_summaries(collection_name):
+                    file_paths = await deadline.run(self.qdrant.search_file_summaries(
+                        collection_name, query_embedding, self.config.two_stage_files
+                    ), "coarse search")
+                    coarse_ms = round((time.perf_counter() - start) * 1000, 1)
+                    start = time.perf_counter()
+                    filter_conditions = self.qdrant.add_filter_condition(
+                        filter_conditions, FieldCondition(key="filePath", match=MatchAny(any=file_paths))
+                    )
+                else:
+                    logger.info("No file summaries to search; running a dense search")
+            
             if collection_name:
-                # Search in specific collection
-                results = await self.qdrant.search_similar(
-                    collection_name=collection_name,
-                    query_vector=query_embedding,
-                    limit=limit,
-                    score_threshold=similarity_threshold,
-                    filter_conditions=filter_conditions
-                )
-            else:
-                # Search across all collections with our prefix
-                results = await self.qdrant.search_across_collections(
-                    query_vector=query_embedding,
-                    collection_prefix=self.config.collection_prefix,
-                    limit=limit,
-                    score_threshold=similarity_threshold,
-                    filter_conditions=filter_conditions
+                # Search in specific collection (or repo of the shared collection)
+                collection_name, filter_conditions = self.qdrant.resolve_scope(
+                    collection_name, filter_conditions
                 )
             
-            # Enhance results with additional information
-            enhanced_results = []
-            for result in results:
-                enhanced_result = await self._enhance_search_result(result)
-                enhanced_results.append(enhanced_result)
+            async def fetch(search_limit: int) -> List[List[Dict[str, Any]]]:
+                if collection_name and diversity == "file":
+                    results = await deadline.run(self.qdrant.search_groups(
+                        collection_name=collection_name,
+                        query_vector=query_embedding,
+                        limit=search_limit,
+                        group_size=self.FILE_GROUP_SIZE,
+                        score_threshold=similarity_threshold,
+                        filter_conditions=filter_conditions,
+                        hnsw_ef=hnsw_ef,
+                        exact=exact,
+                        sparse_vector=sparse_vector,
+                        search_mode=search_mode,
+                        with_payload=with_payload
+                    ), "search")
+                elif collection_name:
+                    results = await deadline.run(self.qdrant.search_similar(
+                        collection_name=collection_name,
+                        query_vector=query_embedding,
+                        limit=search_limit,
+                        score_threshold=similarity_threshold,
+                        filter_conditions=filter_conditions,
+                        hnsw_ef=hnsw_ef,
+                        exact=exact,
+                        sparse_vector=sparse_vector,
+                        search_mode=search_mode,
+                        offset=qdrant_offset,
+                        with_vectors=diversity == "mmr",
+                        with_payload=with_payload
+                    ), "search")
+                elif diversity == "file":
+                    results = await self.qdrant.search_groups_across_collections(
+                        query_vector=query_embedding,
+                        collection_prefix=self.config.collection_prefix,
+                        limit=search_limit,
+                        group_size=self.FILE_GROUP_SIZE,
+                        score_threshold=similarity_threshold,
+                        filter_conditions=filter_conditions,
+                        hnsw_ef=hnsw_ef,
+                        exact=exact,
+                        sparse_vector=sparse_vector,
+                        search_mode=search_mode,
+                        deadline=deadline,
+                        with_payload=with_payload
+                    )
+                else:
+                    # Search across all collections with our prefix
+                    results = await self.qdrant.search_across_collections(
+                        query_vector=query_embedding,
+                        collection_prefix=self.config.collection_prefix,
+                        limit=search_limit,
+                        score_threshold=similarity_threshold,
+                        filter_conditions=filter_conditions,
+                        hnsw_ef=hnsw_ef,
+                        exact=exact,
+                        sparse_vector=sparse_vector,
+                        search_mode=search_mode,
+                        with_vectors=diversity == "mmr",
+                        deadline=deadline,
+                        with_payload=with_payload
+                    )
+                return [results]
             
-            return enhanced_results
+            [results] = await self._fetch_path_filtered(fetch, path_pattern, pool_limit, deadline)
+            results.collect_fallbacks(page_params["collection_name"])
+            results = SearchResults.like(results, results[skip:])
+            next_offset = offset + limit
+            if exclude:
+                # Skip what the reranked first page returned, counting vector positions
+                page = []
+                for position, result in enumerate(results):
+                    if len(page) == limit:
+                        break
+                    next_offset = offset + position + 1
+                    if result['id'] not in exclude:
+                        page.append(result)
+                results = SearchResults.like(results, page)
+            if diversity != "none":
+                results = self._diversify(results, diversity, candidate_limit)
+            results.timings['search_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            if coarse_ms is not None:
+                results.timings['coarse_ms'] = coarse_ms
+            if rerank:
+                results = await self._rerank(query, results, limit, deadline)
+                # Later pages restart in vector order without the reranked page
+                next_offset = 0
+                exclude = {result['id'] for result in results}
+            if len(results) >= limit and diversity == "none":
+                state = {
+                    "query": query,
+                    "offset": next_offset,
+                    "params": {key: value for key, value in page_params.items() if value is not None}
+                }
+                if exclude:
+                    state["params"]["exclude_ids"] = sorted(exclude, key=str)
+                results.next_cursor = encode_cursor("search", state)
             
+            # Enhance results with additional information
+            results = await self._enhance_search_results(results)
+            if cache_key is not None and not results.partial:
+                self.cache.put(cache_key, copy.deepcopy(results))
+            return results
+            
+        except DeadlineExceeded as e:
+            logger.warning(f"Search ran past its deadline in the {e.stage} stage")
+            return SearchResults(timings={'search_ms': round((time.perf_counter() - start) * 1000, 1)})
         except Exception as e:
             logger.error(f"Search failed: {str(e)}")
             raise
     
+    async def _lexical_fallback(
+        self,
+        query: str,
+        collection_name: Optional[str],
+        filter_conditions: Optional[Filter],
+        path_pattern: Optional[PathPattern],
+        offset: int,
+        limit: int,
+        deadline: Deadline,
+        with_code: bool = True
+    ) -> SearchResults:
+        """Lexical matches of a query whose embedding ran out of time
+        
+        Spends the reserve of the deadline. Lexical scores are not
+        similarities, so scores are dropped and the lexical order is kept.
+        """
+        deadline.release_reserve()
+        sparse_vector = self.sparse_encoder.encode_query(query)
+        if not sparse_vector.indices:
+            return SearchResults()
+        start = time.perf_counter()
+        
+        async def fetch(search_limit: int) -> List[List[Dict[str, Any]]]:
+            if collection_name:
+                target_collection, scoped_filter = self.qdrant.resolve_scope(collection_name, filter_conditions)
+                return [await deadline.run(self.qdrant.search_lexical(
+                    target_collection, sparse_vector, search_limit, scoped_filter, self._payload_fields(with_code)
+                ), "lexical fallback")]
+            return [await self.qdrant.search_lexical_across_collections(
+                sparse_vector, self.config.collection_prefix, search_limit, filter_conditions, deadline,
+                self._payload_fields(with_code)
+            )]
+        
+        try:
+            [results] = await self._fetch_path_filtered(fetch, path_pattern, offset + limit, deadline)
+        except DeadlineExceeded:
+            return SearchResults()
+        
+        results = SearchResults.like(results, results[offset:])
+        results.timings['lexical_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        for result in results:
+            result['score'] = None
+        return await self._enhance_search_results(results)
+    
+    async def _search_route(
+        self,
+        plan: QueryPlan,
+        collection_name: Optional[str],
+        file_pattern: Optional[str],
+        language: Optional[str],
+        chunk_type: Optional[str],
+        function_name: Optional[str],
+        class_name: Optional[str],
+        limit: int,
+        deadline: Optional[Deadline] = None,
+        with_code: bool = True
+    ) -> Tuple[SearchResults, str]:
+        """Answer a query through its planned non-vector route
+        
+        Returns the results and, when they are empty, why the route could not
+        answer the query. The regex route always reads the code it matches.
+        """
+        if plan.route == "symbol":
+            if function_name or class_name:
+                return SearchResults(), "explicit name filters"
+            kind = symbol_kind(chunk_type)
+            if chunk_type and not kind:
+                return SearchResults(), f"symbols are never '{chunk_type}' chunks"
+            try:
+                symbols = self.find_symbol(plan.term, collection_name, match="exact", kind=kind, limit=limit * 4)
+            except ValueError as e:
+                return SearchResults(), str(e)
+            path_pattern = compile_path_pattern(file_pattern)
+            symbols = [
+                symbol for symbol in symbols
+                if (not language or symbol['language'] == language)
+                and (path_pattern is None or path_pattern.matches(symbol['file_path']))
+            ][:limit]
+            results = await self._fetch_symbol_chunks(
+                symbols, cross_collection=not collection_name, deadline=deadline, with_code=with_code
+            )
+            return results, "" if results else "no symbol with that name"
+        
+        if plan.route == "path":
+            if file_pattern:
+                return SearchResults(), "a file_pattern was also given"
+            results = await self._scroll_path(
+                plan.term, collection_name, language, chunk_type, function_name, class_name, limit, deadline,
+                with_code
+            )
+            return results, "" if results else "no indexed file matches"
+        
+        if plan.route == "regex":
+            try:
+                pattern = re.compile(plan.term)
+            except re.error as e:
+                return SearchResults(), f"invalid regex ({e})"
+            if not plan.literals:
+                return SearchResults(), "no literal text to search for"
+            sparse_vector = self.sparse_encoder.encode_query(" ".join(plan.literals))
+            path_pattern = await self._compile_path_pattern(file_pattern, collection_name)
+            filter_conditions = self._create_search_filter(
+                path_pattern=path_pattern,
+                language=language,
+                chunk_type=chunk_type,
+                function_name=function_name,
+                class_name=class_name
+            )
+            candidate_limit = limit * self.REGEX_CANDIDATE_FACTOR
+            if collection_name:
+                target_collection, filter_conditions = self.qdrant.resolve_scope(collection_name, filter_conditions)
+                try:
+                    candidates = await (deadline or Deadline(0)).run(self.qdrant.search_lexical(
+                        target_collection, sparse_vector, candidate_limit, filter_conditions
+                    ), "lexical search")
+                except DeadlineExceeded:
+                    return SearchResults(), "the deadline ran out"
+            else:
+                candidates = await self.qdrant.search_lexical_across_collections(
+                    sparse_vector, self.config.collection_prefix, candidate_limit, filter_conditions, deadline
+                )
+            candidates = self._apply_path_pattern(candidates, path_pattern, candidate_limit)
+            matches = [result for result in candidates if pattern.search(result.get('code_chunk', ''))][:limit]
+            for result in matches:
+                # Lexical scores are not similarities; the order is kept
+                result['score'] = None
+            results = await self._enhance_search_results(SearchResults.like(candidates, matches))
+            return results, "" if results else "no lexical candidate matches the regex"
+        
+        return SearchResults(), f"unknown route '{plan.route}'"
+    
+    async def _fetch_symbol_chunks(
+        self,
+        symbols: List[Dict[str, Any]],
+        cross_collection: bool = False,
+        deadline: Optional[Deadline] = None,
+        with_code: bool = True
+    ) -> SearchResults:
+        """Load the stored chunks of symbol table entries, in symbol order
+        
+        A split definition is stored as several ``<kind>_partial`` chunks,
+        which are all loaded. Indexes not read before the deadline are
+        reported in ``failed_collections``.
+        """
+        deadline = deadline or Deadline(0)
+        by_index: Dict[str, List[Dict[str, Any]]] = {}
+        for symbol in symbols:
+            by_index.setdefault(symbol['index_name'], []).append(symbol)
+        
+        rank = {}
+        for position, symbol in enumerate(symbols):
+            rank[(symbol['index_name'], symbol['file_path'], symbol['name'], symbol['kind'])] = position
+        
+        found = []
+        failed_collections = {}
+        for index_name, index_symbols in by_index.items():
+            symbol_filter = Filter(should=[
+                Filter(must=[
+                    FieldCondition(key="filePath", match=MatchValue(value=symbol['file_path'])),
+                    FieldCondition(key="functionName", match=MatchValue(value=symbol['name'])),
+                    FieldCondition(
+                        key="chunkType", match=MatchAny(any=[symbol['kind'], f"{symbol['kind']}_partial"])
+                    ),
+                ])
+                for symbol in index_symbols
+            ])
+            target_collection, scoped_filter = self.qdrant.resolve_scope(index_name, symbol_filter)
+            try:
+                points, _ = await deadline.run(self.qdrant.scroll_points(
+                    target_collection,
+                    filter_conditions=scoped_filter,
+                    limit=len(index_symbols) * self.PATH_POST_FILTER_FACTOR,
+                    with_payload=self._payload_fields(with_code)
+                ), "symbol chunks")
+            except DeadlineExceeded:
+                failed_collections[index_name] = "deadline"
+                continue
+            except Exception as e:
+                # A symbol table can outlive an index deleted behind our back
+                logger.warning(f"Failed to load symbol chunks from '{index_name}': {str(e)}")
+                failed_collections[index_name] = "error"
+                continue
+            for point in points:
+                result = self.qdrant.point_to_result(point)
+                key = (index_name, result['file_path'], result['function_name'], symbol_kind(result['chunk_type']))
+                if key in rank:
+                    if cross_collection:
+                        result['collection'] = index_name
+                    found.append((rank[key], result['start_line'], result))
+        
+        found.sort(key=lambda item: item[:2])
+        return await self._enhance_search_results(
+            SearchResults([result for _, _, result in found], failed_collections)
+        )
+    
+    async def _scroll_path(
+        self,
+        pattern: str,
+        collection_name: Optional[str],
+        language: Optional[str],
+        chunk_type: Optional[str],
+        function_name: Optional[str],
+        class_name: Optional[str],
+        limit: int,
+        deadline: Optional[Deadline] = None,
+        with_code: bool = True
+    ) -> SearchResults:
+        """Browse the chunks of the files a path query names
+        
+        With one collection this is a ``scroll`` with its cursor; otherwise
+        every index whose symbol table lists a matching file is scrolled,
+        until the page is full or the deadline runs out.
+        """
+        filters = {
+            "file_pattern": pattern,
+            "language": language,
+            "chunk_type": chunk_type,
+            "function_name": function_name,
+            "class_name": class_name,
+        }
+        if collection_name:
+            return await self.scroll(collection_name, limit=limit, deadline=deadline, with_code=with_code, **filters)
+        
+        path_pattern = compile_path_pattern(pattern)
+        state_dir = self.config.index_state_dir
+        results = SearchResults()
+        for index_name in SymbolIndex.list_indexes(state_dir):
+            table = SymbolIndex.load(state_dir, index_name)
+            if table is None or not any(path_pattern.matches(path) for path in table.suggestions.files):
+                continue
+            if deadline is not None and deadline.remaining() == 0:
+                results.failed_collections[index_name] = "deadline"
+                continue
+            try:
+                page = await self.scroll(
+                    index_name, limit=limit - len(results), deadline=deadline, with_code=with_code, **filters
+                )
+            except Exception as e:
+                logger.warning(f"Failed to scroll '{index_name}' for a path query: {str(e)}")
+                results.failed_collections[index_name] = "error"
+                continue
+            for result in page:
+                result['collection'] = index_name
+            results.extend(page)
+            if len(results) >= limit:
+                break
+        return results
+    
+    async def search_page(
+        self,
+        cursor: str,
+        deadline: Optional[Deadline] = None,
+        with_code: bool = True
+    ) -> SearchResults:
+        """Fetch the next page of a search from its ``next_cursor``
+        
+        The query embedding is normally still cached, so paging costs one
+        Qdrant call and no embedding. Path queries page through ``scroll``
+        cursors.
+        """
+        try:
+            state = decode_cursor(cursor, "search")
+        except ValueError:
+            return await self.scroll(collection_name=None, cursor=cursor, deadline=deadline, with_code=with_code)
+        return await self.search(
+            query=state["query"], offset=state["offset"], deadline=deadline, with_code=with_code, **state["params"]
+        )
+    
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Collapse whitespace so trivially different queries share cache entries"""
+        return " ".join(query.split())
+    
+    async def _get_query_embedding(self, query: str) -> List[float]:
+        """Embed a query, reusing the embedding of a recent identical query"""
+        key = self._normalize_query(query)
+        if key in self.query_vectors:
+            self.query_vectors.move_to_end(key)
+            return self.query_vectors[key]
+        
+        try:
+            query_embedding = await self.embedding_service.generate_single_embedding(query)
+            if not query_embedding:
+                raise ValueError("Failed to generate embedding for query")
+        except Exception as e:
+            logger.error(f"Failed to generate query embedding: {str(e)}")
+            raise
+        
+        self.query_vectors[key] = query_embedding
+        if len(self.query_vectors) > self.QUERY_VECTOR_CACHE_SIZE:
+            self.query_vectors.popitem(last=False)
+        return query_embedding
+    
+    async def scroll(
+        self,
+        collection_name: str,
+        file_pattern: Optional[str] = None,
+        language: Optional[str] = None,
+        chunk_type: Optional[str] = None,
+        function_name: Optional[str] = None,
+        class_name: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        with_code: bool = True
+    ) -> SearchResults:
+        """Browse the chunks of an index that match filters, page by page
+        
+        Unlike ``search`` there is no query and no ranking; chunks come in
+        storage order. Pass the returned ``next_cursor`` to get the next page.
+        A ``deadline`` that runs out ends the page early, flagged ``partial``;
+        its cursor resumes after the last chunk read. ``with_code`` is as for
+        ``search``.
+        """
+        deadline = deadline or Deadline(0)
+        params = {
+            "collection_name": collection_name,
+            "file_pattern": file_pattern,
+            "language": language,
+            "chunk_type": chunk_type,
+            "function_name": function_name,
+            "class_name": class_name,
+            "limit": limit,
+        }
+        offset = None
+        if cursor:
+            state = decode_cursor(cursor, "scroll")
+            params, offset = dict.fromkeys(params), state["offset"]
+            params.update(state["params"])
+        
+        path_pattern = await self._compile_path_pattern(params["file_pattern"], params["collection_name"])
+        filter_conditions = self._create_search_filter(
+            path_pattern=path_pattern,
+            language=params["language"],
+            chunk_type=params["chunk_type"],
+            function_name=params["function_name"],
+            class_name=params["class_name"]
+        )
+        target_collection, filter_conditions = self.qdrant.resolve_scope(
+            params["collection_name"], filter_conditions
+        )
+        page_limit = params["limit"]
+        
+        # Post-filtered pages are topped up until full or the index is exhausted
+        try:
+            page = []
+            while len(page) < page_limit:
+                points, offset = await deadline.run(self.qdrant.scroll_points(
+                    target_collection,
+                    filter_conditions=filter_conditions,
+                    limit=page_limit,
+                    offset=offset,
+                    with_payload=self._payload_fields(with_code)
+                ), "scroll")
+                for point in points:
+                    if len(page) == page_limit:
+                        # Resume from the first point not looked at
+                        offset = point.id
+                        break
+                    result = self.qdrant.point_to_result(point)
+                    if path_pattern is None or not path_pattern.needs_post_filter \
+                            or path_pattern.matches(result.get('file_path', '')):
+                        page.append(result)
+                if offset is None:
+                    break
+        except DeadlineExceeded:
+            logger.warning(f"Scroll ran past the search deadline after {len(page)} chunks")
+        except Exception as e:
+            logger.error(f"Scroll failed: {str(e)}")
+            raise
+        
+        results = await self._enhance_search_results(page)
+        results.deadline = deadline.report()
+        if offset is not None or deadline.exceeded:
+            results.next_cursor = encode_cursor("scroll", {
+                "offset": offset,
+                "params": {key: value for key, value in params.items() if value is not None}
+            })
+        return results
+    
+    async def search_many(
+        self,
+        queries: List[str],
+        collection_name: Optional[str] = None,
+        file_pattern: Optional[str] = None,
+        language: Optional[str] = None,
+        chunk_type: Optional[str] = None,
+        limit: int = 10,
+        similarity_threshold: float = 0.7,
+        hnsw_ef: Optional[int] = None,
+        exact: bool = False,
+        search_mode: Optional[str] = None,
+        deadline_ms: Optional[float] = None,
+        deadline: Optional[Deadline] = None,
+        with_code: bool = True
+    ) -> List[List[Dict[str, Any]]]:
+        """Run several searches with one embedding call and one Qdrant batch request
+        
+        Returns one result list per query, in the order of ``queries``. The
+        searches share one deadline, handled as in ``search``; ``deadline``
+        replaces ``deadline_ms`` and ``with_code`` works there too.
+        """
+        if not queries:
+            return []
+        if any(not query.strip() for query in queries):
+            raise ValueError("Queries must not be empty")
+        
+        deadline = deadline or self.start_deadline(deadline_ms)
+        index_name = collection_name
+        search_mode = search_mode or self.config.search_mode
+        sparse_vectors = None
+        if search_mode == "hybrid":
+            sparse_vectors = [self.sparse_encoder.encode_query(query) for query in queries]
+        
+        path_pattern = await self._compile_path_pattern(file_pattern, collection_name)
+        filter_conditions = self._create_search_filter(
+            path_pattern=path_pattern,
+            language=language,
+            chunk_type=chunk_type
+        )
+        
+        # Embed every query in one provider call
+        try:
+            query_embeddings = await deadline.run(self.embedding_service.generate_embeddings(queries), "embedding")
+            if len(query_embeddings) != len(queries):
+                raise ValueError("Failed to generate embeddings for all queries")
+        except DeadlineExceeded:
+            logger.warning("Query embeddings ran past the search deadline; returning lexical matches")
+            batch_results = [
+                await self._lexical_fallback(
+                    query, collection_name, filter_conditions, path_pattern, 0, limit, deadline, with_code
+                )
+                for query in queries
+            ]
+            for results in batch_results:
+                results.deadline = deadline.report()
+            return batch_results
+        except Exception as e:
+            logger.error(f"Failed to generate query embeddings: {str(e)}")
+            raise
+        
+        if collection_name:
+            collection_name, filter_conditions = self.qdrant.resolve_scope(
+                collection_name, filter_conditions
+            )
+        
+        async def fetch(search_limit: int) -> List[List[Dict[str, Any]]]:
+            if collection_name:
+                return await deadline.run(self.qdrant.search_batch(
+                    collection_name=collection_name,
+                    query_vectors=query_embeddings,
+                    limit=search_limit,
+                    score_threshold=similarity_threshold,
+                    filter_conditions=filter_conditions,
+                    hnsw_ef=hnsw_ef,
+                    exact=exact,
+                    sparse_vectors=sparse_vectors,
+                    search_mode=search_mode,
+                    with_payload=self._payload_fields(with_code)
+                ), "search")
+            return await self.qdrant.search_batch_across_collections(
+                query_vectors=query_embeddings,
+                collection_prefix=self.config.collection_prefix,
+                limit=search_limit,
+                score_threshold=similarity_threshold,
+                filter_conditions=filter_conditions,
+                hnsw_ef=hnsw_ef,
+                exact=exact,
+                sparse_vectors=sparse_vectors,
+                search_mode=search_mode,
+                deadline=deadline,
+                with_payload=self._payload_fields(with_code)
+            )
+        
+        try:
+            batch_results = await self._fetch_path_filtered(fetch, path_pattern, limit, deadline)
+        except DeadlineExceeded:
+            logger.warning("Batch search ran past its deadline")
+            batch_results = [[] for _ in queries]
+        except Exception as e:
+            logger.error(f"Batch search failed: {str(e)}")
+            raise
+        
+        enhanced = []
+        for results in batch_results:
+            results = SearchResults.like(results, results)
+            results.collect_fallbacks(index_name)
+            results = await self._enhance_search_results(results)
+            results.deadline = deadline.report()
+            enhanced.append(results)
+        return enhanced
+    
+    def _diversify(self, results: SearchResults, diversity: str, limit: int) -> SearchResults:
+        """Merge overlapping chunks and pick diverse results
+        
+        In ``file`` mode every result is a group of hits from one file; the
+        best merged span becomes the result and the file's other spans are
+        listed in ``other_spans``. In ``mmr`` mode overlapping candidates are
+        merged first, then MMR picks ``limit`` of them.
+        """
+        if diversity == "file":
+            diversified = []
+            for group in results:
+                hits = [dict(hit, collection=group.get('collection')) for hit in group.pop('group_hits', [])]
+                spans = merge_overlapping_spans([group] + hits)
+                best = spans[0]
+                if len(spans) > 1:
+                    best['other_spans'] = [
+                        {'start_line': span['start_line'], 'end_line': span['end_line'], 'score': span['score']}
+                        for span in spans[1:]
+                    ]
+                diversified.append(best)
+        else:
+            diversified = mmr_select(merge_overlapping_spans(results), limit, self.config.mmr_lambda)
+            for result in diversified:
+                result.pop('vector', None)
+        return SearchResults.like(results, diversified[:limit])
+    
+    async def _rerank(
+        self,
+        query: str,
+        results: SearchResults,
+        limit: int,
+        deadline: Optional[Deadline] = None
+    ) -> SearchResults:
+        """Rerank candidates with the cross-encoder and trim to the limit
+        
+        The rerank budget shrinks to what is left of the deadline. A rerank
+        cut short by that is recorded as the deadline's ``rerank`` stage.
+        """
+        budget_ms = self.reranker.budget_ms
+        if deadline is not None and deadline.enabled:
+            budget_ms = min(budget_ms, deadline.remaining() * 1000)
+        reranked, report = await self.reranker.rerank(query, results, budget_ms)
+        if budget_ms < self.reranker.budget_ms and not report['applied'] and report['candidates'] > 1:
+            deadline.mark_exceeded("rerank")
+        final_results = SearchResults.like(results, reranked[:limit])
+        final_results.rerank = report
+        final_results.timings['rerank_ms'] = report['elapsed_ms']
+        return final_results
+    
+    async def _compile_path_pattern(
+        self,
+        file_pattern: Optional[str],
+        collection_name: Optional[str]
+    ) -> Optional[PathPattern]:
+        """Compile a file pattern for the collections a search covers
+        
+        Collections indexed before ``fileExtension`` was stored would match
+        nothing on it, so for them the extension is only checked afterwards.
+        """
+        path_pattern = compile_path_pattern(file_pattern)
+        if path_pattern and path_pattern.extension \
+                and not await self.qdrant.stores_file_extensions(collection_name, self.config.collection_prefix):
+            path_pattern = compile_path_pattern(file_pattern, extension_field=False)
+        return path_pattern
+    
+    async def _fetch_path_filtered(
+        self,
+        fetch: Callable[[int], Awaitable[List[List[Dict[str, Any]]]]],
+        path_pattern: Optional[PathPattern],
+        limit: int,
+        deadline: Deadline
+    ) -> List[SearchResults]:
+        """Run a search (or batch of searches) until every page is full after path filtering
+        
+        ``fetch`` runs the searches for a Qdrant limit. Post-filtered searches
+        fetch ``PATH_POST_FILTER_FACTOR`` times the limit, growing by that
+        factor while a page comes up short and its search was not exhausted.
+        After ``PATH_POST_FILTER_ROUNDS`` fetches, or once the deadline runs
+        out, short pages get ``path_filter_capped``: the candidates checked.
+        """
+        if not path_pattern or not path_pattern.needs_post_filter:
+            return [SearchResults.like(results, results) for results in await fetch(limit)]
+        
+        pages: List[SearchResults] = []
+        short: List[bool] = []
+        search_limit = checked = limit
+        for _ in range(self.PATH_POST_FILTER_ROUNDS):
+            search_limit *= self.PATH_POST_FILTER_FACTOR
+            try:
+                batch = await fetch(search_limit)
+            except DeadlineExceeded:
+                if not pages:
+                    raise
+                break
+            checked = search_limit
+            pages = [self._apply_path_pattern(results, path_pattern, limit) for results in batch]
+            short = [len(page) < limit and len(results) >= search_limit for page, results in zip(pages, batch)]
+            if not any(short):
+                return pages
+        for page, capped in zip(pages, short):
+            if capped:
+                page.path_filter_capped = checked
+        return pages
+    
+    def _apply_path_pattern(
+        self,
+        results: List[Dict[str, Any]],
+        path_pattern: Optional[PathPattern],
+        limit: int
+    ) -> SearchResults:
+        """Drop results outside the file pattern and trim to the requested limit"""
+        if not path_pattern or not path_pattern.needs_post_filter:
+            return SearchResults.like(results, results)
+        return SearchResults.like(
+            results,
+            [result for result in results if path_pattern.matches(result['file_path'])][:limit]
+        )
+    
+    async def _enhance_search_results(self, results: List[Dict[str, Any]]) -> SearchResults:
+        """Enhance a result list, keeping its partial-results information"""
+        enhanced_results = SearchResults.like(results)
+        for result in results:
+            enhanced_results.append(await self._enhance_search_result(result))
+        return enhanced_results
+    
     async def search_by_code_similarity(
         self,
         code_snippet: str,
@@ -122,6 +1091,9 @@ class CodeSearcher:
         # Perform search
         try:
             if collection_name:
+                collection_name, filter_conditions = self.qdrant.resolve_scope(
+                    collection_name, filter_conditions
+                )
                 results = await self.qdrant.search_similar(
                     collection_name=collection_name,
                     query_vector=query_embedding,
@@ -139,12 +1111,7 @@ class CodeSearcher:
                 )
             
             # Enhance results
-            enhanced_results = []
-            for result in results:
-                enhanced_result = await self._enhance_search_result(result)
-                enhanced_results.append(enhanced_result)
-            
-            return enhanced_results
+            return await self._enhance_search_results(results)
             
         except Exception as e:
             logger.error(f"Code similarity search failed: {str(e)}")
@@ -187,28 +1154,202 @@ class CodeSearcher:
         file_path: str,
         function_name: Optional[str] = None,
         collection_name: Optional[str] = None,
-        limit: int = 5
+        limit: int = 5,
+        similarity_threshold: float = 0.5,
+        deadline: Optional[Deadline] = None
     ) -> List[Dict[str, Any]]:
-        """Find code related to a specific file or function"""
+        """Find code related to a specific file or function
         
-        # Create a query based on file path and function name
-        query_parts = [f"file {file_path}"]
+        The stored chunks of the file (or function) are looked up by payload
+        and used as recommendation examples, so no query is embedded; the
+        chunks themselves are excluded from the results. With a collection
+        that has a code graph, callers, callees, importers and imports of
+        the source are boosted and tagged with ``graph_relation``. The source
+        lookup and the recommendation share ``deadline`` (default:
+        ``search_deadline_ms``); if it runs out, no results are returned and
+        the deadline report says which stage it cut short.
+        """
+        deadline = deadline or self.start_deadline()
+        conditions = [FieldCondition(key="filePath", match=MatchValue(value=file_path))]
         if function_name:
-            query_parts.append(f"function {function_name}")
+            conditions.append(FieldCondition(key="functionName", match=MatchValue(value=function_name)))
+        source_filter = Filter(must=conditions)
+        
+        try:
+            if collection_name:
+                target_collection, scoped_source_filter = self.qdrant.resolve_scope(
+                    collection_name, source_filter
+                )
+                source_points, _ = await deadline.run(self.qdrant.scroll_points(
+                    target_collection,
+                    filter_conditions=scoped_source_filter,
+                    limit=self.RELATED_SOURCE_LIMIT,
+                    with_payload=False
+                ), "source lookup")
+                source_ids = [point.id for point in source_points]
+                if not source_ids:
+                    return SearchResults()
+                
+                _, scope_filter = self.qdrant.resolve_scope(collection_name)
+                graph = CodeGraph.load(self.config.index_state_dir, collection_name)
+                neighbours = graph.neighbours(file_path, function_name) if graph else {}
+                results = await deadline.run(self.qdrant.recommend_similar(
+                    collection_name=target_collection,
+                    positive=source_ids,
+                    limit=limit * self.GRAPH_CANDIDATE_FACTOR if neighbours else limit,
+                    score_threshold=similarity_threshold,
+                    filter_conditions=scope_filter,
+                    exclude_ids=source_ids
+                ), "recommend")
+                if neighbours:
+                    results = self._boost_graph_neighbours(results, neighbours, limit)
+            else:
+                # IDs are per collection, so the stored vectors are the examples
+                source_points = await deadline.run(self.qdrant.find_points_across_collections(
+                    source_filter,
+                    collection_prefix=self.config.collection_prefix,
+                    limit=self.RELATED_SOURCE_LIMIT,
+                    with_vectors=True
+                ), "source lookup")
+                source_vectors = [
+                    self.qdrant.dense_vector(point.vector) for point in source_points
+                    if self.qdrant.dense_vector(point.vector)
+                ]
+                if not source_vectors:
+                    return SearchResults()
+                
+                results = await deadline.run(self.qdrant.recommend_across_collections(
+                    positive_vectors=source_vectors,
+                    collection_prefix=self.config.collection_prefix,
+                    limit=limit,
+                    score_threshold=similarity_threshold,
+                    exclude_ids=[point.id for point in source_points]
+                ), "recommend")
+            
+            results = await self._enhance_search_results(results)
+            results.deadline = deadline.report()
+            return results
+            
+        except DeadlineExceeded:
+            logger.warning("Related code lookup ran past the search deadline")
+            return SearchResults(deadline=deadline.report())
+        except Exception as e:
+            logger.error(f"Related code lookup failed: {str(e)}")
+            raise
+    
+    def _boost_graph_neighbours(
+        self,
+        results: SearchResults,
+        neighbours: Dict[str, str],
+        limit: int
+    ) -> SearchResults:
+        """Raise results from files adjacent in the code graph and keep the best ``limit``"""
+        for result in results:
+            relation = neighbours.get(result.get('file_path'))
+            if relation:
+                result['graph_relation'] = relation
+                result['score'] = (result.get('score') or 0.0) + self.GRAPH_BOOST
+        ranked = sorted(results, key=lambda result: -(result.get('score') or 0.0))
+        return SearchResults.like(results, ranked[:limit])
+    
+    def _graphs(self, collection_name: Optional[str]) -> List[CodeGraph]:
+        """Code graphs of one index, or of every index that has one"""
+        state_dir = self.config.index_state_dir
+        index_names = [collection_name] if collection_name else CodeGraph.list_indexes(state_dir)
+        graphs = [
+            graph for graph in (CodeGraph.load(state_dir, index_name) for index_name in index_names)
+            if graph is not None
+        ]
+        if collection_name and not graphs:
+            raise ValueError(f"No code graph for '{collection_name}'; re-index or update it to build one")
+        return graphs
+    
+    def callers_of(
+        self,
+        name: str,
+        collection_name: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Call sites of a function or method, from the local code graphs
         
-        query = " ".join(query_parts)
+        Calls are matched by the called name, so ``Class.method`` finds every
+        call of ``method``. Uses no embeddings or Qdrant calls.
+        """
+        results = []
+        for graph in self._graphs(collection_name):
+            results.extend(graph.callers_of(name, limit - len(results)))
+            if len(results) >= limit:
+                break
+        return results
+    
+    def callees_of(
+        self,
+        name: str,
+        collection_name: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Functions called by a definition and where the index defines them"""
+        results = []
+        for graph in self._graphs(collection_name):
+            results.extend(graph.callees_of(name, limit - len(results)))
+            if len(results) >= limit:
+                break
+        return results
+    
+    def dependents_of(
+        self,
+        target: str,
+        collection_name: Optional[str] = None,
+        depth: int = 1,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Files importing a file path or dotted module, up to ``depth`` import hops away"""
+        results = []
+        for graph in self._graphs(collection_name):
+            results.extend(graph.dependents_of(target, depth, limit - len(results)))
+            if len(results) >= limit:
+                break
+        return results
+    
+    async def find_duplicates(
+        self,
+        collection_name: str,
+        similarity_threshold: float = 0.95,
+        restart: bool = False
+    ) -> DuplicateJob:
+        """Start or resume a near-duplicate scan of an index and return its job
         
-        # Search with lower similarity threshold to find related code
-        return await self.search(
-            query=query,
-            collection_name=collection_name,
-            limit=limit,
-            similarity_threshold=0.5
-        )
+        The scan runs in the background on the stored vectors; call again
+        to follow its progress and read the clusters once it is done.
+        """
+        return await self.duplicates.start(collection_name, similarity_threshold, restart)
+    
+    def find_symbol(
+        self,
+        name: str,
+        collection_name: Optional[str] = None,
+        match: str = "auto",
+        kind: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Look up function, method and class definitions in the local symbol tables
+        
+        Uses no embeddings or Qdrant calls. Without ``collection_name`` every
+        index with a symbol table is searched.
+        """
+        state_dir = self.config.index_state_dir
+        index_names = [collection_name] if collection_name else SymbolIndex.list_indexes(state_dir)
+        tables = [
+            table for table in (SymbolIndex.load(state_dir, index_name) for index_name in index_names)
+            if table is not None
+        ]
+        if collection_name and not tables:
+            raise ValueError(f"No symbol table for '{collection_name}'; re-index it to build one")
+        return lookup_symbols(tables, name, match, kind, limit)
     
     def _create_search_filter(
         self,
-        file_pattern: Optional[str] = None,
+        path_pattern: Optional[PathPattern] = None,
         language: Optional[str] = None,
         chunk_type: Optional[str] = None,
         function_name: Optional[str] = None,
@@ -217,25 +1358,8 @@ class CodeSearcher:
         """Create filter conditions for search"""
         conditions = []
         
-        if file_pattern:
-            if '*' in file_pattern:
-                # For glob patterns, we'll do a simple contains match
-                # This could be enhanced with proper regex support
-                pattern = file_pattern.replace('*', '')
-                if pattern:
-                    conditions.append(
-                        FieldCondition(
-                            key="filePath",
-                            match=MatchValue(value=pattern)
-                        )
-                    )
-            else:
-                conditions.append(
-                    FieldCondition(
-                        key="filePath",
-                        match=MatchValue(value=file_pattern)
-                    )
-                )
+        if path_pattern:
+            conditions.extend(path_pattern.conditions)
         
         if language:
             conditions.append(
@@ -284,69 +1408,31 @@ class CodeSearcher:
             file_ext = file_path.split('.')[-1] if '.' in file_path else ''
             enhanced['file_extension'] = file_ext
         
-        # Format the code chunk for display
-        if 'code_chunk' in enhanced:
-            enhanced['formatted_code'] = self._format_code_for_display(
-                enhanced['code_chunk'],
-                enhanced.get('language', ''),
-                enhanced.get('start_line', 1)
-            )
-        
         # Add relative score (0-100)
-        if 'score' in enhanced:
+        if enhanced.get('score') is not None:
             enhanced['score_percentage'] = min(100, int(enhanced['score'] * 100))
         
-        # Extract snippet for preview
-        if 'code_chunk' in enhanced:
-            enhanced['preview'] = self._create_code_preview(enhanced['code_chunk'])
-        
         return enhanced
     
-    def _format_code_for_display(self, code: str, language: str, start_line: int) -> str:
-        """Format code for display with line numbers"""
-        lines = code.split('\n')
-        formatted_lines = []
-        
-        for i, line in enumerate(lines):
-            line_num = start_line + i
-            formatted_lines.append(f"{line_num:4d} | {line}")
-        
-        return '\n'.join(formatted_lines)
-    
-    def _create_code_preview(self, code: str, max_length: int = 200) -> str:
-        """Create a short preview of the code"""
-        if len(code) <= max_length:
-            return code
-        
-        # Try to break at a good point (end of line)
-        preview = code[:max_length]
-        last_newline = preview.rfind('\n')
-        
-        if last_newline > max_length * 0.7:  # If we can find a reasonable break point
-            preview = preview[:last_newline]
-        
-        return preview + "..."
-    
-    async def get_search_suggestions(self, partial_query: str, limit: int = 5) -> List[str]:
-        """Get search suggestions based on partial query"""
-        # This could be enhanced with more sophisticated suggestion logic
-        # For now, return some common programming concepts
-        suggestions = []
-        
-        partial_lower = partial_query.lower()
-        
-        common_terms = [
-            "function definition", "class declaration", "method implementation",
-            "error handling", "data validation", "API endpoint", "database query",
-            "authentication", "authorization", "configuration", "utility function",
-            "test case", "mock object", "dependency injection", "design pattern",
-            "algorithm implementation", "data structure", "recursion", "iteration"
-        ]
+    async def get_search_suggestions(
+        self,
+        partial_query: str,
+        limit: int = 5,
+        collection_name: Optional[str] = None
+    ) -> List[str]:
+        """Complete the last word of a partial query from indexed identifiers and file paths
         
-        for term in common_terms:
-            if partial_lower in term.lower() or term.lower().startswith(partial_lower):
-                suggestions.append(term)
-                if len(suggestions) >= limit:
-                    break
+        Completions come from the symbol tables' prefix indexes, ranked by
+        the number of files each term appears in; no Qdrant call is made.
+        """
+        head, _, prefix = partial_query.rpartition(" ")
+        if not prefix:
+            return []
         
-        return suggestions
\ No newline at end of file
+        state_dir = self.config.index_state_dir
+        index_names = [collection_name] if collection_name else SymbolIndex.list_indexes(state_dir)
+        tables = [SymbolIndex.load(state_dir, index_name) for index_name in index_names]
+        completions = merge_completions(
+            [table.suggestions for table in tables if table is not None], prefix, limit
+        )
+        return [f"{head} {completion}" if head else completion for completion in completions]
\ No newline at end of file
@@ -10,6 +10,8 @@ class Config(BaseModel):
     # Qdrant connection settings
     qdrant_url: str = Field(default="http://localhost:6333", description="Qdrant server URL")
     qdrant_api_key: Optional[str] = Field(default=None, description="Qdrant API key")
+    qdrant_mode: str = Field(default="server", description="Vector store: server (QDRANT_URL), local (embedded, on disk) or memory (embedded, not persisted)")
+    qdrant_path: str = Field(default="~/.cache/mcp-qdrant-code-search/qdrant", description="Storage directory for the embedded local mode")
     
     # Embedding settings
     embedding_model: str = Field(default="openai/text-embedding-3-large", description="Embedding model to use")
@@ -17,16 +19,45 @@ class Config(BaseModel):
     
     # Collection settings
     collection_prefix: str = Field(default="claude-code", description="Collection name prefix")
+    collection_layout: str = Field(default="per_repo", description="Collection layout: per_repo or shared (one multi-tenant collection)")
     vector_size: int = Field(default=3072, description="Vector size for embeddings")
+    signature_vector_size: Optional[int] = Field(default=None, description="Size of the named signature vector of new collections (0 disables it, None picks one by model)")
+    collection_cache_ttl: float = Field(default=30.0, description="Seconds to cache the collection catalog")
+    storage_profile: str = Field(default="balanced", description="Storage profile for new collections (latency, balanced, memory)")
     
     # Indexing settings
     chunk_size: int = Field(default=1000, description="Maximum tokens per chunk")
     chunk_overlap: int = Field(default=100, description="Token overlap between chunks")
     batch_size: int = Field(default=100, description="Batch size for processing")
+    index_state_dir: str = Field(default="~/.cache/mcp-qdrant-code-search", description="Directory for index manifests and local index state")
+    index_keep_generations: int = Field(default=1, description="Previous index generations kept after a rebuild")
     
     # Search settings
     search_limit: int = Field(default=10, description="Maximum search results")
     similarity_threshold: float = Field(default=0.7, description="Minimum similarity score")
+    search_mode: str = Field(default="dense", description="Default search mode: dense, hybrid (dense + lexical sparse, fused with RRF) or two_stage (top files first, then their chunks)")
+    two_stage_files: int = Field(default=20, description="Files picked by the coarse stage of two_stage search")
+    query_route: str = Field(default="auto", description="Query routing: auto (symbol/path/regex queries skip vector search) or vector (always vector search)")
+    search_concurrency: int = Field(default=8, description="Maximum collections searched concurrently")
+    collection_search_timeout: float = Field(default=5.0, description="Per-collection search timeout in seconds")
+    search_deadline_ms: float = Field(default=10000.0, description="Time budget of a search in milliseconds; when it runs out the best partial results are returned (0 disables it)")
+    hnsw_ef: Optional[int] = Field(default=None, description="HNSW ef used at search time (None uses the collection default)")
+    search_cache_mb: float = Field(default=64.0, description="Memory bound of the search result cache in MB (0 disables it)")
+    search_cache_ttl: float = Field(default=300.0, description="Seconds a cached search result may be served")
+    response_mode: str = Field(default="full", description="Search response format: full (every code body) or compact (token-budgeted)")
+    response_token_budget: int = Field(default=2000, description="Approximate token budget of a compact search response")
+    search_diversity: str = Field(default="none", description="Default result diversification: none, mmr or file (one result per file)")
+    mmr_lambda: float = Field(default=0.5, description="MMR trade-off between relevance (1.0) and diversity (0.0)")
+    
+    # Rerank settings
+    rerank_model: Optional[str] = Field(default=None, description="Cross-encoder model for reranking (None disables reranking)")
+    rerank_top_n: int = Field(default=20, description="Vector candidates passed to the reranker")
+    rerank_budget_ms: float = Field(default=200.0, description="Rerank time budget in milliseconds before falling back to vector order")
+    rerank_batch_size: int = Field(default=8, description="Candidates scored per cross-encoder batch")
+    
+    # Scheduling settings
+    interactive_concurrency: int = Field(default=8, description="Searches and lookups run at once; more wait in a queue")
+    background_concurrency: int = Field(default=1, description="Index, import and export jobs run at once; more wait in a queue")
     
     @classmethod
     def from_env(cls) -> "Config":
@@ -34,13 +65,40 @@ class Config(BaseModel):
         return cls(
             qdrant_url=os.getenv("QDRANT_URL", "http://localhost:6333"),
             qdrant_api_key=os.getenv("QDRANT_API_KEY"),
+            qdrant_mode=os.getenv("QDRANT_MODE", "server"),
+            qdrant_path=os.getenv("QDRANT_PATH", "~/.cache/mcp-qdrant-code-search/qdrant"),
             embedding_model=os.getenv("EMBEDDING_MODEL", "openai/text-embedding-3-large"),
             openai_api_key=os.getenv("OPENAI_API_KEY"),
             collection_prefix=os.getenv("COLLECTION_PREFIX", "claude-code"),
+            collection_layout=os.getenv("COLLECTION_LAYOUT", "per_repo"),
             vector_size=int(os.getenv("VECTOR_SIZE", "3072")),
+            signature_vector_size=int(os.getenv("SIGNATURE_VECTOR_SIZE")) if os.getenv("SIGNATURE_VECTOR_SIZE") else None,
+            collection_cache_ttl=float(os.getenv("COLLECTION_CACHE_TTL", "30")),
+            storage_profile=os.getenv("STORAGE_PROFILE", "balanced"),
             chunk_size=int(os.getenv("CHUNK_SIZE", "1000")),
             chunk_overlap=int(os.getenv("CHUNK_OVERLAP", "100")),
             batch_size=int(os.getenv("BATCH_SIZE", "100")),
+            index_state_dir=os.getenv("INDEX_STATE_DIR", "~/.cache/mcp-qdrant-code-search"),
+            index_keep_generations=int(os.getenv("INDEX_KEEP_GENERATIONS", "1")),
             search_limit=int(os.getenv("SEARCH_LIMIT", "10")),
             similarity_threshold=float(os.getenv("SIMILARITY_THRESHOLD", "0.7")),
+            search_mode=os.getenv("SEARCH_MODE", "dense"),
+            two_stage_files=int(os.getenv("TWO_STAGE_FILES", "20")),
+            query_route=os.getenv("QUERY_ROUTE", "auto"),
+            search_concurrency=int(os.getenv("SEARCH_CONCURRENCY", "8")),
+            collection_search_timeout=float(os.getenv("COLLECTION_SEARCH_TIMEOUT", "5")),
+            search_deadline_ms=float(os.getenv("SEARCH_DEADLINE_MS", "10000")),
+            hnsw_ef=int(os.getenv("HNSW_EF")) if os.getenv("HNSW_EF") else None,
+            search_cache_mb=float(os.getenv("SEARCH_CACHE_MB", "64")),
+            search_cache_ttl=float(os.getenv("SEARCH_CACHE_TTL", "300")),
+            response_mode=os.getenv("RESPONSE_MODE", "full"),
+            response_token_budget=int(os.getenv("RESPONSE_TOKEN_BUDGET", "2000")),
+            search_diversity=os.getenv("SEARCH_DIVERSITY", "none"),
+            mmr_lambda=float(os.getenv("MMR_LAMBDA", "0.5")),
+            rerank_model=os.getenv("RERANK_MODEL") or None,
+            rerank_top_n=int(os.getenv("RERANK_TOP_N", "20")),
+            rerank_budget_ms=float(os.getenv("RERANK_BUDGET_MS", "200")),
+            rerank_batch_size=int(os.getenv("RERANK_BATCH_SIZE", "8")),
+            interactive_concurrency=int(os.getenv("INTERACTIVE_CONCURRENCY", "8")),
+            background_concurrency=int(os.getenv("BACKGROUND_CONCURRENCY", "1")),
         )
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""Request deadlines shared by the stages of a search"""
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, List, Optional
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """A stage ran out of the time left before its request's deadline"""
+    
+    def __init__(self, stage: str):
+        super().__init__(f"{stage} ran past the search deadline")
+        self.stage = stage
+
+
+class Deadline:
+    """Time budget of one request, handed to every stage it awaits
+    
+    Stages await through ``run``, which times them out once the budget less
+    ``reserve_ms`` is spent. The reserve is kept back for a cheaper fallback
+    and for assembling a response from what was gathered, so a request
+    answers within its budget with partial results instead of failing. A
+    fallback calls ``release_reserve`` to spend it. A budget of 0 never
+    expires.
+    """
+    
+    def __init__(self, budget_ms: float, reserve_ms: float = 0.0):
+        self.budget_ms = budget_ms
+        self.reserve_ms = reserve_ms
+        self.start = time.perf_counter()
+        self.exceeded: List[str] = []
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether the request has a budget at all"""
+        return self.budget_ms > 0
+    
+    def elapsed_ms(self) -> float:
+        """Milliseconds since the request started"""
+        return (time.perf_counter() - self.start) * 1000
+    
+    def remaining(self) -> Optional[float]:
+        """Seconds a stage may still take, or None without a budget"""
+        if not self.enabled:
+            return None
+        return max(0.0, (self.budget_ms - self.reserve_ms - self.elapsed_ms()) / 1000)
+    
+    def release_reserve(self) -> None:
+        """Let the remaining stages spend the reserve"""
+        self.reserve_ms = 0.0
+    
+    def cap(self, timeout: float) -> float:
+        """The smaller of a stage's own timeout and the time left"""
+        remaining = self.remaining()
+        return timeout if remaining is None else min(timeout, remaining)
+    
+    async def run(self, awaitable: Awaitable[Any], stage: str) -> Any:
+        """Await a stage, raising ``DeadlineExceeded`` when it runs out of time"""
+        remaining = self.remaining()
+        if remaining is None:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, timeout=remaining)
+        except asyncio.TimeoutError:
+            self.mark_exceeded(stage)
+            raise DeadlineExceeded(stage) from None
+    
+    def mark_exceeded(self, stage: str) -> None:
+        """Record a stage that ran out of time, once"""
+        if stage not in self.exceeded:
+            self.exceeded.append(stage)
+    
+    def report(self) -> Optional[Dict[str, Any]]:
+        """Budget, elapsed time and the stages that ran out of time"""
+        if not self.enabled:
+            return None
+        return {
+            "budget_ms": self.budget_ms,
+            "elapsed_ms": round(self.elapsed_ms(), 1),
+            "exceeded": list(self.exceeded),
+        }
@@ -0,0 +1,112 @@
+"""Result diversification: merging overlapping chunks and maximal marginal relevance"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+DIVERSITY_MODES = ("none", "mmr", "file")
+
+
+def _line_map(result: Dict[str, Any]) -> Optional[Dict[int, str]]:
+    """Map line numbers to the code lines of a result, if its code covers its span exactly"""
+    lines = result.get('code_chunk', '').split('\n')
+    start, end = result.get('start_line', 0), result.get('end_line', 0)
+    if len(lines) != end - start + 1:
+        return None
+    return dict(zip(range(start, end + 1), lines))
+
+
+def _spans_touch(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    """Whether two results of the same file overlap or are adjacent"""
+    return a['start_line'] <= b['end_line'] + 1 and b['start_line'] <= a['end_line'] + 1
+
+
+def _absorb(kept: Dict[str, Any], other: Dict[str, Any]) -> None:
+    """Fold a lower-ranked overlapping result into a kept one"""
+    start = min(kept['start_line'], other['start_line'])
+    end = max(kept['end_line'], other['end_line'])
+    if other['start_line'] <= kept['start_line'] and other['end_line'] >= kept['end_line']:
+        # The other chunk encloses the kept one (a class around its method)
+        code = other['code_chunk']
+        for field in ('chunk_type', 'function_name', 'class_name'):
+            kept[field] = other.get(field, kept.get(field))
+    elif kept['start_line'] <= other['start_line'] and kept['end_line'] >= other['end_line']:
+        code = kept['code_chunk']
+    else:
+        kept_lines, other_lines = _line_map(kept), _line_map(other)
+        if kept_lines is None or other_lines is None:
+            # Code does not line up with its span, so it cannot be stitched
+            kept['merged_count'] = kept.get('merged_count', 1) + other.get('merged_count', 1)
+            return
+        lines = {**other_lines, **kept_lines}
+        code = '\n'.join(lines[line] for line in range(start, end + 1))
+    
+    kept.update(start_line=start, end_line=end, code_chunk=code)
+    if kept.get('payload'):
+        kept['payload'] = dict(kept['payload'], startLine=start, endLine=end, codeChunk=code)
+    kept['merged_count'] = kept.get('merged_count', 1) + other.get('merged_count', 1)
+
+
+def merge_overlapping_spans(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge results whose line spans in the same file overlap or touch
+    
+    Results are visited in rank order; a result that overlaps an earlier one
+    is folded into it, so the merged result keeps the better score and rank
+    and covers the union of the spans. ``merged_count`` records how many
+    chunks a result stands for.
+    """
+    merged: List[Dict[str, Any]] = []
+    by_file: Dict[Any, List[Dict[str, Any]]] = {}
+    for result in results:
+        key = (result.get('collection'), result.get('file_path'))
+        kept_in_file = by_file.setdefault(key, [])
+        target = next((kept for kept in kept_in_file if _spans_touch(kept, result)), None)
+        if target is None:
+            result = dict(result)
+            kept_in_file.append(result)
+            merged.append(result)
+        else:
+            _absorb(target, result)
+            # The grown span may now reach results kept earlier
+            for kept in [kept for kept in kept_in_file if kept is not target and _spans_touch(kept, target)]:
+                _absorb(target, kept)
+                kept_in_file.remove(kept)
+                merged.remove(kept)
+    return merged
+
+
+def mmr_select(results: List[Dict[str, Any]], k: int, diversity_lambda: float) -> List[Dict[str, Any]]:
+    """Pick ``k`` results by maximal marginal relevance
+    
+    Each step takes the candidate maximising
+    ``lambda * relevance - (1 - lambda) * max similarity to those already picked``.
+    Relevance is the search score rescaled to [0, 1], so rank-fused hybrid
+    scores work too; similarity is the cosine of the results' ``vector``.
+    Results without a vector are treated as dissimilar to everything.
+    """
+    if len(results) <= 1 or k <= 0:
+        return results[:k]
+    
+    scores = np.array([result.get('score') or 0.0 for result in results], dtype=np.float32)
+    spread = scores.max() - scores.min()
+    relevance = (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+    
+    dimension = next((len(result['vector']) for result in results if result.get('vector')), 0)
+    vectors = np.zeros((len(results), max(dimension, 1)), dtype=np.float32)
+    for i, result in enumerate(results):
+        if result.get('vector'):
+            vectors[i] = result['vector']
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    
+    selected = [int(np.argmax(relevance))]
+    max_similarity = vectors @ vectors[selected[0]]
+    remaining = np.ones(len(results), dtype=bool)
+    remaining[selected[0]] = False
+    while len(selected) < min(k, len(results)):
+        marginal = diversity_lambda * relevance - (1 - diversity_lambda) * max_similarity
+        marginal[~remaining] = -np.inf
+        best = int(np.argmax(marginal))
+        selected.append(best)
+        remaining[best] = False
+        max_similarity = np.maximum(max_similarity, vectors @ vectors[best])
+    return [results[i] for i in selected]
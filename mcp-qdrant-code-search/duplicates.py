@@ -0,0 +1,369 @@
+"""Near-duplicate code detection by a batched vector self-join"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from config import Config
+from qdrant_service import QdrantService
+from scheduler import RequestScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class UnionFind:
+    """Disjoint sets over hashable items, with path halving and union by size"""
+    
+    def __init__(self):
+        self.parent: Dict[Any, Any] = {}
+        self.size: Dict[Any, int] = {}
+    
+    def find(self, item: Any) -> Any:
+        """Representative of the set holding an item, adding it if new"""
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+            return item
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+    
+    def union(self, a: Any, b: Any) -> None:
+        """Merge the sets holding two items"""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+    
+    def groups(self) -> List[List[Any]]:
+        """All sets with more than one item"""
+        groups: Dict[Any, List[Any]] = {}
+        for item in self.parent:
+            groups.setdefault(self.find(item), []).append(item)
+        return [members for members in groups.values() if len(members) > 1]
+
+
+class DuplicateJob:
+    """Checkpointed state of one duplicate scan, stored as JSON on disk
+    
+    ``offset`` is the scroll offset of the next page of points to query, so
+    a job interrupted by a restart resumes where it stopped. ``pairs`` maps
+    ``"<id>|<id>"`` to the best similarity seen for that pair and ``members``
+    holds the span of every point that is part of a pair.
+    
+    ``checkpoint`` appends the pairs found since the last checkpoint and the
+    new offset to a page log next to the job file, so a page costs one short
+    line rather than a rewrite of every pair found so far. ``save`` writes
+    the whole job and folds the log in; ``load`` replays it.
+    """
+    
+    VERSION = 2
+    
+    def __init__(
+        self,
+        index_name: str,
+        collection_name: str,
+        similarity_threshold: float,
+        status: str = "running",
+        offset: Optional[Any] = None,
+        processed: int = 0,
+        total: int = 0,
+        pairs: Optional[Dict[str, float]] = None,
+        members: Optional[Dict[str, List[Any]]] = None,
+        error: Optional[str] = None,
+        started_at: Optional[float] = None,
+        updated_at: Optional[float] = None
+    ):
+        self.index_name = index_name
+        self.collection_name = collection_name  # physical collection the offsets belong to
+        self.similarity_threshold = similarity_threshold
+        self.status = status  # running, done or failed
+        self.offset = offset
+        self.processed = processed
+        self.total = total
+        self.pairs = pairs or {}
+        self.members = members or {}  # id -> [file path, start line, end line, name]
+        self.error = error
+        self.started_at = started_at or time.time()
+        self.updated_at = updated_at
+        self._new_pairs: Dict[str, float] = {}
+        self._new_members: Dict[str, List[Any]] = {}
+    
+    @staticmethod
+    def path_for(state_dir: str, index_name: str) -> str:
+        """Get the job file path for an index"""
+        return os.path.join(os.path.expanduser(state_dir), f"{index_name}.duplicates.json")
+    
+    @staticmethod
+    def log_path_for(state_dir: str, index_name: str) -> str:
+        """Get the page log path for an index"""
+        return os.path.join(os.path.expanduser(state_dir), f"{index_name}.duplicates.log")
+    
+    def add_pair(self, key: str, score: float, spans: Dict[str, List[Any]]) -> None:
+        """Record a pair with the spans of its members, keeping its best score"""
+        score = max(self.pairs.get(key, 0.0), score)
+        self.pairs[key] = self._new_pairs[key] = score
+        self.members.update(spans)
+        self._new_members.update(spans)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the job"""
+        return {
+            "version": self.VERSION,
+            "index_name": self.index_name,
+            "collection_name": self.collection_name,
+            "similarity_threshold": self.similarity_threshold,
+            "status": self.status,
+            "offset": self.offset,
+            "processed": self.processed,
+            "total": self.total,
+            "pairs": self.pairs,
+            "members": self.members,
+            "error": self.error,
+            "started_at": self.started_at,
+            "updated_at": self.updated_at,
+        }
+    
+    def save(self, state_dir: str) -> str:
+        """Atomically write the whole job to the state directory, replacing the page log"""
+        self.updated_at = time.time()
+        path = self.path_for(state_dir, self.index_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        log_path = self.log_path_for(state_dir, self.index_name)
+        if os.path.exists(log_path):
+            os.remove(log_path)
+        self._new_pairs, self._new_members = {}, {}
+        return path
+    
+    def checkpoint(self, state_dir: str) -> None:
+        """Append the progress and pairs since the last checkpoint to the page log"""
+        self.updated_at = time.time()
+        entry = {
+            "offset": self.offset,
+            "processed": self.processed,
+            "updated_at": self.updated_at,
+            "pairs": self._new_pairs,
+            "members": self._new_members,
+        }
+        with open(self.log_path_for(state_dir, self.index_name), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+        self._new_pairs, self._new_members = {}, {}
+    
+    def _replay_log(self, state_dir: str) -> None:
+        """Apply the checkpoints appended since the job was last saved whole"""
+        log_path = self.log_path_for(state_dir, self.index_name)
+        if not os.path.exists(log_path):
+            return
+        with open(log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn by an interrupted write; that page is scanned again
+                    break
+                self.offset = entry["offset"]
+                self.processed = entry["processed"]
+                self.updated_at = entry["updated_at"]
+                for key, score in entry["pairs"].items():
+                    self.pairs[key] = max(self.pairs.get(key, 0.0), score)
+                self.members.update(entry["members"])
+    
+    @classmethod
+    def load(cls, state_dir: str, index_name: str) -> Optional["DuplicateJob"]:
+        """Load the job checkpoint of an index, if any"""
+        path = cls.path_for(state_dir, index_name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable duplicate job {path}: {str(e)}")
+            return None
+        if data.get("version") != cls.VERSION:
+            return None
+        data.pop("version")
+        job = cls(**data)
+        job._replay_log(state_dir)
+        return job
+    
+    @classmethod
+    def delete(cls, state_dir: str, index_name: str) -> None:
+        """Remove the job checkpoint and page log of an index"""
+        for path in (cls.path_for(state_dir, index_name), cls.log_path_for(state_dir, index_name)):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def clusters(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Group the pairs into clusters of mutually similar chunks, largest first"""
+        union_find = UnionFind()
+        for key in self.pairs:
+            union_find.union(*key.split("|"))
+        best: Dict[Any, float] = {}
+        for key, score in self.pairs.items():
+            root = union_find.find(key.split("|")[0])
+            best[root] = max(best.get(root, 0.0), score)
+        
+        clusters = []
+        for members in union_find.groups():
+            spans = sorted(self.members[point_id] for point_id in members if point_id in self.members)
+            clusters.append({
+                "size": len(members),
+                "files": len({span[0] for span in spans}),
+                "max_similarity": best[union_find.find(members[0])],
+                "members": [
+                    {"file_path": span[0], "start_line": span[1], "end_line": span[2], "name": span[3]}
+                    for span in spans
+                ],
+            })
+        clusters.sort(key=lambda cluster: (-cluster["size"], -cluster["max_similarity"]))
+        return clusters[:limit]
+
+
+class DuplicateFinder:
+    """Runs duplicate scans of indexes as resumable background jobs
+    
+    Each page of stored vectors is scrolled once and sent back as one batch
+    of nearest-neighbour queries above the similarity threshold, so a scan
+    costs one Qdrant round trip per page and no embeddings. Chunks that
+    overlap in the same file (a class and its methods) are not pairs. Every
+    page appends a checkpoint to the job's page log, and with a scheduler
+    each page waits for running searches first.
+    """
+    
+    # Neighbours fetched per chunk; larger clusters still form transitively
+    NEIGHBOURS = 10
+    
+    # Payload fields kept for the spans of reported chunks
+    PAYLOAD_FIELDS = ["filePath", "startLine", "endLine", "functionName", "className"]
+    
+    def __init__(
+        self,
+        config: Config,
+        qdrant_service: QdrantService,
+        scheduler: Optional[RequestScheduler] = None
+    ):
+        self.config = config
+        self.qdrant = qdrant_service
+        self.scheduler = scheduler
+        self._tasks: Dict[str, asyncio.Task] = {}
+    
+    def is_running(self, index_name: str) -> bool:
+        """Whether a scan of an index is running in this process"""
+        task = self._tasks.get(index_name)
+        return task is not None and not task.done()
+    
+    async def start(
+        self,
+        index_name: str,
+        similarity_threshold: float = 0.95,
+        restart: bool = False
+    ) -> DuplicateJob:
+        """Start, resume or report the duplicate scan of an index
+        
+        A finished scan with the same threshold is returned as is unless
+        ``restart`` is set. An unfinished checkpoint is resumed in the
+        background, unless the index was rebuilt since, in which case the
+        scan starts over.
+        """
+        state_dir = self.config.index_state_dir
+        job = DuplicateJob.load(state_dir, index_name)
+        if self.is_running(index_name):
+            if not restart and job is not None and job.similarity_threshold == similarity_threshold:
+                return job
+            self._tasks[index_name].cancel()
+        
+        source_collection, scope_filter = self.qdrant.resolve_scope(index_name)
+        physical_name = await self.qdrant.resolve_alias(source_collection)
+        if job is not None and not restart and job.similarity_threshold == similarity_threshold \
+                and job.collection_name == physical_name and job.status != "failed":
+            if job.status == "done":
+                return job
+            logger.info(f"Resuming duplicate scan of '{index_name}' at {job.processed} chunks")
+        else:
+            job = DuplicateJob(index_name, physical_name, similarity_threshold)
+            job.total = await self.qdrant.count_points(source_collection, scope_filter)
+            if not job.total:
+                raise ValueError(f"Index '{index_name}' has no indexed chunks")
+            job.save(state_dir)
+        
+        self._tasks[index_name] = asyncio.create_task(self._run(job, source_collection, scope_filter))
+        return job
+    
+    async def _run(self, job: DuplicateJob, source_collection: str, scope_filter: Any) -> DuplicateJob:
+        """Scan the remaining pages of a job, checkpointing after each"""
+        state_dir = self.config.index_state_dir
+        try:
+            while True:
+                if self.scheduler is not None:
+                    await self.scheduler.yield_to_interactive()
+                points, next_offset = await self.qdrant.scroll_points(
+                    source_collection,
+                    filter_conditions=scope_filter,
+                    limit=self.config.batch_size,
+                    offset=job.offset,
+                    with_vectors=True,
+                    with_payload=self.PAYLOAD_FIELDS
+                )
+                vectors = [(point, self.qdrant.dense_vector(point.vector)) for point in points]
+                vectors = [(point, vector) for point, vector in vectors if vector]
+                if vectors:
+                    neighbours = await self.qdrant.search_batch(
+                        collection_name=source_collection,
+                        query_vectors=[vector for _, vector in vectors],
+                        limit=self.NEIGHBOURS + 1,
+                        score_threshold=job.similarity_threshold,
+                        filter_conditions=scope_filter,
+                        with_payload=self.PAYLOAD_FIELDS
+                    )
+                    for (point, _), hits in zip(vectors, neighbours):
+                        self._record_pairs(job, point, hits)
+                
+                job.processed += len(points)
+                job.offset = next_offset
+                if next_offset is None:
+                    job.status = "done"
+                    job.save(state_dir)
+                    logger.info(f"Duplicate scan of '{job.index_name}' found {len(job.pairs)} pairs")
+                    return job
+                job.checkpoint(state_dir)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Duplicate scan of '{job.index_name}' failed: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+            job.save(state_dir)
+            return job
+    
+    @staticmethod
+    def _span(payload: Dict[str, Any]) -> List[Any]:
+        """Reported span of a chunk: file, lines and qualified name"""
+        name = payload.get("functionName") or ""
+        if name and payload.get("className") and payload["className"] != name:
+            name = f"{payload['className']}.{name}"
+        return [payload.get("filePath", ""), payload.get("startLine", 0), payload.get("endLine", 0), name]
+    
+    def _record_pairs(self, job: DuplicateJob, point: Any, hits: List[Dict[str, Any]]) -> None:
+        """Add the near-duplicate pairs of one chunk to a job"""
+        source_id = str(point.id)
+        source_span = self._span(point.payload or {})
+        for hit in hits:
+            hit_id = str(hit['id'])
+            if hit_id == source_id:
+                continue
+            hit_span = self._span(hit.get('payload') or {})
+            if hit_span[0] == source_span[0] and hit_span[1] <= source_span[2] and source_span[1] <= hit_span[2]:
+                continue
+            key = "|".join(sorted((source_id, hit_id)))
+            job.add_pair(key, hit['score'], {source_id: source_span, hit_id: hit_span})
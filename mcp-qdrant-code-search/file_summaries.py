@@ -0,0 +1,64 @@
+"""File-level summary vectors for two-stage (coarse file, fine chunk) search"""
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from qdrant_client.models import PointStruct
+
+
+class FileSummaries:
+    """Accumulates the mean chunk vector of every file of an index
+    
+    Vectors are summed per file as they are embedded, so building the
+    summaries costs no extra embedding calls. Each file becomes one point
+    with a deterministic ID, so updates overwrite it in place.
+    """
+    
+    def __init__(self, index_name: str):
+        self.index_name = index_name
+        self._sums: Dict[str, np.ndarray] = {}
+        self._counts: Dict[str, int] = {}
+        self._languages: Dict[str, Optional[str]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._sums)
+    
+    @staticmethod
+    def point_id(index_name: str, file_path: str) -> str:
+        """Stable point ID of a file's summary"""
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{index_name}:{file_path}"))
+    
+    def add(self, file_path: str, vector: List[float], language: Optional[str] = None) -> None:
+        """Count one chunk vector towards its file's summary"""
+        vector = np.asarray(vector, dtype=np.float32)
+        if file_path in self._sums:
+            self._sums[file_path] += vector
+            self._counts[file_path] += 1
+        else:
+            self._sums[file_path] = vector.copy()
+            self._counts[file_path] = 1
+            self._languages[file_path] = language
+    
+    def add_many(self, entries: Iterable[Tuple[str, List[float], Optional[str]]]) -> None:
+        """Count (file path, vector, language) entries"""
+        for file_path, vector, language in entries:
+            self.add(file_path, vector, language)
+    
+    def points(self) -> List[PointStruct]:
+        """One point per file holding its normalised mean chunk vector"""
+        points = []
+        for file_path, total in self._sums.items():
+            norm = float(np.linalg.norm(total))
+            if norm == 0:
+                continue
+            points.append(PointStruct(
+                id=self.point_id(self.index_name, file_path),
+                vector=(total / norm).tolist(),
+                payload={
+                    "repo": self.index_name,
+                    "filePath": file_path,
+                    "language": self._languages.get(file_path),
+                    "chunkCount": self._counts[file_path],
+                }
+            ))
+        return points
@@ -0,0 +1,114 @@
+"""Per-index manifest of indexed files for incremental updates"""
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class IndexManifest:
+    """Content hashes of every file in an index, stored as JSON on disk
+    
+    The manifest lets ``CodeIndexer.update_index`` re-embed only files whose
+    content changed, and travels with exported snapshots so an imported index
+    can be brought up to date the same way.
+    """
+    
+    VERSION = 1
+    
+    def __init__(
+        self,
+        index_name: str,
+        root_path: Optional[str] = None,
+        files: Optional[Dict[str, str]] = None,
+        file_patterns: Optional[List[str]] = None,
+        exclude_patterns: Optional[List[str]] = None,
+        embedding_model: Optional[str] = None,
+        vector_size: Optional[int] = None,
+        updated_at: Optional[int] = None
+    ):
+        self.index_name = index_name
+        self.root_path = root_path
+        self.files = files or {}  # relative path -> content hash
+        self.file_patterns = file_patterns
+        self.exclude_patterns = exclude_patterns
+        self.embedding_model = embedding_model
+        self.vector_size = vector_size
+        self.updated_at = updated_at
+    
+    @staticmethod
+    def path_for(state_dir: str, index_name: str) -> str:
+        """Get the manifest file path for an index"""
+        return os.path.join(os.path.expanduser(state_dir), f"{index_name}.manifest.json")
+    
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """Hash the raw content of a file"""
+        digest = hashlib.md5()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 16), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the manifest"""
+        return {
+            "version": self.VERSION,
+            "index_name": self.index_name,
+            "root_path": self.root_path,
+            "files": self.files,
+            "file_patterns": self.file_patterns,
+            "exclude_patterns": self.exclude_patterns,
+            "embedding_model": self.embedding_model,
+            "vector_size": self.vector_size,
+            "updated_at": self.updated_at,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IndexManifest":
+        """Deserialize a manifest"""
+        return cls(
+            index_name=data["index_name"],
+            root_path=data.get("root_path"),
+            files=data.get("files") or {},
+            file_patterns=data.get("file_patterns"),
+            exclude_patterns=data.get("exclude_patterns"),
+            embedding_model=data.get("embedding_model"),
+            vector_size=data.get("vector_size"),
+            updated_at=data.get("updated_at"),
+        )
+    
+    @classmethod
+    def load(cls, state_dir: str, index_name: str) -> Optional["IndexManifest"]:
+        """Load the manifest of an index, or None if it has never been written"""
+        manifest_path = cls.path_for(state_dir, index_name)
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return cls.from_dict(json.load(f))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable manifest {manifest_path}: {str(e)}")
+            return None
+    
+    def save(self, state_dir: str) -> str:
+        """Atomically write the manifest to the state directory"""
+        manifest_path = self.path_for(state_dir, self.index_name)
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        self.updated_at = int(time.time())
+        
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, manifest_path)
+        return manifest_path
+    
+    @classmethod
+    def delete(cls, state_dir: str, index_name: str) -> None:
+        """Remove the manifest of an index"""
+        manifest_path = cls.path_for(state_dir, index_name)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
@@ -0,0 +1,80 @@
+"""Portable, compressed index snapshots for bootstrapping new machines"""
+import base64
+import gzip
+import json
+import logging
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "mcp-qdrant-code-search-snapshot"
+SNAPSHOT_VERSION = 1
+
+
+def encode_vector(vector: List[float]) -> str:
+    """Pack a vector as base64 float32 (about 5x smaller than JSON floats)"""
+    return base64.b64encode(array('f', vector).tobytes()).decode('ascii')
+
+
+def decode_vector(encoded: str) -> List[float]:
+    """Unpack a base64 float32 vector"""
+    values = array('f')
+    values.frombytes(base64.b64decode(encoded))
+    return values.tolist()
+
+
+class SnapshotWriter:
+    """Streams a gzip'd JSON-lines snapshot: one header line, then one line per point"""
+    
+    def __init__(self, output_path: str, header: Dict[str, Any]):
+        self.output_path = output_path
+        self.header = dict(header, format=SNAPSHOT_FORMAT, version=SNAPSHOT_VERSION)
+        self.count = 0
+        self._file = None
+    
+    def __enter__(self) -> "SnapshotWriter":
+        self._file = gzip.open(self.output_path, 'wt', encoding='utf-8')
+        self._file.write(json.dumps(self.header) + "\n")
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._file.close()
+    
+    def write_points(self, points: Iterable[Dict[str, Any]]) -> None:
+        """Append points, each a dict with ``id``, ``vector``, ``payload`` and an optional ``signature`` vector"""
+        for point in points:
+            record = {
+                "id": point["id"],
+                "vector": encode_vector(point["vector"]),
+                "payload": point["payload"],
+            }
+            if point.get("signature"):
+                record["signature"] = encode_vector(point["signature"])
+            self._file.write(json.dumps(record) + "\n")
+            self.count += 1
+
+
+def read_snapshot_header(input_path: str) -> Dict[str, Any]:
+    """Read and validate the header of a snapshot"""
+    with gzip.open(input_path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+    if header.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Not an index snapshot: {input_path}")
+    if header.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {header.get('version')}")
+    return header
+
+
+def iter_snapshot_points(input_path: str) -> Iterator[Dict[str, Any]]:
+    """Stream the points of a snapshot without loading it into memory"""
+    with gzip.open(input_path, 'rt', encoding='utf-8') as f:
+        f.readline()  # header
+        for line in f:
+            if not line.strip():
+                continue
+            point = json.loads(line)
+            point["vector"] = decode_vector(point["vector"])
+            if point.get("signature"):
+                point["signature"] = decode_vector(point["signature"])
+            yield point
@@ -0,0 +1,24 @@
+"""Opaque cursors for paging through search and scroll results"""
+import base64
+import json
+from typing import Any, Dict
+
+CURSOR_VERSION = 1
+
+
+def encode_cursor(kind: str, state: Dict[str, Any]) -> str:
+    """Pack paging state into a URL-safe token"""
+    payload = json.dumps({"v": CURSOR_VERSION, "kind": kind, **state}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str, kind: str) -> Dict[str, Any]:
+    """Unpack a token made by ``encode_cursor`` for the given kind of request"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(state, dict) or state.get("v") != CURSOR_VERSION or state.get("kind") != kind:
+        raise ValueError(f"Invalid cursor for {kind}")
+    return state
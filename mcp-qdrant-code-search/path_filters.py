@@ -0,0 +1,171 @@
+"""Glob and path-prefix filters backed by indexed path payload fields"""
+import functools
+import re
+from typing import Any, List, Optional
+
+from qdrant_client.models import FieldCondition, MatchText, MatchValue
+
+GLOB_CHARS = set("*?[")
+EXTENSION_PATTERN = re.compile(r"\.([A-Za-z0-9_+-]+)$")
+TEXT_TOKEN_PATTERN = re.compile(r"^[A-Za-z0-9]+$")
+
+
+def _has_glob(segment: str) -> bool:
+    """Check whether a path segment contains glob characters"""
+    return any(char in GLOB_CHARS for char in segment)
+
+
+def _translate_segment(segment: str) -> str:
+    """Translate one glob path segment to a regex that never crosses '/'"""
+    parts = []
+    i = 0
+    while i < len(segment):
+        char = segment[i]
+        if char == '*':
+            parts.append('[^/]*')
+        elif char == '?':
+            parts.append('[^/]')
+        elif char == '[':
+            end = segment.find(']', i + 2)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                body = segment[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                parts.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+                i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return ''.join(parts)
+
+
+class PathPattern:
+    """A compiled file pattern: server-side conditions plus an exact matcher
+    
+    Patterns follow .gitignore conventions: a pattern without '/' (``*.py``,
+    ``test_*.py``) matches the file name in any directory, a pattern with '/'
+    is anchored at the repo root (``src/**/*.ts``), ``**`` spans any number of
+    directories and a trailing '/' matches everything below a directory.
+    
+    ``conditions`` narrow the search in Qdrant using the ``pathSegments``,
+    ``fileExtension`` and ``filePath`` payload indexes. They never exclude a
+    matching file, but may let some non-matching files through; when that is
+    possible ``needs_post_filter`` is set and results must be checked with
+    ``matches``. A literal extension matches case-insensitively, as the
+    stored ``fileExtension`` is lowercased. Without ``extension_field`` (for
+    collections indexed before ``fileExtension`` was stored) the extension
+    is only checked by ``matches``.
+    """
+    
+    # Depth of the pathSegments.N keyword indexes created for new collections
+    INDEXED_SEGMENT_DEPTH = 4
+    
+    def __init__(self, pattern: str, extension_field: bool = True):
+        self.pattern = pattern
+        self.extension_field = extension_field
+        normalized = pattern.strip()
+        while normalized.startswith('./'):
+            normalized = normalized[2:]
+        normalized = normalized.lstrip('/')
+        if normalized.endswith('/'):
+            normalized += '**'
+        
+        segments = [segment for segment in normalized.split('/') if segment]
+        self.anchored = '/' in normalized
+        if not self.anchored:
+            segments = ['**'] + segments
+        self.segments = segments
+        self.literal = self.anchored and not any(_has_glob(segment) for segment in segments)
+        self.extension = None if self.literal else self._literal_extension(segments[-1])
+        self.regex = re.compile(self._to_regex(segments))
+        
+        self.conditions: List[Any] = []
+        self.needs_post_filter = True
+        self._compile_conditions()
+    
+    @property
+    def matches_everything(self) -> bool:
+        """Whether the pattern is a bare ``*`` or ``**`` that filters nothing"""
+        return all(segment == '**' for segment in self.segments[:-1]) and self.segments[-1] in ('*', '**')
+    
+    @staticmethod
+    def _literal_extension(segment: str) -> Optional[str]:
+        """Get the literal extension of a file name pattern, if it has one"""
+        extension = EXTENSION_PATTERN.search(segment)
+        if extension and not _has_glob(extension.group(1)):
+            return extension.group(1)
+        return None
+    
+    def _to_regex(self, segments: List[str]) -> str:
+        """Build a regex matching a whole relative path"""
+        parts = []
+        for i, segment in enumerate(segments):
+            last = i == len(segments) - 1
+            if segment == '**':
+                parts.append('.*' if last else '(?:[^/]*/)*')
+            elif last and self.extension:
+                stem = segment[:-len(self.extension) - 1]
+                parts.append(_translate_segment(stem) + f"(?i:\\.{re.escape(self.extension)})")
+            else:
+                parts.append(_translate_segment(segment) + ('' if last else '/'))
+        return '^' + ''.join(parts) + '$'
+    
+    def _compile_conditions(self) -> None:
+        """Derive payload conditions that are implied by the pattern"""
+        segments = self.segments
+        
+        # A literal path needs no globbing at all
+        if self.literal:
+            self.conditions.append(
+                FieldCondition(key="filePath", match=MatchValue(value='/'.join(segments)))
+            )
+            self.needs_post_filter = False
+            return
+        
+        # Literal leading directories become prefix conditions on pathSegments.N
+        prefix_length = 0
+        for segment in segments[:-1]:
+            if _has_glob(segment):
+                break
+            if prefix_length < self.INDEXED_SEGMENT_DEPTH:
+                self.conditions.append(
+                    FieldCondition(key=f"pathSegments.{prefix_length}", match=MatchValue(value=segment))
+                )
+            prefix_length += 1
+        
+        # Other literal directory names must appear as whole words in the path
+        for segment in segments[prefix_length:-1]:
+            if not _has_glob(segment) and TEXT_TOKEN_PATTERN.match(segment):
+                self.conditions.append(FieldCondition(key="filePath", match=MatchText(text=segment)))
+        
+        # A literal extension on the file name
+        if self.extension and self.extension_field:
+            self.conditions.append(
+                FieldCondition(key="fileExtension", match=MatchValue(value=self.extension.lower()))
+            )
+        
+        # The conditions are exact for "<prefix>/**" and "<prefix>/**/*.ext"
+        rest = segments[prefix_length:]
+        if prefix_length <= self.INDEXED_SEGMENT_DEPTH:
+            if rest == ['**']:
+                self.needs_post_filter = False
+            elif len(rest) == 2 and rest[0] == '**' and re.match(r"^\*\.[A-Za-z0-9_+-]+$", rest[1]) \
+                    and self.extension_field:
+                self.needs_post_filter = False
+    
+    def matches(self, file_path: str) -> bool:
+        """Check a relative file path against the full pattern"""
+        return bool(self.regex.match(file_path.replace('\\', '/')))
+
+
+@functools.lru_cache(maxsize=256)
+def compile_path_pattern(pattern: Optional[str], extension_field: bool = True) -> Optional[PathPattern]:
+    """Compile a file pattern (cached), or return None for one that filters nothing"""
+    if not pattern or not pattern.strip():
+        return None
+    path_pattern = PathPattern(pattern, extension_field)
+    if path_pattern.matches_everything:
+        return None
+    return path_pattern
@@ -1,35 +1,532 @@
 """Qdrant service for vector operations"""
+import asyncio
+import functools
+import heapq
 import logging
 import hashlib
-from typing import Any, Dict, List, Optional
+import json
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 from qdrant_client import QdrantClient
 from qdrant_client.models import (
     CollectionInfo,
     CreateCollection,
+    CollectionParamsDiff,
     Distance,
+    HnswConfigDiff,
+    OptimizersConfigDiff,
     PointStruct,
+    SearchParams,
     VectorParams,
+    VectorParamsDiff,
     SearchRequest,
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
     Filter,
     FieldCondition,
+    FilterSelector,
+    Fusion,
+    FusionQuery,
+    HasIdCondition,
+    IntegerIndexParams,
+    KeywordIndexParams,
     MatchValue,
     MatchAny,
+    Modifier,
+    Prefetch,
+    QueryRequest,
+    RecommendInput,
+    RecommendQuery,
+    RecommendStrategy,
+    SparseVector,
+    SparseVectorParams,
+    TextIndexParams,
+    TokenizerType,
 )
 from config import Config
+from deadlines import Deadline
+from path_filters import PathPattern, compile_path_pattern
+from sparse_vectors import SparseEncoder
 
 logger = logging.getLogger(__name__)
 
 
+class SearchResults(list):
+    """List of search results that may be missing some collections
+    
+    ``failed_collections`` maps each collection that timed out or errored to
+    the reason, so callers can flag the results as partial. ``timings`` holds
+    per-stage durations in milliseconds, ``rerank`` the rerank report,
+    ``plan`` the query plan that produced the results, ``deadline`` the
+    deadline report (budget, elapsed time and the stages that ran out of
+    time) and ``next_cursor`` the token for the next page, if there may be
+    one. ``fallback_collections`` maps collections that could not run the
+    requested search mode to the mode they ran instead.
+    ``path_filter_capped`` is the number of candidates checked against a file
+    pattern when the page could not be filled from them.
+    """
+    
+    def __init__(
+        self,
+        results=(),
+        failed_collections: Optional[Dict[str, str]] = None,
+        timings: Optional[Dict[str, float]] = None,
+        rerank: Optional[Dict[str, Any]] = None,
+        next_cursor: Optional[str] = None,
+        plan: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Dict[str, Any]] = None,
+        fallback_collections: Optional[Dict[str, str]] = None,
+        path_filter_capped: Optional[int] = None
+    ):
+        super().__init__(results)
+        self.failed_collections = failed_collections or {}
+        self.fallback_collections = fallback_collections or {}
+        self.timings = timings or {}
+        self.rerank = rerank
+        self.next_cursor = next_cursor
+        self.plan = plan
+        self.deadline = deadline
+        self.path_filter_capped = path_filter_capped
+    
+    @classmethod
+    def like(cls, source: List[Dict[str, Any]], results=()) -> "SearchResults":
+        """Create a result list carrying over the metadata of ``source``"""
+        return cls(
+            results,
+            failed_collections=dict(getattr(source, 'failed_collections', None) or {}),
+            timings=dict(getattr(source, 'timings', None) or {}),
+            rerank=getattr(source, 'rerank', None),
+            next_cursor=getattr(source, 'next_cursor', None),
+            plan=getattr(source, 'plan', None),
+            deadline=getattr(source, 'deadline', None),
+            fallback_collections=dict(getattr(source, 'fallback_collections', None) or {}),
+            path_filter_capped=getattr(source, 'path_filter_capped', None)
+        )
+    
+    @property
+    def exceeded_stages(self) -> List[str]:
+        """Stages cut short by the request deadline"""
+        return list((self.deadline or {}).get("exceeded", []))
+    
+    @property
+    def partial(self) -> bool:
+        """Whether some collections, stages or candidates did not contribute results"""
+        return bool(self.failed_collections or self.exceeded_stages or self.path_filter_capped)
+    
+    def collect_fallbacks(self, default_collection: Optional[str] = None) -> None:
+        """Move the ``fallback`` marks of results into ``fallback_collections``"""
+        for result in self:
+            mode = result.pop('fallback', None)
+            if mode:
+                self.fallback_collections[result.get('collection') or default_collection or "?"] = mode
+    
+    @property
+    def fallback_note(self) -> Optional[str]:
+        """Human-readable note naming collections searched in another mode"""
+        if not self.fallback_collections:
+            return None
+        details = ", ".join(f"{name} ({mode})" for name, mode in sorted(self.fallback_collections.items()))
+        return (
+            f"{len(self.fallback_collections)} collection(s) have no lexical vectors and were searched "
+            f"by rank of dense similarity only: {details}; rebuild them for hybrid search"
+        )
+    
+    @property
+    def note(self) -> Optional[str]:
+        """Human-readable note describing missing collections and stages"""
+        if not self.partial:
+            return self.fallback_note
+        parts = []
+        if self.failed_collections:
+            details = ", ".join(f"{name} ({reason})" for name, reason in sorted(self.failed_collections.items()))
+            parts.append(f"{len(self.failed_collections)} collection(s) skipped: {details}")
+        if self.exceeded_stages:
+            stages = ", ".join(self.exceeded_stages)
+            parts.append(f"the {self.deadline['budget_ms']:g} ms deadline ran out during {stages}")
+            if "embedding" in self.exceeded_stages:
+                parts.append("lexical matches only")
+        if self.path_filter_capped:
+            parts.append(
+                f"only the best {self.path_filter_capped} candidates were checked against the file pattern; "
+                "a prefix or extension pattern is filtered in Qdrant and has no such cap"
+            )
+        note = "Partial results: " + "; ".join(parts)
+        if self.fallback_collections:
+            note += f"; {self.fallback_note}"
+        return note
+
+
+class CollectionCatalog:
+    """In-process cache of collection names and metadata
+    
+    The catalog is refreshed in one sweep (a single ``get_collections`` call
+    followed by concurrent ``get_collection`` calls) once the TTL has expired
+    or after it was invalidated by our own create/delete calls.
+    
+    Collections built for blue/green reindexing are named
+    ``<index>--gen-<n>`` and served through an alias named ``<index>``; the
+    index names hide the generation collections behind their aliases.
+    File summary collections (``<index>--files``) are hidden as well.
+    """
+    
+    GENERATION_PATTERN = re.compile(r"^(?P<index>.+)--gen-(?P<generation>\d+)$")
+    
+    FILE_SUMMARY_SUFFIX = "--files"
+    
+    def __init__(self, client: QdrantClient, ttl: float):
+        self.client = client
+        self.ttl = ttl
+        self._collections: Dict[str, Dict[str, Any]] = {}
+        self._aliases: Dict[str, str] = {}
+        self._refreshed_at: Optional[float] = None
+        self._refresh_lock: Optional[asyncio.Lock] = None
+    
+    def is_fresh(self) -> bool:
+        """Check whether the cached catalog can be served without a refresh"""
+        if self._refreshed_at is None:
+            return False
+        return time.monotonic() - self._refreshed_at < self.ttl
+    
+    def invalidate(self) -> None:
+        """Force a refresh on the next lookup"""
+        self._refreshed_at = None
+    
+    def discard(self, collection_name: str) -> None:
+        """Drop a collection from the catalog without a refresh"""
+        self._collections.pop(collection_name, None)
+    
+    async def get_collections(self, force_refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Get collection metadata keyed by name, refreshing if stale"""
+        if force_refresh or not self.is_fresh():
+            if self._refresh_lock is None:
+                self._refresh_lock = asyncio.Lock()
+            async with self._refresh_lock:
+                # Another caller may have refreshed while we were waiting
+                if force_refresh or not self.is_fresh():
+                    await self._refresh()
+        return self._collections
+    
+    async def get_names(self, force_refresh: bool = False) -> List[str]:
+        """Get all known collection names"""
+        return list(await self.get_collections(force_refresh))
+    
+    async def get_aliases(self, force_refresh: bool = False) -> Dict[str, str]:
+        """Get alias names mapped to the collection they point at"""
+        await self.get_collections(force_refresh)
+        return self._aliases
+    
+    async def get_index_names(self, force_refresh: bool = False) -> List[str]:
+        """Get searchable index names: aliases plus plain, non-generation collections"""
+        collections = await self.get_collections(force_refresh)
+        names = list(self._aliases)
+        for name in collections:
+            if name not in self._aliases and not self.GENERATION_PATTERN.match(name) \
+                    and not name.endswith(self.FILE_SUMMARY_SUFFIX):
+                names.append(name)
+        return names
+    
+    async def _refresh(self) -> None:
+        """Reload names and metadata for every collection in one parallel sweep"""
+        loop = asyncio.get_event_loop()
+        collections_response, aliases_response = await asyncio.gather(
+            loop.run_in_executor(None, self.client.get_collections),
+            loop.run_in_executor(None, self.client.get_aliases)
+        )
+        names = [c.name for c in collections_response.collections]
+        
+        infos = await asyncio.gather(
+            *(loop.run_in_executor(None, self.client.get_collection, name) for name in names),
+            return_exceptions=True
+        )
+        
+        collections = {}
+        for name, info in zip(names, infos):
+            if isinstance(info, Exception):
+                logger.warning(f"Failed to get info for collection '{name}': {str(info)}")
+                collections[name] = {
+                    'name': name,
+                    'vectors_count': 0,
+                    'status': 'unknown',
+                }
+            else:
+                vectors = info.config.params.vectors
+                collections[name] = {
+                    'name': name,
+                    'vectors_count': info.vectors_count or info.points_count or 0,
+                    'status': info.status,
+                    'sparse_vectors': sorted(info.config.params.sparse_vectors or {}),
+                    'named_vectors': sorted(key for key in vectors if key) if isinstance(vectors, dict) else [],
+                    'payload_indexes': sorted(info.payload_schema or {}),
+                }
+        
+        self._collections = collections
+        self._aliases = {a.alias_name: a.collection_name for a in aliases_response.aliases}
+        self._refreshed_at = time.monotonic()
+        logger.debug(f"Refreshed collection catalog ({len(collections)} collections)")
+
+
 class QdrantService:
     """Service for interacting with Qdrant vector database"""
     
+    # Named storage profiles applied at collection creation.
+    # "latency" keeps everything in RAM with a denser graph, "balanced" keeps
+    # vectors in RAM but payloads on disk, "memory" memory-maps vectors, the
+    # HNSW graph and payloads for huge, mostly-cold indexes.
+    STORAGE_PROFILES = {
+        "latency": {
+            "hnsw_m": 32,
+            "hnsw_ef_construct": 256,
+            "hnsw_on_disk": False,
+            "vectors_on_disk": False,
+            "payload_on_disk": False,
+            "memmap_threshold": None,
+            "default_segment_number": 0,  # 0 lets Qdrant match the CPU count
+        },
+        "balanced": {
+            "hnsw_m": 16,
+            "hnsw_ef_construct": 100,
+            "hnsw_on_disk": False,
+            "vectors_on_disk": False,
+            "payload_on_disk": True,
+            "memmap_threshold": None,
+            "default_segment_number": 0,
+        },
+        "memory": {
+            "hnsw_m": 16,
+            "hnsw_ef_construct": 100,
+            "hnsw_on_disk": True,
+            "vectors_on_disk": True,
+            "payload_on_disk": True,
+            "memmap_threshold": 20000,
+            "default_segment_number": 2,
+        },
+    }
+    
+    # Candidates fetched from each retriever before hybrid fusion, per result
+    HYBRID_PREFETCH_FACTOR = 4
+    
+    # Rank constant of Qdrant's reciprocal rank fusion: score = 1 / (constant + rank)
+    RRF_RANK_CONSTANT = 2
+    
+    # Small named vector of each chunk's signature and doc comment
+    SIGNATURE_VECTOR_NAME = "signature"
+    
+    # Signature dimension when unset, for models whose leading dimensions
+    # hold up on their own (Matryoshka representation learning)
+    DEFAULT_SIGNATURE_VECTOR_SIZE = 256
+    MATRYOSHKA_MODEL_PREFIXES = ("openai/text-embedding-3-",)
+    
+    # Signature-vector candidates rescored with the full vector, per result
+    SIGNATURE_PREFETCH_FACTOR = 8
+    
+    # Payload fields returned with search results; imports, context, hashes
+    # and path segments are only needed for filtering and indexing
+    RESULT_PAYLOAD_FIELDS = [
+        "repo", "filePath", "codeChunk", "startLine", "endLine",
+        "language", "chunkType", "functionName", "className",
+    ]
+    
+    # Payload fields of compact responses: the code body is loaded later,
+    # and only for the results whose body fits the response budget
+    COMPACT_PAYLOAD_FIELDS = [
+        field for field in RESULT_PAYLOAD_FIELDS if field != "codeChunk"
+    ] + ["preview", "codeLength"]
+    
     def __init__(self, config: Config):
         self.config = config
-        self.client = QdrantClient(
+        self.client = self._create_client(config)
+        self.catalog = CollectionCatalog(self.client, config.collection_cache_ttl)
+        # Writes made through this service, per collection/alias and overall
+        self.write_versions: Dict[str, int] = {}
+        self.global_write_version = 0
+        # Shared layout: the generation reads see per repo, and generations being built
+        self.live_generations: Dict[str, int] = self._load_live_generations()
+        self.pending_generations: Dict[str, Set[int]] = {}
+    
+    # Client modes: a Qdrant server, or qdrant-client's embedded local engine
+    QDRANT_MODES = ("server", "local", "memory")
+    
+    @classmethod
+    def _create_client(cls, config: Config) -> QdrantClient:
+        """Connect to the Qdrant server or open the embedded local store"""
+        if config.qdrant_mode not in cls.QDRANT_MODES:
+            raise ValueError(
+                f"Unknown Qdrant mode '{config.qdrant_mode}'. "
+                f"Available: {', '.join(cls.QDRANT_MODES)}"
+            )
+        if config.qdrant_mode == "memory":
+            return QdrantClient(location=":memory:")
+        if config.qdrant_mode == "local":
+            path = os.path.expanduser(config.qdrant_path)
+            os.makedirs(path, exist_ok=True)
+            logger.info(f"Using embedded Qdrant storage at '{path}'")
+            return QdrantClient(path=path)
+        return QdrantClient(
             url=config.qdrant_url,
             api_key=config.qdrant_api_key,
         )
     
+    @property
+    def is_embedded(self) -> bool:
+        """Whether the store runs in-process instead of on a Qdrant server"""
+        return self.config.qdrant_mode != "server"
+    
+    # Payload key holding the index (repo) name of every point. In the shared
+    # layout it is indexed as a tenant field so per-repo searches stay fast.
+    REPO_KEY = "repo"
+    
+    @property
+    def is_shared_layout(self) -> bool:
+        """Whether all repos share one multi-tenant collection"""
+        return self.config.collection_layout == "shared"
+    
+    @property
+    def shared_collection_name(self) -> str:
+        """Name of the multi-tenant collection used by the shared layout"""
+        return f"{self.config.collection_prefix}-shared"
+    
+    # Payload key holding the index generation of every point. A rebuild in
+    # the shared layout writes a new generation next to the live one.
+    GENERATION_KEY = "indexGeneration"
+    
+    def _live_generations_path(self) -> str:
+        """File recording the live generation of every repo in the shared collection"""
+        return os.path.join(
+            os.path.expanduser(self.config.index_state_dir),
+            f"{self.shared_collection_name}.generations.json"
+        )
+    
+    def _load_live_generations(self) -> Dict[str, int]:
+        """Load the live generation of every repo, or none outside the shared layout"""
+        path = self._live_generations_path()
+        if not self.is_shared_layout or not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return {index_name: int(generation) for index_name, generation in json.load(f).items()}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable generation file {path}: {str(e)}")
+            return {}
+    
+    def _save_live_generations(self) -> None:
+        """Atomically write the live generation of every repo"""
+        path = self._live_generations_path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.live_generations, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to save live generations to {path}: {str(e)}")
+    
+    def begin_generation(self, index_name: str) -> int:
+        """Start a new generation of a repo in the shared collection
+        
+        Reads skip its points until ``finish_generation`` makes it live.
+        """
+        pending = self.pending_generations.setdefault(index_name, set())
+        # Milliseconds, moved past the repo's other generations if the clock has not
+        generation = max(
+            [int(time.time() * 1000), self.live_generations.get(index_name, 0) + 1]
+            + [other + 1 for other in pending]
+        )
+        pending.add(generation)
+        return generation
+    
+    def finish_generation(self, index_name: str, generation: int, live: bool = True) -> None:
+        """Make a generation the live one of its repo, or drop a failed one
+        
+        Reads move from the old generation to the new one in this one step;
+        the old points are hidden from then on and can be deleted afterwards.
+        """
+        pending = self.pending_generations.get(index_name, set())
+        pending.discard(generation)
+        if not pending:
+            self.pending_generations.pop(index_name, None)
+        if live:
+            self.live_generations[index_name] = generation
+            self._save_live_generations()
+        self._bump_write_version(self.shared_collection_name)
+    
+    def live_generation(self, index_name: str) -> Optional[int]:
+        """Generation that reads of a repo see, or None if it was never recorded"""
+        return self.live_generations.get(index_name)
+    
+    def _hide_other_generations(
+        self,
+        collection_name: str,
+        filter_conditions: Optional[Filter]
+    ) -> Optional[Filter]:
+        """Keep reads of the shared collection to the live generation of every repo
+        
+        Repos with a recorded live generation hide all other generations;
+        generations still being built are hidden in any case. Repos indexed
+        before generations were recorded are read as they are.
+        """
+        if collection_name != self.shared_collection_name:
+            return filter_conditions
+        hidden: List[Any] = []
+        for index_name, generation in self.live_generations.items():
+            hidden.append(Filter(
+                must=[FieldCondition(key=self.REPO_KEY, match=MatchValue(value=index_name))],
+                must_not=[FieldCondition(key=self.GENERATION_KEY, match=MatchValue(value=generation))]
+            ))
+        for index_name, generations in self.pending_generations.items():
+            hidden.append(Filter(must=[
+                FieldCondition(key=self.REPO_KEY, match=MatchValue(value=index_name)),
+                FieldCondition(key=self.GENERATION_KEY, match=MatchAny(any=sorted(generations))),
+            ]))
+        if not hidden:
+            return filter_conditions
+        if filter_conditions is None:
+            return Filter(must_not=hidden)
+        return Filter(
+            must=filter_conditions.must,
+            should=filter_conditions.should,
+            must_not=list(filter_conditions.must_not or []) + hidden,
+        )
+    
+    def resolve_scope(
+        self,
+        index_name: str,
+        filter_conditions: Optional[Filter] = None
+    ) -> Tuple[str, Optional[Filter]]:
+        """Map an index name to the physical collection and filter to search
+        
+        In the per-repo layout the index name is the collection name. In the
+        shared layout it becomes a ``repo`` condition on the shared collection.
+        """
+        if not self.is_shared_layout:
+            return index_name, filter_conditions
+        return self.shared_collection_name, self.add_filter_condition(
+            filter_conditions,
+            FieldCondition(key=self.REPO_KEY, match=MatchValue(value=index_name))
+        )
+    
+    def file_summary_scope(self, index_name: str) -> Tuple[str, Optional[Filter]]:
+        """Map an index name to its file summary collection and filter"""
+        if not self.is_shared_layout:
+            return f"{index_name}{self.catalog.FILE_SUMMARY_SUFFIX}", None
+        return f"{self.shared_collection_name}{self.catalog.FILE_SUMMARY_SUFFIX}", Filter(
+            must=[FieldCondition(key=self.REPO_KEY, match=MatchValue(value=index_name))]
+        )
+    
+    @staticmethod
+    def add_filter_condition(filter_conditions: Optional[Filter], condition: Any) -> Filter:
+        """Return a filter that also requires ``condition``"""
+        if filter_conditions is None:
+            return Filter(must=[condition])
+        return Filter(
+            must=list(filter_conditions.must or []) + [condition],
+            should=filter_conditions.should,
+            must_not=filter_conditions.must_not,
+        )
+    
     def _generate_collection_name(self, path: str, custom_name: Optional[str] = None) -> str:
         """Generate a collection name based on path or use custom name"""
         if custom_name:
@@ -39,32 +536,276 @@ class QdrantService:
         path_hash = hashlib.md5(path.encode()).hexdigest()[:12]
         return f"{self.config.collection_prefix}-{path_hash}"
     
-    async def create_collection_if_not_exists(self, collection_name: str) -> bool:
+    def _get_storage_profile(self, profile: Optional[str] = None) -> Dict[str, Any]:
+        """Look up a storage profile by name, defaulting to the configured one"""
+        name = profile or self.config.storage_profile
+        if name not in self.STORAGE_PROFILES:
+            raise ValueError(
+                f"Unknown storage profile: {name} "
+                f"(expected one of: {', '.join(self.STORAGE_PROFILES)})"
+            )
+        return self.STORAGE_PROFILES[name]
+    
+    async def create_collection_if_not_exists(
+        self,
+        collection_name: str,
+        storage_profile: Optional[str] = None
+    ) -> bool:
         """Create collection if it doesn't exist"""
         try:
-            # Check if collection exists
-            collections = self.client.get_collections()
-            existing_names = [c.name for c in collections.collections]
+            # Check if collection exists; a miss is re-checked against the
+            # server in case another process created it since the last sweep
+            served_from_cache = self.catalog.is_fresh()
+            existing_names = await self.catalog.get_names()
+            if collection_name not in existing_names and served_from_cache:
+                existing_names = await self.catalog.get_names(force_refresh=True)
             
             if collection_name in existing_names:
                 logger.info(f"Collection '{collection_name}' already exists")
                 return False
             
+            profile = self._get_storage_profile(storage_profile)
+            vectors_config = VectorParams(
+                size=self.config.vector_size,
+                distance=Distance.COSINE,
+                on_disk=profile["vectors_on_disk"]
+            )
+            if self.signature_vector_size:
+                # The small signature vectors and their graph always stay in RAM
+                vectors_config = {
+                    "": vectors_config,
+                    self.SIGNATURE_VECTOR_NAME: VectorParams(
+                        size=self.signature_vector_size,
+                        distance=Distance.COSINE,
+                        on_disk=False,
+                        hnsw_config=HnswConfigDiff(on_disk=False)
+                    ),
+                }
+            
             # Create new collection
             self.client.create_collection(
                 collection_name=collection_name,
-                vectors_config=VectorParams(
-                    size=self.config.vector_size,
-                    distance=Distance.COSINE
-                )
+                vectors_config=vectors_config,
+                hnsw_config=HnswConfigDiff(
+                    m=profile["hnsw_m"],
+                    ef_construct=profile["hnsw_ef_construct"],
+                    on_disk=profile["hnsw_on_disk"]
+                ),
+                optimizers_config=OptimizersConfigDiff(
+                    memmap_threshold=profile["memmap_threshold"],
+                    default_segment_number=profile["default_segment_number"]
+                ),
+                on_disk_payload=profile["payload_on_disk"],
+                sparse_vectors_config={
+                    SparseEncoder.VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)
+                }
+            )
+            # The embedded engine scans payloads and has no payload indexes
+            if not self.is_embedded:
+                if collection_name == self.shared_collection_name:
+                    self.client.create_payload_index(
+                        collection_name=collection_name,
+                        field_name=self.REPO_KEY,
+                        field_schema=KeywordIndexParams(type="keyword", is_tenant=True)
+                    )
+                    self.client.create_payload_index(
+                        collection_name=collection_name,
+                        field_name=self.GENERATION_KEY,
+                        field_schema=IntegerIndexParams(type="integer", lookup=True, range=False)
+                    )
+                self._create_path_indexes(collection_name)
+            self.catalog.invalidate()
+            logger.info(
+                f"Created collection '{collection_name}' with "
+                f"'{storage_profile or self.config.storage_profile}' storage profile"
             )
-            logger.info(f"Created collection '{collection_name}'")
             return True
             
         except Exception as e:
             logger.error(f"Failed to create collection '{collection_name}': {str(e)}")
             raise
     
+    def _create_path_indexes(self, collection_name: str) -> None:
+        """Index the payload fields that file-pattern filters compile to"""
+        for depth in range(PathPattern.INDEXED_SEGMENT_DEPTH):
+            self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=f"pathSegments.{depth}",
+                field_schema=KeywordIndexParams(type="keyword")
+            )
+        self.client.create_payload_index(
+            collection_name=collection_name,
+            field_name="fileExtension",
+            field_schema=KeywordIndexParams(type="keyword")
+        )
+        self.client.create_payload_index(
+            collection_name=collection_name,
+            field_name="filePath",
+            field_schema=TextIndexParams(type="text", tokenizer=TokenizerType.WORD, lowercase=True)
+        )
+    
+    async def has_file_summaries(self, index_name: str) -> bool:
+        """Whether an index has a file summary collection"""
+        collection_name, _ = self.file_summary_scope(index_name)
+        return collection_name in await self.catalog.get_names()
+    
+    def _create_file_summary_collection(self, collection_name: str) -> None:
+        """Create a file summary collection; it is small, so it stays in memory"""
+        self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=VectorParams(size=self.config.vector_size, distance=Distance.COSINE)
+        )
+        if not self.is_embedded:
+            self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=self.REPO_KEY,
+                field_schema=KeywordIndexParams(type="keyword", is_tenant=self.is_shared_layout)
+            )
+        self.catalog.invalidate()
+    
+    async def replace_file_summaries(self, index_name: str, points: List[PointStruct]) -> None:
+        """Replace every file summary of an index, e.g. after a full rebuild"""
+        collection_name, scope_filter = self.file_summary_scope(index_name)
+        try:
+            existing = collection_name in await self.catalog.get_names(force_refresh=True)
+            if existing and not self.is_shared_layout:
+                self.client.delete_collection(collection_name)
+                self.catalog.discard(collection_name)
+                existing = False
+            if not existing:
+                self._create_file_summary_collection(collection_name)
+            elif scope_filter is not None:
+                self.client.delete(
+                    collection_name=collection_name,
+                    points_selector=FilterSelector(filter=scope_filter)
+                )
+            for i in range(0, len(points), self.config.batch_size):
+                await self.upsert_points(collection_name, points[i:i + self.config.batch_size])
+        except Exception as e:
+            logger.error(f"Failed to replace file summaries of '{index_name}': {str(e)}")
+            raise
+    
+    async def update_file_summaries(
+        self,
+        index_name: str,
+        points: List[PointStruct],
+        stale_ids: List[str]
+    ) -> None:
+        """Delete the summaries of changed or removed files and write new ones"""
+        collection_name, _ = self.file_summary_scope(index_name)
+        try:
+            if stale_ids:
+                self.client.delete(collection_name=collection_name, points_selector=stale_ids)
+                self._bump_write_version(collection_name)
+            for i in range(0, len(points), self.config.batch_size):
+                await self.upsert_points(collection_name, points[i:i + self.config.batch_size])
+        except Exception as e:
+            logger.error(f"Failed to update file summaries of '{index_name}': {str(e)}")
+            raise
+    
+    async def delete_file_summaries(self, index_name: str) -> None:
+        """Drop the file summaries of an index"""
+        collection_name, scope_filter = self.file_summary_scope(index_name)
+        if collection_name not in await self.catalog.get_names(force_refresh=True):
+            return
+        if scope_filter is None:
+            self.client.delete_collection(collection_name)
+            self.catalog.discard(collection_name)
+            self.catalog.invalidate()
+        else:
+            self.client.delete(
+                collection_name=collection_name,
+                points_selector=FilterSelector(filter=scope_filter)
+            )
+        self._bump_write_version(collection_name)
+    
+    async def search_file_summaries(
+        self,
+        index_name: str,
+        query_vector: List[float],
+        limit: int
+    ) -> List[str]:
+        """Paths of the files whose summary vectors are closest to a query"""
+        collection_name, scope_filter = self.file_summary_scope(index_name)
+        try:
+            points = await self._run_in_executor(
+                self.client.search,
+                collection_name=collection_name,
+                query_vector=query_vector,
+                query_filter=scope_filter,
+                limit=limit,
+                with_payload=["filePath"]
+            )
+            return [point.payload["filePath"] for point in points]
+        except Exception as e:
+            logger.error(f"File summary search failed for '{index_name}': {str(e)}")
+            raise
+    
+    async def update_storage_profile(self, collection_name: str, storage_profile: str) -> bool:
+        """Apply a storage profile to an existing collection
+        
+        HNSW and optimizer changes are picked up by the optimizer in the
+        background; payload storage only changes for newly built segments.
+        """
+        profile = self._get_storage_profile(storage_profile)
+        try:
+            collection_name = await self.resolve_alias(collection_name)
+            self.client.update_collection(
+                collection_name=collection_name,
+                vectors_config={
+                    "": VectorParamsDiff(on_disk=profile["vectors_on_disk"])
+                },
+                hnsw_config=HnswConfigDiff(
+                    m=profile["hnsw_m"],
+                    ef_construct=profile["hnsw_ef_construct"],
+                    on_disk=profile["hnsw_on_disk"]
+                ),
+                optimizers_config=OptimizersConfigDiff(
+                    memmap_threshold=profile["memmap_threshold"],
+                    default_segment_number=profile["default_segment_number"]
+                ),
+                collection_params=CollectionParamsDiff(
+                    on_disk_payload=profile["payload_on_disk"]
+                )
+            )
+            logger.info(f"Applied '{storage_profile}' storage profile to '{collection_name}'")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to update storage profile of '{collection_name}': {str(e)}")
+            raise
+    
+    def _create_search_params(
+        self,
+        hnsw_ef: Optional[int] = None,
+        exact: bool = False
+    ) -> Optional[SearchParams]:
+        """Create per-request search params trading recall against latency"""
+        hnsw_ef = hnsw_ef or self.config.hnsw_ef
+        if not exact and not hnsw_ef:
+            return None
+        return SearchParams(hnsw_ef=hnsw_ef, exact=exact)
+    
+    def _bump_write_version(self, collection_name: str) -> None:
+        """Record a write so cached search results of the collection go stale"""
+        self.write_versions[collection_name] = self.write_versions.get(collection_name, 0) + 1
+        self.global_write_version += 1
+    
+    async def get_write_version(self, index_name: Optional[str] = None) -> Tuple:
+        """Version token of an index (or of all indexes) for cache keys
+        
+        The token changes whenever the index is written, rebuilt (its alias
+        points at a new generation) or deleted through this service.
+        """
+        if index_name is None:
+            return ("*", self.global_write_version)
+        collection_name, _ = self.resolve_scope(index_name)
+        physical_name = await self.resolve_alias(collection_name)
+        return (
+            physical_name,
+            self.write_versions.get(physical_name, 0),
+            self.write_versions.get(collection_name, 0),
+        )
+    
     async def upsert_points(self, collection_name: str, points: List[PointStruct]) -> None:
         """Upsert points to collection"""
         try:
@@ -72,124 +813,759 @@ class QdrantService:
                 collection_name=collection_name,
                 points=points
             )
+            self._bump_write_version(collection_name)
             logger.info(f"Upserted {len(points)} points to '{collection_name}'")
         except Exception as e:
             logger.error(f"Failed to upsert points to '{collection_name}': {str(e)}")
             raise
     
+    async def _run_in_executor(self, fn: Callable[..., Any], **kwargs: Any) -> Any:
+        """Run a blocking client call without blocking the event loop"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, functools.partial(fn, **kwargs))
+    
+    @property
+    def signature_vector_size(self) -> int:
+        """Dimension of the signature vectors, 0 when they are disabled
+        
+        Unless configured, only models trained for shortened embeddings get
+        them; other models lose too much when truncated to be worth the
+        extra embedding input per chunk.
+        """
+        size = self.config.signature_vector_size
+        if size is None:
+            model = self.config.embedding_model
+            size = self.DEFAULT_SIGNATURE_VECTOR_SIZE if model.startswith(self.MATRYOSHKA_MODEL_PREFIXES) else 0
+        return min(max(size, 0), self.config.vector_size)
+    
+    def signature_vector(self, vector: List[float]) -> List[float]:
+        """Shorten a full embedding to the signature dimension
+        
+        Leading dimensions are kept and renormalised. Models trained with
+        Matryoshka representation learning (OpenAI's text-embedding-3 family)
+        keep most of their quality this way; OpenAI's ``dimensions`` option
+        does the same.
+        """
+        shortened = vector[:self.signature_vector_size]
+        norm = sum(value * value for value in shortened) ** 0.5
+        return [value / norm for value in shortened] if norm else shortened
+    
+    async def has_signature_vectors(self, collection_name: str) -> bool:
+        """Check whether a collection (or alias) was created with signature vectors"""
+        collections = await self.catalog.get_collections()
+        info = collections.get(await self.resolve_alias(collection_name), {})
+        return self.SIGNATURE_VECTOR_NAME in info.get('named_vectors', [])
+    
+    async def has_sparse_vectors(self, collection_name: str) -> bool:
+        """Check whether a collection (or alias) was indexed with lexical sparse vectors"""
+        collections = await self.catalog.get_collections()
+        info = collections.get(await self.resolve_alias(collection_name), {})
+        return SparseEncoder.VECTOR_NAME in info.get('sparse_vectors', [])
+    
+    async def has_file_extensions(self, collection_name: str) -> bool:
+        """Check whether a collection's chunks carry the ``fileExtension`` payload field
+        
+        Collections created since it is stored have a ``fileExtension`` index.
+        Local mode reports no payload indexes, so there one chunk is sampled.
+        The answer is kept until the catalog is refreshed.
+        """
+        collections = await self.catalog.get_collections()
+        info = collections.get(await self.resolve_alias(collection_name))
+        if info is None:
+            return True
+        if 'file_extensions' not in info:
+            if info.get('payload_indexes'):
+                info['file_extensions'] = "fileExtension" in info['payload_indexes']
+            else:
+                points, _ = await self.scroll_points(collection_name, limit=1, with_payload=["fileExtension"])
+                info['file_extensions'] = not points or "fileExtension" in (points[0].payload or {})
+        return info['file_extensions']
+    
+    async def stores_file_extensions(self, index_name: Optional[str], collection_prefix: Optional[str] = None) -> bool:
+        """Check whether every collection a search covers can filter on ``fileExtension``"""
+        if index_name:
+            collection_names = [self.resolve_scope(index_name)[0]]
+        else:
+            collection_names = await self._get_target_collections(collection_prefix)
+        found = await asyncio.gather(*(self.has_file_extensions(name) for name in collection_names))
+        return all(found)
+    
+    def _rank_fuse_dense(self, results: List[Dict[str, Any]], offset: int = 0) -> List[Dict[str, Any]]:
+        """Score dense fallback results of a hybrid search by rank, as RRF would
+        
+        Collections without sparse vectors answer hybrid searches densely.
+        Their cosine scores (about 0.7-0.9) would outrank every RRF score
+        (at most 1.0, usually far less) in a cross-collection merge, so each
+        result gets the RRF score of a single ranking instead, and is marked
+        with ``fallback`` for ``SearchResults.collect_fallbacks``.
+        """
+        for rank, result in enumerate(results, offset):
+            result['score'] = 1 / (self.RRF_RANK_CONSTANT + rank)
+            result['fallback'] = "dense"
+        return results
+    
     async def search_similar(
         self,
         collection_name: str,
         query_vector: List[float],
         limit: int = 10,
         score_threshold: Optional[float] = None,
-        filter_conditions: Optional[Filter] = None
+        filter_conditions: Optional[Filter] = None,
+        hnsw_ef: Optional[int] = None,
+        exact: bool = False,
+        sparse_vector: Optional[SparseVector] = None,
+        search_mode: str = "dense",
+        offset: int = 0,
+        with_vectors: bool = False,
+        with_payload: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Search for similar vectors
+        
+        In ``hybrid`` mode the dense and lexical sparse vectors are queried in
+        one request and fused with reciprocal rank fusion, so scores are rank
+        based rather than cosine similarities. Collections indexed without
+        sparse vectors fall back to dense search, scored by rank (see
+        ``_rank_fuse_dense``). In ``signature`` mode the
+        small signature vectors pick ``SIGNATURE_PREFETCH_FACTOR`` candidates
+        per result and only those are rescored with the full vector;
+        collections without signature vectors fall back to dense search.
+        ``offset`` skips that many top results, for paging. ``with_vectors``
+        adds each result's dense ``vector``. ``with_payload`` selects the
+        payload fields (default: ``RESULT_PAYLOAD_FIELDS``).
+        """
+        filter_conditions = self._hide_other_generations(collection_name, filter_conditions)
+        with_payload = with_payload or self.RESULT_PAYLOAD_FIELDS
+        try:
+            search_params = self._create_search_params(hnsw_ef, exact)
+            hybrid_fallback = False
+            
+            if search_mode == "hybrid" and sparse_vector is not None \
+                    and await self.has_sparse_vectors(collection_name):
+                prefetch_limit = (offset + limit) * self.HYBRID_PREFETCH_FACTOR
+                response = await self._run_in_executor(
+                    self.client.query_points,
+                    collection_name=collection_name,
+                    prefetch=[
+                        Prefetch(
+                            query=query_vector,
+                            filter=filter_conditions,
+                            params=search_params,
+                            score_threshold=score_threshold,
+                            limit=prefetch_limit
+                        ),
+                        Prefetch(
+                            query=sparse_vector,
+                            using=SparseEncoder.VECTOR_NAME,
+                            filter=filter_conditions,
+                            limit=prefetch_limit
+                        ),
+                    ],
+                    query=FusionQuery(fusion=Fusion.RRF),
+                    limit=limit,
+                    offset=offset,
+                    with_payload=with_payload,
+                    with_vectors=with_vectors
+                )
+                search_result = response.points
+            elif search_mode == "signature" and await self.has_signature_vectors(collection_name):
+                response = await self._run_in_executor(
+                    self.client.query_points,
+                    collection_name=collection_name,
+                    prefetch=Prefetch(
+                        query=self.signature_vector(query_vector),
+                        using=self.SIGNATURE_VECTOR_NAME,
+                        filter=filter_conditions,
+                        params=search_params,
+                        limit=(offset + limit) * self.SIGNATURE_PREFETCH_FACTOR
+                    ),
+                    query=query_vector,
+                    score_threshold=score_threshold,
+                    limit=limit,
+                    offset=offset,
+                    with_payload=with_payload,
+                    with_vectors=with_vectors
+                )
+                search_result = response.points
+            else:
+                hybrid_fallback = search_mode == "hybrid" and sparse_vector is not None
+                search_result = await self._run_in_executor(
+                    self.client.search,
+                    collection_name=collection_name,
+                    query_vector=query_vector,
+                    limit=limit,
+                    offset=offset,
+                    score_threshold=score_threshold,
+                    query_filter=filter_conditions,
+                    search_params=search_params,
+                    with_payload=with_payload,
+                    with_vectors=with_vectors
+                )
+            
+            results = [self.point_to_result(point) for point in search_result]
+            return self._rank_fuse_dense(results, offset) if hybrid_fallback else results
+        except Exception as e:
+            logger.error(f"Search failed in '{collection_name}': {str(e)}")
+            raise
+    
+    async def search_lexical(
+        self,
+        collection_name: str,
+        sparse_vector: SparseVector,
+        limit: int = 10,
+        filter_conditions: Optional[Filter] = None,
+        with_payload: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
-        """Search for similar vectors"""
+        """Search the lexical sparse vectors only, without a query embedding
+        
+        Collections indexed without sparse vectors return no results.
+        """
+        if not await self.has_sparse_vectors(collection_name):
+            return []
+        filter_conditions = self._hide_other_generations(collection_name, filter_conditions)
         try:
-            search_result = self.client.search(
+            response = await self._run_in_executor(
+                self.client.query_points,
                 collection_name=collection_name,
-                query_vector=query_vector,
+                query=sparse_vector,
+                using=SparseEncoder.VECTOR_NAME,
+                query_filter=filter_conditions,
                 limit=limit,
-                score_threshold=score_threshold,
+                with_payload=with_payload or self.RESULT_PAYLOAD_FIELDS
+            )
+            return [self.point_to_result(point) for point in response.points]
+        except Exception as e:
+            logger.error(f"Lexical search failed in '{collection_name}': {str(e)}")
+            raise
+    
+    async def search_lexical_across_collections(
+        self,
+        sparse_vector: SparseVector,
+        collection_prefix: Optional[str] = None,
+        limit: int = 10,
+        filter_conditions: Optional[Filter] = None,
+        deadline: Optional[Deadline] = None,
+        with_payload: Optional[List[str]] = None
+    ) -> SearchResults:
+        """Run a lexical-only search in every target collection and merge the top results"""
+        target_collections = await self._get_target_collections(collection_prefix)
+        return await self._fan_out_search(
+            target_collections,
+            limit,
+            lambda collection_name: self.search_lexical(
+                collection_name=collection_name,
+                sparse_vector=sparse_vector,
+                limit=limit,
+                filter_conditions=filter_conditions,
+                with_payload=with_payload
+            ),
+            deadline
+        )
+    
+    async def recommend_similar(
+        self,
+        collection_name: str,
+        positive: List[Any],
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        filter_conditions: Optional[Filter] = None,
+        exclude_ids: Optional[List[Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Find points similar to stored examples without embedding a query
+        
+        ``positive`` holds point IDs of this collection or raw dense vectors;
+        Qdrant averages the examples into the query vector. ``exclude_ids``
+        keeps the example points themselves out of the results.
+        """
+        if exclude_ids:
+            exclude = HasIdCondition(has_id=exclude_ids)
+            if filter_conditions is None:
+                filter_conditions = Filter(must_not=[exclude])
+            else:
+                filter_conditions = Filter(
+                    must=filter_conditions.must,
+                    should=filter_conditions.should,
+                    must_not=list(filter_conditions.must_not or []) + [exclude],
+                )
+        filter_conditions = self._hide_other_generations(collection_name, filter_conditions)
+        try:
+            response = await self._run_in_executor(
+                self.client.query_points,
+                collection_name=collection_name,
+                query=RecommendQuery(
+                    recommend=RecommendInput(positive=positive, strategy=RecommendStrategy.AVERAGE_VECTOR)
+                ),
                 query_filter=filter_conditions,
-                with_payload=True
+                score_threshold=score_threshold,
+                limit=limit,
+                with_payload=self.RESULT_PAYLOAD_FIELDS
             )
+            return [self.point_to_result(point) for point in response.points]
+        except Exception as e:
+            logger.error(f"Recommend failed in '{collection_name}': {str(e)}")
+            raise
+    
+    async def recommend_across_collections(
+        self,
+        positive_vectors: List[List[float]],
+        collection_prefix: Optional[str] = None,
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        filter_conditions: Optional[Filter] = None,
+        exclude_ids: Optional[List[Any]] = None
+    ) -> SearchResults:
+        """Recommend by example vectors across multiple collections"""
+        try:
+            target_collections = await self._get_target_collections(collection_prefix)
             
-            results = []
-            for point in search_result:
-                result = {
-                    'id': point.id,
-                    'score': point.score,
-                    'payload': point.payload
-                }
-                # Extract common fields from payload
-                if point.payload:
-                    result.update({
-                        'file_path': point.payload.get('filePath', ''),
-                        'code_chunk': point.payload.get('codeChunk', ''),
-                        'start_line': point.payload.get('startLine', 0),
-                        'end_line': point.payload.get('endLine', 0),
-                        'language': point.payload.get('language', ''),
-                        'function_name': point.payload.get('functionName', ''),
-                        'class_name': point.payload.get('className', ''),
-                    })
-                results.append(result)
-            
-            return results
+            return await self._fan_out_search(
+                target_collections,
+                limit,
+                lambda collection_name: self.recommend_similar(
+                    collection_name=collection_name,
+                    positive=positive_vectors,
+                    limit=limit,
+                    score_threshold=score_threshold,
+                    filter_conditions=filter_conditions,
+                    exclude_ids=exclude_ids
+                )
+            )
         except Exception as e:
-            logger.error(f"Search failed in '{collection_name}': {str(e)}")
+            logger.error(f"Cross-collection recommend failed: {str(e)}")
             raise
     
+    async def find_points_across_collections(
+        self,
+        filter_conditions: Filter,
+        collection_prefix: Optional[str] = None,
+        limit: int = 100,
+        with_vectors: bool = False
+    ) -> List[Any]:
+        """Look up points matching a payload filter in every target collection"""
+        target_collections = await self._get_target_collections(collection_prefix)
+        pages = await asyncio.gather(*[
+            self.scroll_points(
+                collection_name,
+                filter_conditions=filter_conditions,
+                limit=limit,
+                with_vectors=with_vectors,
+                with_payload=False
+            )
+            for collection_name in target_collections
+        ])
+        return [point for points, _ in pages for point in points][:limit]
+    
+    @staticmethod
+    def dense_vector(vector: Any) -> Optional[List[float]]:
+        """Extract the unnamed dense vector from a record's vector field"""
+        if isinstance(vector, dict):
+            return vector.get("")
+        return vector
+    
+    @classmethod
+    def signature_of(cls, vector: Any) -> Optional[List[float]]:
+        """Extract the signature vector from a record's vector field, if it has one"""
+        if isinstance(vector, dict):
+            return vector.get(cls.SIGNATURE_VECTOR_NAME)
+        return None
+    
+    def point_to_result(self, point: Any) -> Dict[str, Any]:
+        """Convert a scored point into a search result dictionary"""
+        result = {
+            'id': point.id,
+            'score': getattr(point, 'score', None),
+            'payload': point.payload
+        }
+        # Extract common fields from payload
+        if point.payload:
+            result.update({
+                'file_path': point.payload.get('filePath', ''),
+                'code_chunk': point.payload.get('codeChunk'),
+                'start_line': point.payload.get('startLine', 0),
+                'end_line': point.payload.get('endLine', 0),
+                'language': point.payload.get('language', ''),
+                'function_name': point.payload.get('functionName', ''),
+                'class_name': point.payload.get('className', ''),
+                'chunk_type': point.payload.get('chunkType', ''),
+            })
+            if 'codeChunk' not in point.payload:
+                # Compact reads leave the body to ``retrieve_payloads``
+                result.update({
+                    'preview': point.payload.get('preview'),
+                    'code_length': point.payload.get('codeLength'),
+                })
+        if getattr(point, 'vector', None) is not None:
+            result['vector'] = self.dense_vector(point.vector)
+        return result
+    
     async def search_across_collections(
         self,
         query_vector: List[float],
         collection_prefix: Optional[str] = None,
         limit: int = 10,
         score_threshold: Optional[float] = None,
-        filter_conditions: Optional[Filter] = None
-    ) -> List[Dict[str, Any]]:
+        filter_conditions: Optional[Filter] = None,
+        hnsw_ef: Optional[int] = None,
+        exact: bool = False,
+        sparse_vector: Optional[SparseVector] = None,
+        search_mode: str = "dense",
+        with_vectors: bool = False,
+        deadline: Optional[Deadline] = None,
+        with_payload: Optional[List[str]] = None
+    ) -> SearchResults:
         """Search across multiple collections"""
         try:
-            collections = await self.list_collections()
-            target_collections = []
+            target_collections = await self._get_target_collections(collection_prefix)
             
-            for collection in collections:
-                if collection_prefix:
-                    if collection['name'].startswith(collection_prefix):
-                        target_collections.append(collection['name'])
-                else:
-                    target_collections.append(collection['name'])
+            return await self._fan_out_search(
+                target_collections,
+                limit,
+                lambda collection_name: self.search_similar(
+                    collection_name=collection_name,
+                    query_vector=query_vector,
+                    limit=limit,
+                    score_threshold=score_threshold,
+                    filter_conditions=filter_conditions,
+                    hnsw_ef=hnsw_ef,
+                    exact=exact,
+                    sparse_vector=sparse_vector,
+                    search_mode=search_mode,
+                    with_vectors=with_vectors,
+                    with_payload=with_payload
+                ),
+                deadline
+            )
             
-            all_results = []
-            for collection_name in target_collections:
-                try:
-                    results = await self.search_similar(
-                        collection_name=collection_name,
-                        query_vector=query_vector,
+        except Exception as e:
+            logger.error(f"Cross-collection search failed: {str(e)}")
+            raise
+    
+    async def search_groups(
+        self,
+        collection_name: str,
+        query_vector: List[float],
+        group_by: str = "filePath",
+        limit: int = 10,
+        group_size: int = 3,
+        score_threshold: Optional[float] = None,
+        filter_conditions: Optional[Filter] = None,
+        hnsw_ef: Optional[int] = None,
+        exact: bool = False,
+        sparse_vector: Optional[SparseVector] = None,
+        search_mode: str = "dense",
+        with_payload: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Search for the best ``limit`` groups of points sharing a payload value
+        
+        Uses Qdrant's grouping query, so one file with many matching chunks
+        takes one slot. Each group is returned as its best hit, with the other
+        hits of the group (best first) in ``group_hits``.
+        """
+        filter_conditions = self._hide_other_generations(collection_name, filter_conditions)
+        try:
+            search_params = self._create_search_params(hnsw_ef, exact)
+            query_args: Dict[str, Any] = {"query": query_vector, "search_params": search_params}
+            hybrid_fallback = False
+            if search_mode == "hybrid" and sparse_vector is not None \
+                    and await self.has_sparse_vectors(collection_name):
+                prefetch_limit = limit * group_size * self.HYBRID_PREFETCH_FACTOR
+                query_args = {
+                    "prefetch": [
+                        Prefetch(
+                            query=query_vector,
+                            filter=filter_conditions,
+                            params=search_params,
+                            score_threshold=score_threshold,
+                            limit=prefetch_limit
+                        ),
+                        Prefetch(
+                            query=sparse_vector,
+                            using=SparseEncoder.VECTOR_NAME,
+                            filter=filter_conditions,
+                            limit=prefetch_limit
+                        ),
+                    ],
+                    "query": FusionQuery(fusion=Fusion.RRF),
+                }
+            else:
+                hybrid_fallback = search_mode == "hybrid" and sparse_vector is not None
+                query_args["score_threshold"] = score_threshold
+            
+            response = await self._run_in_executor(
+                self.client.query_points_groups,
+                collection_name=collection_name,
+                group_by=group_by,
+                query_filter=filter_conditions,
+                limit=limit,
+                group_size=group_size,
+                with_payload=with_payload or self.RESULT_PAYLOAD_FIELDS,
+                **query_args
+            )
+            
+            groups = []
+            for group in response.groups:
+                hits = [self.point_to_result(point) for point in group.hits]
+                if hits:
+                    if hybrid_fallback:
+                        self._rank_fuse_dense(hits, len(groups))
+                        for hit in hits[1:]:
+                            hit.pop('fallback')
+                    groups.append(dict(hits[0], group_hits=hits[1:]))
+            return groups
+        except Exception as e:
+            logger.error(f"Grouped search failed in '{collection_name}': {str(e)}")
+            raise
+    
+    async def search_groups_across_collections(
+        self,
+        query_vector: List[float],
+        collection_prefix: Optional[str] = None,
+        limit: int = 10,
+        deadline: Optional[Deadline] = None,
+        **search_kwargs: Any
+    ) -> SearchResults:
+        """Run a grouped search in every target collection and keep the best groups"""
+        try:
+            target_collections = await self._get_target_collections(collection_prefix)
+            return await self._fan_out_search(
+                target_collections,
+                limit,
+                lambda collection_name: self.search_groups(
+                    collection_name=collection_name,
+                    query_vector=query_vector,
+                    limit=limit,
+                    **search_kwargs
+                ),
+                deadline
+            )
+        except Exception as e:
+            logger.error(f"Cross-collection grouped search failed: {str(e)}")
+            raise
+    
+    async def search_batch(
+        self,
+        collection_name: str,
+        query_vectors: List[List[float]],
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        filter_conditions: Optional[Filter] = None,
+        hnsw_ef: Optional[int] = None,
+        exact: bool = False,
+        sparse_vectors: Optional[List[SparseVector]] = None,
+        search_mode: str = "dense",
+        with_payload: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Run several searches against one collection in a single request"""
+        filter_conditions = self._hide_other_generations(collection_name, filter_conditions)
+        try:
+            search_params = self._create_search_params(hnsw_ef, exact)
+            hybrid = search_mode == "hybrid" and sparse_vectors is not None \
+                and await self.has_sparse_vectors(collection_name)
+            with_payload = with_payload or self.RESULT_PAYLOAD_FIELDS
+            
+            requests = []
+            for i, query_vector in enumerate(query_vectors):
+                if hybrid:
+                    prefetch_limit = limit * self.HYBRID_PREFETCH_FACTOR
+                    requests.append(QueryRequest(
+                        prefetch=[
+                            Prefetch(
+                                query=query_vector,
+                                filter=filter_conditions,
+                                params=search_params,
+                                score_threshold=score_threshold,
+                                limit=prefetch_limit
+                            ),
+                            Prefetch(
+                                query=sparse_vectors[i],
+                                using=SparseEncoder.VECTOR_NAME,
+                                filter=filter_conditions,
+                                limit=prefetch_limit
+                            ),
+                        ],
+                        query=FusionQuery(fusion=Fusion.RRF),
                         limit=limit,
+                        with_payload=with_payload
+                    ))
+                else:
+                    requests.append(QueryRequest(
+                        query=query_vector,
+                        filter=filter_conditions,
+                        params=search_params,
                         score_threshold=score_threshold,
-                        filter_conditions=filter_conditions
-                    )
-                    # Add collection name to results
-                    for result in results:
-                        result['collection'] = collection_name
-                    all_results.extend(results)
-                except Exception as e:
-                    logger.warning(f"Failed to search in collection '{collection_name}': {str(e)}")
-                    continue
-            
-            # Sort by score and limit results
-            all_results.sort(key=lambda x: x['score'], reverse=True)
-            return all_results[:limit]
+                        limit=limit,
+                        with_payload=with_payload
+                    ))
             
+            responses = await self._run_in_executor(
+                self.client.query_batch_points,
+                collection_name=collection_name,
+                requests=requests
+            )
+            batch_results = [
+                [self.point_to_result(point) for point in response.points]
+                for response in responses
+            ]
+            if search_mode == "hybrid" and sparse_vectors is not None and not hybrid:
+                for results in batch_results:
+                    self._rank_fuse_dense(results)
+            return batch_results
         except Exception as e:
-            logger.error(f"Cross-collection search failed: {str(e)}")
+            logger.error(f"Batch search failed in '{collection_name}': {str(e)}")
             raise
     
-    async def list_collections(self) -> List[Dict[str, Any]]:
-        """List all collections with metadata"""
+    async def search_batch_across_collections(
+        self,
+        query_vectors: List[List[float]],
+        collection_prefix: Optional[str] = None,
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        filter_conditions: Optional[Filter] = None,
+        hnsw_ef: Optional[int] = None,
+        exact: bool = False,
+        sparse_vectors: Optional[List[SparseVector]] = None,
+        search_mode: str = "dense",
+        deadline: Optional[Deadline] = None,
+        with_payload: Optional[List[str]] = None
+    ) -> List[SearchResults]:
+        """Run several searches across collections with one batch request per collection"""
         try:
-            collections_response = self.client.get_collections()
-            collections = []
+            target_collections = await self._get_target_collections(collection_prefix)
+            
+            return await self._fan_out_batch_search(
+                target_collections,
+                limit,
+                len(query_vectors),
+                lambda collection_name: self.search_batch(
+                    collection_name=collection_name,
+                    query_vectors=query_vectors,
+                    limit=limit,
+                    score_threshold=score_threshold,
+                    filter_conditions=filter_conditions,
+                    hnsw_ef=hnsw_ef,
+                    exact=exact,
+                    sparse_vectors=sparse_vectors,
+                    search_mode=search_mode,
+                    with_payload=with_payload
+                ),
+                deadline
+            )
             
-            for collection in collections_response.collections:
+        except Exception as e:
+            logger.error(f"Cross-collection batch search failed: {str(e)}")
+            raise
+    
+    async def _get_target_collections(self, collection_prefix: Optional[str] = None) -> List[str]:
+        """Get the collections a cross-collection search should cover"""
+        collection_names = await self.catalog.get_index_names()
+        target_collections = []
+        
+        if self.is_shared_layout and self.shared_collection_name in collection_names:
+            # Every repo lives in the shared collection, so one search covers all of them
+            collection_names = [self.shared_collection_name]
+        
+        for name in collection_names:
+            if collection_prefix:
+                if name.startswith(collection_prefix):
+                    target_collections.append(name)
+            else:
+                target_collections.append(name)
+        
+        return target_collections
+    
+    async def _fan_out_search(
+        self,
+        collection_names: List[str],
+        limit: int,
+        search_fn: Callable[[str], Awaitable[List[Dict[str, Any]]]],
+        deadline: Optional[Deadline] = None
+    ) -> SearchResults:
+        """Run a search against many collections concurrently and merge the top results"""
+        async def search_as_batch(collection_name: str) -> List[List[Dict[str, Any]]]:
+            return [await search_fn(collection_name)]
+        
+        merged = await self._fan_out_batch_search(collection_names, limit, 1, search_as_batch, deadline)
+        return merged[0]
+    
+    async def _fan_out_batch_search(
+        self,
+        collection_names: List[str],
+        limit: int,
+        num_queries: int,
+        search_fn: Callable[[str], Awaitable[List[List[Dict[str, Any]]]]],
+        deadline: Optional[Deadline] = None
+    ) -> List[SearchResults]:
+        """Run batched searches against many collections concurrently and merge the top results
+        
+        At most ``search_concurrency`` collections are searched at once and each
+        one gets ``collection_search_timeout`` seconds, or what is left of the
+        request ``deadline`` if that is less. Results of every query are merged
+        through a bounded min-heap of size ``limit``; collections that time out
+        or fail are reported in ``failed_collections`` instead of failing the
+        search.
+        """
+        semaphore = asyncio.Semaphore(max(1, self.config.search_concurrency))
+        collection_timeout = self.config.collection_search_timeout
+        
+        async def search_one(collection_name: str):
+            async with semaphore:
+                timeout = deadline.cap(collection_timeout) if deadline else collection_timeout
+                reason = "deadline" if timeout < collection_timeout else "timeout"
                 try:
-                    info = self.client.get_collection(collection.name)
-                    collections.append({
-                        'name': collection.name,
-                        'vectors_count': info.vectors_count or 0,
-                        'status': info.status,
-                    })
+                    results = await asyncio.wait_for(search_fn(collection_name), timeout=timeout)
+                    return collection_name, results, None
+                except asyncio.TimeoutError:
+                    logger.warning(f"Search in collection '{collection_name}' timed out after {timeout:.2f}s ({reason})")
+                    return collection_name, [], reason
                 except Exception as e:
-                    logger.warning(f"Failed to get info for collection '{collection.name}': {str(e)}")
-                    collections.append({
-                        'name': collection.name,
-                        'vectors_count': 0,
-                        'status': 'unknown',
-                    })
+                    logger.warning(f"Failed to search in collection '{collection_name}': {str(e)}")
+                    return collection_name, [], "error"
+        
+        # One (score, tiebreak, result) min-heap per query holding its current top-k
+        heaps = [[] for _ in range(num_queries)]
+        tiebreak = 0
+        failed_collections = {}
+        
+        for next_done in asyncio.as_completed([search_one(name) for name in collection_names]):
+            collection_name, batch_results, failure = await next_done
+            if failure:
+                failed_collections[collection_name] = failure
+                continue
+            
+            for heap, results in zip(heaps, batch_results):
+                for result in results:
+                    # Add collection name to results
+                    result['collection'] = collection_name
+                    tiebreak += 1
+                    entry = (result['score'], tiebreak, result)
+                    if len(heap) < limit:
+                        heapq.heappush(heap, entry)
+                    elif entry[0] > heap[0][0]:
+                        heapq.heapreplace(heap, entry)
+        
+        return [
+            SearchResults(
+                [entry[2] for entry in sorted(heap, key=lambda e: (-e[0], e[1]))],
+                failed_collections
+            )
+            for heap in heaps
+        ]
+    
+    async def list_collections(self, force_refresh: bool = False) -> List[Dict[str, Any]]:
+        """List all collections with metadata"""
+        try:
+            collections = await self.catalog.get_collections(force_refresh)
+            aliases = await self.catalog.get_aliases()
             
-            return collections
+            listed = []
+            for name in await self.catalog.get_index_names():
+                if name in aliases:
+                    # Report the alias with the metadata of its current generation
+                    info = dict(collections.get(aliases[name], {'vectors_count': 0, 'status': 'unknown'}))
+                    info.update({'name': name, 'collection': aliases[name]})
+                else:
+                    info = dict(collections[name])
+                listed.append(info)
+            return listed
         except Exception as e:
             logger.error(f"Failed to list collections: {str(e)}")
             raise
@@ -197,10 +1573,10 @@ class QdrantService:
     async def get_collection_info(self, collection_name: str) -> Dict[str, Any]:
         """Get detailed information about a collection"""
         try:
-            info = self.client.get_collection(collection_name)
+            info = self.client.get_collection(await self.resolve_alias(collection_name))
             return {
                 'name': collection_name,
-                'vectors_count': info.vectors_count or 0,
+                'vectors_count': info.vectors_count or info.points_count or 0,
                 'status': info.status,
                 'config': info.config.dict() if info.config else {}
             }
@@ -209,42 +1585,243 @@ class QdrantService:
             raise
     
     async def delete_collection(self, collection_name: str) -> bool:
-        """Delete a collection"""
+        """Delete a collection, or an alias together with all of its generations"""
         try:
-            self.client.delete_collection(collection_name)
+            aliases = await self.catalog.get_aliases(force_refresh=True)
+            if collection_name in aliases:
+                self.client.update_collection_aliases(change_aliases_operations=[
+                    DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=collection_name))
+                ])
+                for generation_name in (await self.list_generations(collection_name)).values():
+                    self.client.delete_collection(generation_name)
+                    self.catalog.discard(generation_name)
+            else:
+                self.client.delete_collection(collection_name)
+            self.catalog.discard(collection_name)
+            self.catalog.invalidate()
+            self._bump_write_version(collection_name)
             logger.info(f"Deleted collection '{collection_name}'")
             return True
         except Exception as e:
             logger.error(f"Failed to delete collection '{collection_name}': {str(e)}")
             raise
     
-    def create_file_filter(self, file_pattern: Optional[str] = None) -> Optional[Filter]:
-        """Create filter for file patterns"""
-        if not file_pattern:
-            return None
+    async def resolve_alias(self, name: str) -> str:
+        """Resolve an index alias to the collection it currently points at"""
+        aliases = await self.catalog.get_aliases()
+        return aliases.get(name, name)
+    
+    async def create_generation(self, index_name: str, storage_profile: Optional[str] = None) -> str:
+        """Create the next generation collection of an index for a blue/green rebuild"""
+        generations = await self.list_generations(index_name, force_refresh=True)
+        next_generation = (max(generations) + 1) if generations else 1
+        collection_name = f"{index_name}--gen-{next_generation}"
+        await self.create_collection_if_not_exists(collection_name, storage_profile)
+        return collection_name
+    
+    async def list_generations(self, index_name: str, force_refresh: bool = False) -> Dict[int, str]:
+        """List generation collections of an index keyed by generation number"""
+        generations = {}
+        for name in await self.catalog.get_names(force_refresh):
+            match = self.catalog.GENERATION_PATTERN.match(name)
+            if match and match.group('index') == index_name:
+                generations[int(match.group('generation'))] = name
+        return generations
+    
+    async def switch_alias(self, index_name: str, collection_name: str) -> None:
+        """Atomically point the index alias at ``collection_name``
         
-        # Simple pattern matching - could be enhanced with regex
-        if '*' in file_pattern:
-            # Convert glob pattern to simple matching
-            pattern = file_pattern.replace('*', '')
-            return Filter(
-                must=[
-                    FieldCondition(
-                        key="filePath",
-                        match=MatchValue(value=pattern)
-                    )
-                ]
+        A plain collection that still uses the index name (indexed before
+        aliases were introduced) has to be deleted first, so that one-time
+        migration is not atomic.
+        """
+        try:
+            aliases = await self.catalog.get_aliases(force_refresh=True)
+            operations = []
+            if index_name in aliases:
+                operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=index_name)))
+            elif index_name in await self.catalog.get_names():
+                logger.warning(f"Replacing legacy collection '{index_name}' with an alias")
+                self.client.delete_collection(index_name)
+            operations.append(CreateAliasOperation(
+                create_alias=CreateAlias(collection_name=collection_name, alias_name=index_name)
+            ))
+            
+            self.client.update_collection_aliases(change_aliases_operations=operations)
+            self.catalog.invalidate()
+            self._bump_write_version(index_name)
+            logger.info(f"Alias '{index_name}' now points at '{collection_name}'")
+        except Exception as e:
+            logger.error(f"Failed to switch alias '{index_name}' to '{collection_name}': {str(e)}")
+            raise
+    
+    async def delete_old_generations(self, index_name: str, keep: int = 1) -> List[str]:
+        """Garbage-collect generations older than the live one, keeping ``keep`` for rollback"""
+        aliases = await self.catalog.get_aliases(force_refresh=True)
+        live_collection = aliases.get(index_name)
+        generations = await self.list_generations(index_name)
+        
+        previous = [
+            generations[number] for number in sorted(generations, reverse=True)
+            if generations[number] != live_collection
+        ]
+        deleted = []
+        for collection_name in previous[max(0, keep):]:
+            await self.delete_collection(collection_name)
+            deleted.append(collection_name)
+        return deleted
+    
+    async def delete_file_points(
+        self,
+        collection_name: str,
+        file_paths: List[str],
+        index_name: Optional[str] = None
+    ) -> None:
+        """Delete the chunks of the given files, optionally limited to one repo"""
+        if not file_paths:
+            return
+        file_filter = Filter(
+            must=[FieldCondition(key="filePath", match=MatchAny(any=file_paths))]
+        )
+        if index_name:
+            file_filter.must.append(
+                FieldCondition(key=self.REPO_KEY, match=MatchValue(value=index_name))
             )
-        else:
-            return Filter(
-                must=[
-                    FieldCondition(
-                        key="filePath",
-                        match=MatchValue(value=file_pattern)
-                    )
-                ]
+        try:
+            self.client.delete(
+                collection_name=collection_name,
+                points_selector=FilterSelector(filter=file_filter)
+            )
+            self._bump_write_version(collection_name)
+            logger.info(f"Deleted chunks of {len(file_paths)} files from '{collection_name}'")
+        except Exception as e:
+            logger.error(f"Failed to delete file chunks from '{collection_name}': {str(e)}")
+            raise
+    
+    async def scroll_points(
+        self,
+        collection_name: str,
+        filter_conditions: Optional[Filter] = None,
+        limit: int = 100,
+        offset: Optional[Any] = None,
+        with_vectors: bool = False,
+        with_payload: Any = True
+    ) -> Tuple[List[Any], Optional[Any]]:
+        """Read one page of points; returns the points and the next page offset"""
+        filter_conditions = self._hide_other_generations(collection_name, filter_conditions)
+        try:
+            return await self._run_in_executor(
+                self.client.scroll,
+                collection_name=collection_name,
+                scroll_filter=filter_conditions,
+                limit=limit,
+                offset=offset,
+                with_vectors=with_vectors,
+                with_payload=with_payload
+            )
+        except Exception as e:
+            logger.error(f"Scroll failed in '{collection_name}': {str(e)}")
+            raise
+    
+    async def count_points(self, collection_name: str, filter_conditions: Optional[Filter] = None) -> int:
+        """Count the points of a collection matching a filter"""
+        filter_conditions = self._hide_other_generations(collection_name, filter_conditions)
+        try:
+            result = await self._run_in_executor(
+                self.client.count,
+                collection_name=collection_name,
+                count_filter=filter_conditions,
+                exact=True
+            )
+            return result.count
+        except Exception as e:
+            logger.error(f"Count failed in '{collection_name}': {str(e)}")
+            raise
+    
+    async def retrieve_payloads(
+        self,
+        collection_name: str,
+        point_ids: List[Any],
+        with_payload: Any = True
+    ) -> Dict[Any, Dict[str, Any]]:
+        """Read the payloads of points by ID, keyed by point ID"""
+        try:
+            points = await self._run_in_executor(
+                self.client.retrieve,
+                collection_name=collection_name,
+                ids=point_ids,
+                with_payload=with_payload,
+                with_vectors=False
+            )
+            return {point.id: point.payload or {} for point in points}
+        except Exception as e:
+            logger.error(f"Retrieve failed in '{collection_name}': {str(e)}")
+            raise
+    
+    async def delete_repo_points(
+        self,
+        index_name: str,
+        generation: Optional[int] = None,
+        keep_generation: Optional[int] = None
+    ) -> bool:
+        """Delete points of one repo from the shared collection
+        
+        ``generation`` limits the delete to one index generation and
+        ``keep_generation`` deletes everything except that generation.
+        Deleting the whole repo also forgets its live generation.
+        """
+        repo_filter = Filter(
+            must=[FieldCondition(key=self.REPO_KEY, match=MatchValue(value=index_name))]
+        )
+        if generation is not None:
+            repo_filter.must.append(
+                FieldCondition(key=self.GENERATION_KEY, match=MatchValue(value=generation))
             )
+        if keep_generation is not None:
+            repo_filter.must_not = [
+                FieldCondition(key=self.GENERATION_KEY, match=MatchValue(value=keep_generation))
+            ]
+        try:
+            self.client.delete(
+                collection_name=self.shared_collection_name,
+                points_selector=FilterSelector(filter=repo_filter)
+            )
+            self._bump_write_version(self.shared_collection_name)
+            if generation is None and keep_generation is None and \
+                    self.live_generations.pop(index_name, None) is not None:
+                self._save_live_generations()
+            logger.info(f"Deleted repo '{index_name}' from '{self.shared_collection_name}'")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delete repo '{index_name}': {str(e)}")
+            raise
+    
+    async def list_repos(self, limit: int = 1000) -> List[Dict[str, Any]]:
+        """List repos stored in the shared collection with their point counts"""
+        try:
+            response = self.client.facet(
+                collection_name=self.shared_collection_name,
+                key=self.REPO_KEY,
+                facet_filter=self._hide_other_generations(self.shared_collection_name, None),
+                limit=limit
+            )
+            return [{'name': hit.value, 'vectors_count': hit.count} for hit in response.hits]
+        except Exception as e:
+            logger.error(f"Failed to list repos in '{self.shared_collection_name}': {str(e)}")
+            raise
+    
+    def create_file_filter(self, file_pattern: Optional[str] = None) -> Optional[Filter]:
+        """Create filter for file patterns
+        
+        The filter only narrows by indexed path fields; when the pattern's
+        ``needs_post_filter`` is set, results must still be checked with
+        ``compile_path_pattern(file_pattern).matches``.
+        """
+        path_pattern = compile_path_pattern(file_pattern)
+        if not path_pattern or not path_pattern.conditions:
+            return None
+        return Filter(must=list(path_pattern.conditions))
     
     def get_collection_name_for_path(self, path: str, custom_name: Optional[str] = None) -> str:
-        """Get collection name for a given path"""
+        """Get collection (index) name for a given path"""
         return self._generate_collection_name(path, custom_name)
\ No newline at end of file
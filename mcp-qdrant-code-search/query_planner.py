@@ -0,0 +1,95 @@
+"""Query classification that routes exact lookups away from vector search"""
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+from code_chunker import CodeChunker
+
+QUERY_ROUTES = ("auto", "symbol", "path", "regex", "vector")
+
+IDENTIFIER_QUERY_PATTERN = re.compile(r"[A-Za-z_$][\w$]*(?:(?:\.|::|#)[A-Za-z_$][\w$]*)*(?:\(\))?")
+PATH_QUERY_PATTERN = re.compile(r"[\w.\-*?/\[\]{}!]+")
+REGEX_HINT_PATTERN = re.compile(r"\\[wdsbWDSB]|\.[*+]|\[[^\]]+\][*+?]|\(\?|[^\\]\||^\^|[^\\]\$$")
+REGEX_LITERAL_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+CAMEL_HUMP_PATTERN = re.compile(r"[a-z0-9][A-Z]")
+
+
+@dataclass
+class QueryPlan:
+    """How a query will be answered
+    
+    ``kind`` is what the query looks like (identifier, path, regex or
+    natural), ``route`` what answers it (symbol, path, regex or vector) and
+    ``term`` the normalised lookup term for that route.
+    """
+    kind: str
+    route: str
+    term: str
+    reason: str
+    literals: Optional[List[str]] = None
+
+
+def _looks_like_path(text: str) -> bool:
+    """Whether a single-token query names a file, directory or glob"""
+    if not PATH_QUERY_PATTERN.fullmatch(text):
+        return False
+    if "/" in text:
+        return True
+    suffix = text.rsplit(".", 1)[-1].lower() if "." in text else ""
+    return f".{suffix}" in CodeChunker.LANGUAGE_MAPPING
+
+
+def _looks_like_identifier(text: str) -> bool:
+    """Whether a single-token query is a code identifier rather than an English word"""
+    if not IDENTIFIER_QUERY_PATTERN.fullmatch(text):
+        return False
+    return (
+        "_" in text
+        or "." in text
+        or "::" in text
+        or "#" in text
+        or text.endswith("()")
+        or bool(CAMEL_HUMP_PATTERN.search(text))
+    )
+
+
+def plan_query(query: str, route: str = "auto") -> QueryPlan:
+    """Classify a query and pick the route that answers it best
+    
+    Dotted, snake_case and camelCase names go to the symbol index, paths and
+    globs to a payload-filtered scroll, and patterns with regex syntax to a
+    lexical search whose candidates are matched against the regex. Anything
+    else, including single plain words, goes to vector search. A ``route``
+    other than ``auto`` overrides the choice.
+    """
+    if route not in QUERY_ROUTES:
+        raise ValueError(f"Unknown route '{route}'. Available: {', '.join(QUERY_ROUTES)}")
+    plan = _classify(query.strip())
+    if route in ("auto", plan.route):
+        return plan
+    literals = REGEX_LITERAL_PATTERN.findall(re.sub(r"\\.", " ", plan.term)) if route == "regex" else None
+    return QueryPlan(plan.kind, route, plan.term, "requested route", literals)
+
+
+def _classify(text: str) -> QueryPlan:
+    """Plan for a stripped query by its shape"""
+    if REGEX_HINT_PATTERN.search(text):
+        try:
+            re.compile(text)
+        except re.error:
+            pass
+        else:
+            literals = REGEX_LITERAL_PATTERN.findall(re.sub(r"\\.", " ", text))
+            if literals:
+                return QueryPlan("regex", "regex", text, "regex syntax", literals)
+    
+    if text and not any(char.isspace() for char in text):
+        if _looks_like_path(text):
+            return QueryPlan("path", "path", text, "path or file name")
+        if _looks_like_identifier(text):
+            term = re.sub(r"::|#", ".", text)
+            if term.endswith("()"):
+                term = term[:-2]
+            return QueryPlan("identifier", "symbol", term, "code identifier")
+    
+    return QueryPlan("natural", "vector", text, "natural language")
@@ -0,0 +1,115 @@
+"""Optional cross-encoder reranking of vector search candidates"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sentence_transformers import CrossEncoder
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """Reranks the top vector candidates with a local CPU cross-encoder
+    
+    Candidates are scored in batches until the millisecond budget is spent.
+    Reranking is all-or-nothing: if the budget runs out before every candidate
+    is scored, the vector order is kept, so a slow request never returns a
+    half-reranked list. Model loading happens once, outside the budget.
+    """
+    
+    # Cross-encoders are trained on short passages; longer chunks are truncated
+    MAX_LENGTH = 512
+    
+    def __init__(self, config: Config):
+        self.model_name = config.rerank_model
+        self.top_n = config.rerank_top_n
+        self.budget_ms = config.rerank_budget_ms
+        self.batch_size = config.rerank_batch_size
+        self._model: Optional[CrossEncoder] = None
+        self._load_lock: Optional[asyncio.Lock] = None
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether a rerank model is configured"""
+        return bool(self.model_name)
+    
+    async def _get_model(self) -> CrossEncoder:
+        """Load the cross-encoder on first use"""
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if self._model is None:
+                logger.info(f"Loading rerank model '{self.model_name}'")
+                loop = asyncio.get_running_loop()
+                self._model = await loop.run_in_executor(
+                    None, lambda: CrossEncoder(self.model_name, max_length=self.MAX_LENGTH, device="cpu")
+                )
+        return self._model
+    
+    @staticmethod
+    def _passage(result: Dict[str, Any]) -> str:
+        """Text the cross-encoder sees for a candidate"""
+        return f"{result.get('file_path', '')}\n{result.get('code_chunk', '')}"
+    
+    async def rerank(
+        self,
+        query: str,
+        results: List[Dict[str, Any]],
+        budget_ms: Optional[float] = None
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Rerank the top-N candidates within the budget
+        
+        ``budget_ms`` (default: the configured budget) lets a caller with a
+        deadline pass a smaller one. Returns the (possibly reordered) results
+        and a report with the number of candidates, how many were scored, the
+        elapsed milliseconds and whether the rerank order was applied.
+        """
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        candidates = results[:self.top_n]
+        report = {
+            "model": self.model_name,
+            "candidates": len(candidates),
+            "scored": 0,
+            "budget_ms": round(budget_ms, 1),
+            "applied": False,
+        }
+        if len(candidates) < 2:
+            report["elapsed_ms"] = 0.0
+            return results, report
+        
+        model = await self._get_model()
+        loop = asyncio.get_running_loop()
+        pairs = [(query, self._passage(result)) for result in candidates]
+        scores: List[float] = []
+        
+        start = time.perf_counter()
+        for i in range(0, len(pairs), self.batch_size):
+            remaining = budget_ms / 1000 - (time.perf_counter() - start)
+            if remaining <= 0:
+                break
+            batch = pairs[i:i + self.batch_size]
+            try:
+                batch_scores = await asyncio.wait_for(
+                    loop.run_in_executor(None, lambda batch=batch: model.predict(batch, batch_size=len(batch))),
+                    timeout=remaining
+                )
+            except asyncio.TimeoutError:
+                break
+            scores.extend(float(score) for score in batch_scores)
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        report["scored"] = len(scores)
+        
+        if len(scores) < len(candidates):
+            logger.info(
+                f"Rerank over budget ({report['elapsed_ms']} ms > {report['budget_ms']} ms, "
+                f"{len(scores)}/{len(candidates)} scored); keeping vector order"
+            )
+            return results, report
+        
+        for result, score in zip(candidates, scores):
+            result['rerank_score'] = score
+        reranked = sorted(candidates, key=lambda result: result['rerank_score'], reverse=True)
+        report["applied"] = True
+        return reranked + results[len(candidates):], report
@@ -0,0 +1,164 @@
+"""Admission control, priorities and coalescing of tool calls"""
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RequestScheduler:
+    """Admits tool calls through separate interactive and background pools
+    
+    Each pool has its own concurrency limit, so a long index run cannot hold
+    the slots searches need. Background work also yields to interactive
+    work between batches: ``yield_to_interactive`` holds the next batch back
+    while interactive calls are running or queued, for at most
+    ``BACKGROUND_MAX_YIELD`` seconds so indexing still progresses under a
+    steady search load. Identical calls in flight are coalesced: later
+    callers await the result of the first one.
+    """
+    
+    INTERACTIVE = "interactive"
+    BACKGROUND = "background"
+    
+    # Longest a background batch waits for interactive calls, in seconds
+    BACKGROUND_MAX_YIELD = 2.0
+    
+    # Recent queue waits kept per pool for the statistics
+    WAIT_SAMPLES = 1024
+    
+    def __init__(self, interactive_concurrency: int, background_concurrency: int):
+        self.limits = {
+            self.INTERACTIVE: max(1, interactive_concurrency),
+            self.BACKGROUND: max(1, background_concurrency),
+        }
+        self.running = dict.fromkeys(self.limits, 0)
+        self.queued = dict.fromkeys(self.limits, 0)
+        self.peak_queued = dict.fromkeys(self.limits, 0)
+        self.admitted = dict.fromkeys(self.limits, 0)
+        self.waits: Dict[str, Deque[float]] = {pool: deque(maxlen=self.WAIT_SAMPLES) for pool in self.limits}
+        self.coalesced = 0
+        self.yields = 0
+        self.yield_seconds = 0.0
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._condition: Optional[asyncio.Condition] = None
+    
+    def _get_condition(self) -> asyncio.Condition:
+        """Create the condition on first use, inside the running event loop"""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+    
+    def _interactive_busy(self) -> bool:
+        """Whether interactive calls are running or waiting for a slot"""
+        return bool(self.running[self.INTERACTIVE] or self.queued[self.INTERACTIVE])
+    
+    @asynccontextmanager
+    async def admit(self, pool: str) -> AsyncIterator[float]:
+        """Hold a slot of a pool, waiting for one if it is full
+        
+        Yields the milliseconds spent in the queue.
+        """
+        if pool not in self.limits:
+            raise ValueError(f"Unknown pool '{pool}'. Available: {', '.join(self.limits)}")
+        condition = self._get_condition()
+        start = time.perf_counter()
+        self.queued[pool] += 1
+        self.peak_queued[pool] = max(self.peak_queued[pool], self.queued[pool])
+        try:
+            async with condition:
+                await condition.wait_for(lambda: self.running[pool] < self.limits[pool])
+                self.running[pool] += 1
+        finally:
+            self.queued[pool] -= 1
+        wait_ms = (time.perf_counter() - start) * 1000
+        self.waits[pool].append(wait_ms)
+        self.admitted[pool] += 1
+        try:
+            yield wait_ms
+        finally:
+            async with condition:
+                self.running[pool] -= 1
+                condition.notify_all()
+    
+    async def run(
+        self,
+        pool: str,
+        call: Callable[[], Awaitable[Any]],
+        key: Optional[Hashable] = None
+    ) -> Any:
+        """Run a call in a pool, joining an identical call in flight
+        
+        Calls with the same ``key`` share one execution. The shared call is
+        shielded, so a caller that gives up does not cancel it for the others.
+        """
+        async def admitted_call() -> Any:
+            async with self.admit(pool):
+                return await call()
+        
+        if key is None:
+            return await admitted_call()
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+        task = asyncio.ensure_future(admitted_call())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+    
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        """Drop a finished call so the next identical one runs afresh"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            # Retrieved here in case every caller gave up waiting
+            logger.debug(f"Coalesced call failed: {task.exception()}")
+    
+    async def yield_to_interactive(self) -> float:
+        """Hold background work back while interactive calls run or wait
+        
+        Returns the seconds waited.
+        """
+        if not self._interactive_busy():
+            return 0.0
+        condition = self._get_condition()
+        start = time.perf_counter()
+        async with condition:
+            try:
+                await asyncio.wait_for(
+                    condition.wait_for(lambda: not self._interactive_busy()),
+                    timeout=self.BACKGROUND_MAX_YIELD
+                )
+            except asyncio.TimeoutError:
+                pass
+        waited = time.perf_counter() - start
+        self.yields += 1
+        self.yield_seconds += waited
+        return waited
+    
+    def stats(self) -> Dict[str, Any]:
+        """Slots, queue depth and queue waits of every pool"""
+        pools = {}
+        for pool, limit in self.limits.items():
+            waits = sorted(self.waits[pool])
+            pools[pool] = {
+                "limit": limit,
+                "running": self.running[pool],
+                "queued": self.queued[pool],
+                "peak_queued": self.peak_queued[pool],
+                "admitted": self.admitted[pool],
+                "mean_wait_ms": sum(waits) / len(waits) if waits else 0.0,
+                "p95_wait_ms": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                "max_wait_ms": waits[-1] if waits else 0.0,
+            }
+        return {
+            "pools": pools,
+            "in_flight": len(self._in_flight),
+            "coalesced": self.coalesced,
+            "yields": self.yields,
+            "yield_seconds": self.yield_seconds,
+        }
@@ -0,0 +1,93 @@
+"""In-process LRU cache for search results"""
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class SearchCache:
+    """Memory-bounded LRU cache of search results
+    
+    Keys include the write version of the searched collection (see
+    ``QdrantService.get_write_version``), so any index, update or delete done
+    through this process makes older entries unreachable; they are evicted as
+    the cache fills. ``ttl`` bounds staleness from writes made by other
+    processes.
+    """
+    
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether caching is switched on"""
+        return self.max_bytes > 0
+    
+    @staticmethod
+    def estimate_size(value: Any) -> int:
+        """Approximate the memory held by a cached value"""
+        return len(json.dumps(value, default=str))
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a cached value and mark it recently used, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        value, size, stored_at = entry
+        if self.ttl and time.monotonic() - stored_at > self.ttl:
+            self._remove(key)
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting least recently used entries to fit"""
+        if not self.enabled:
+            return
+        size = self.estimate_size(value)
+        if size > self.max_bytes:
+            return
+        
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, size, time.monotonic())
+        self.current_bytes += size
+        
+        while self.current_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+    
+    def _remove(self, key: Hashable) -> None:
+        """Drop one entry"""
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+    
+    def clear(self) -> None:
+        """Drop every entry, keeping the statistics"""
+        self._entries.clear()
+        self.current_bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate and memory statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
@@ -1,5 +1,6 @@
 """MCP Server for Qdrant-based semantic code search"""
 import asyncio
+import json
 import logging
 from typing import Any, Dict, List, Optional, Sequence
 from mcp.server import Server
@@ -15,7 +16,10 @@ from mcp.types import (
 from config import Config
 from qdrant_service import QdrantService
 from code_indexer import CodeIndexer
+from code_chunker import preview_line
 from code_searcher import CodeSearcher
+from deadlines import Deadline
+from scheduler import RequestScheduler
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -25,11 +29,40 @@ logger = logging.getLogger(__name__)
 class CodeSearchMCPServer:
     """MCP Server for semantic code search using Qdrant"""
     
+    # Rough characters per token used for compact response budgets
+    CHARS_PER_TOKEN = 4
+    
+    # How query plan routes are named in responses
+    ROUTE_LABELS = {
+        "symbol": "symbol index",
+        "path": "path scroll",
+        "regex": "lexical regex scan",
+        "vector": "vector search",
+    }
+    
+    # Tools run in the background pool; the others are interactive
+    BACKGROUND_TOOLS = frozenset({"code_index", "index_import", "index_export"})
+    
+    # Tools whose identical calls in flight share one execution
+    COALESCED_TOOLS = frozenset({
+        "code_index", "code_search", "code_search_batch", "code_scroll", "find_symbol",
+        "search_suggestions", "callers_of", "callees_of", "dependents_of", "list_collections",
+        "collection_info",
+    })
+    
+    # Tools answered at once, even when the pools are full
+    UNSCHEDULED_TOOLS = frozenset({"search_stats"})
+    
+    # Tools whose deadline starts when the call arrives, so queue time counts.
+    # find_symbol is not one: it reads the local symbol tables, not Qdrant.
+    DEADLINE_TOOLS = frozenset({"code_search", "code_search_batch", "code_scroll"})
+    
     def __init__(self):
         self.config = Config.from_env()
         self.qdrant_service = QdrantService(self.config)
-        self.code_indexer = CodeIndexer(self.config, self.qdrant_service)
-        self.code_searcher = CodeSearcher(self.config, self.qdrant_service)
+        self.scheduler = RequestScheduler(self.config.interactive_concurrency, self.config.background_concurrency)
+        self.code_indexer = CodeIndexer(self.config, self.qdrant_service, self.scheduler)
+        self.code_searcher = CodeSearcher(self.config, self.qdrant_service, self.scheduler)
         self.server = Server("qdrant-code-search")
         self._setup_handlers()
     
@@ -64,6 +97,15 @@ class CodeSearchMCPServer:
                                     "type": "array",
                                     "items": {"type": "string"},
                                     "description": "Patterns to exclude (e.g., ['node_modules/**', '*.pyc'])"
+                                },
+                                "storage_profile": {
+                                    "type": "string",
+                                    "enum": ["latency", "balanced", "memory"],
+                                    "description": "Storage profile for a new collection (default: STORAGE_PROFILE)"
+                                },
+                                "incremental": {
+                                    "type": "boolean",
+                                    "description": "Only re-embed files changed since the last index run (default: false)"
                                 }
                             },
                             "required": ["path"]
@@ -85,7 +127,7 @@ class CodeSearchMCPServer:
                                 },
                                 "file_pattern": {
                                     "type": "string",
-                                    "description": "File pattern filter (e.g., '*.py')"
+                                    "description": "Glob file filter (e.g., '*.py', 'src/**/*.ts', 'lib/')"
                                 },
                                 "limit": {
                                     "type": "integer",
@@ -94,9 +136,305 @@ class CodeSearchMCPServer:
                                 "similarity_threshold": {
                                     "type": "number",
                                     "description": "Minimum similarity score (0.0-1.0, default: 0.7)"
+                                },
+                                "hnsw_ef": {
+                                    "type": "integer",
+                                    "description": "HNSW search beam width; higher improves recall at the cost of latency"
+                                },
+                                "exact": {
+                                    "type": "boolean",
+                                    "description": "Bypass the HNSW index and do an exact (full recall) search"
+                                },
+                                "search_mode": {
+                                    "type": "string",
+                                    "enum": ["dense", "hybrid", "signature", "two_stage"],
+                                    "description": "dense (semantic only), hybrid (semantic + exact identifier/string matches, fused by rank), signature (shortlist on small signature vectors, rescore with full vectors) or two_stage (closest files first, then their chunks; needs collection_name)"
+                                },
+                                "rerank": {
+                                    "type": "boolean",
+                                    "description": "Rerank top candidates with the cross-encoder (default: on when RERANK_MODEL is set)"
+                                },
+                                "route": {
+                                    "type": "string",
+                                    "enum": ["auto", "symbol", "path", "regex", "vector"],
+                                    "description": "auto answers identifiers, paths and regexes without vector search; vector always embeds the query"
+                                },
+                                "diversity": {
+                                    "type": "string",
+                                    "enum": ["none", "mmr", "file"],
+                                    "description": "mmr avoids near-duplicate results; file returns one result per file. Both merge overlapping chunks (not paged)"
+                                },
+                                "response_mode": {
+                                    "type": "string",
+                                    "enum": ["full", "compact"],
+                                    "description": "full prints every code body; compact fits the response into max_tokens"
+                                },
+                                "max_tokens": {
+                                    "type": "integer",
+                                    "description": "Approximate token budget of the response (implies compact mode)"
+                                },
+                                "deadline_ms": {
+                                    "type": "integer",
+                                    "description": "Time budget in milliseconds; when it runs out the best partial results are returned, flagged as partial (default: SEARCH_DEADLINE_MS)"
+                                },
+                                "cursor": {
+                                    "type": "string",
+                                    "description": "next_cursor of a previous search to get its next page (other arguments are ignored)"
+                                }
+                            }
+                        }
+                    ),
+                    Tool(
+                        name="code_search_batch",
+                        description="Run several related code searches in one round trip (one embedding call, one batched Qdrant request)",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "queries": {
+                                    "type": "array",
+                                    "items": {"type": "string"},
+                                    "description": "Natural language queries; results are grouped per query"
+                                },
+                                "collection_name": {
+                                    "type": "string",
+                                    "description": "Collection to search in (optional, searches all if not provided)"
+                                },
+                                "file_pattern": {
+                                    "type": "string",
+                                    "description": "File pattern filter applied to every query (e.g., '*.py')"
+                                },
+                                "limit": {
+                                    "type": "integer",
+                                    "description": "Maximum number of results per query (default: 10)"
+                                },
+                                "similarity_threshold": {
+                                    "type": "number",
+                                    "description": "Minimum similarity score (0.0-1.0, default: 0.7)"
+                                },
+                                "search_mode": {
+                                    "type": "string",
+                                    "enum": ["dense", "hybrid"],
+                                    "description": "dense (semantic only) or hybrid (semantic + exact identifier/string matches)"
+                                },
+                                "response_mode": {
+                                    "type": "string",
+                                    "enum": ["full", "compact"],
+                                    "description": "full prints every code body; compact fits the response into max_tokens"
+                                },
+                                "max_tokens": {
+                                    "type": "integer",
+                                    "description": "Approximate token budget of the whole response, shared by the queries (implies compact mode)"
+                                },
+                                "deadline_ms": {
+                                    "type": "integer",
+                                    "description": "Time budget in milliseconds shared by the queries (default: SEARCH_DEADLINE_MS)"
                                 }
                             },
-                            "required": ["query"]
+                            "required": ["queries"]
+                        }
+                    ),
+                    Tool(
+                        name="code_scroll",
+                        description="Browse indexed chunks matching filters page by page, without a query (e.g., all functions in a directory)",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "collection_name": {
+                                    "type": "string",
+                                    "description": "Collection to browse"
+                                },
+                                "file_pattern": {
+                                    "type": "string",
+                                    "description": "Glob file filter (e.g., 'src/api/**')"
+                                },
+                                "language": {
+                                    "type": "string",
+                                    "description": "Language filter (e.g., 'python')"
+                                },
+                                "chunk_type": {
+                                    "type": "string",
+                                    "description": "Chunk type filter (e.g., 'function', 'class')"
+                                },
+                                "function_name": {
+                                    "type": "string",
+                                    "description": "Exact function name"
+                                },
+                                "class_name": {
+                                    "type": "string",
+                                    "description": "Exact class name"
+                                },
+                                "limit": {
+                                    "type": "integer",
+                                    "description": "Chunks per page (default: 20)"
+                                },
+                                "response_mode": {
+                                    "type": "string",
+                                    "enum": ["full", "compact"],
+                                    "description": "full prints every code body; compact fits the response into max_tokens"
+                                },
+                                "max_tokens": {
+                                    "type": "integer",
+                                    "description": "Approximate token budget of the response (implies compact mode)"
+                                },
+                                "deadline_ms": {
+                                    "type": "integer",
+                                    "description": "Time budget in milliseconds; when it runs out the page ends early, flagged as partial, and its cursor resumes from there (default: SEARCH_DEADLINE_MS)"
+                                },
+                                "cursor": {
+                                    "type": "string",
+                                    "description": "next_cursor of the previous page (other arguments are ignored)"
+                                }
+                            }
+                        }
+                    ),
+                    Tool(
+                        name="find_symbol",
+                        description="Find function, method and class definitions by name (exact, prefix or fuzzy) from the local symbol table, without embedding a query",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "name": {
+                                    "type": "string",
+                                    "description": "Symbol name, or Class.method to restrict to one class"
+                                },
+                                "match": {
+                                    "type": "string",
+                                    "enum": ["auto", "exact", "prefix", "fuzzy"],
+                                    "description": "Match mode (default: auto, which tries exact, then prefix, then fuzzy)"
+                                },
+                                "kind": {
+                                    "type": "string",
+                                    "enum": ["function", "method", "class"],
+                                    "description": "Only return this kind of definition"
+                                },
+                                "collection_name": {
+                                    "type": "string",
+                                    "description": "Index to search (optional, defaults to all indexes)"
+                                },
+                                "limit": {
+                                    "type": "integer",
+                                    "description": "Maximum number of symbols (default: 20)"
+                                }
+                            },
+                            "required": ["name"]
+                        }
+                    ),
+                    Tool(
+                        name="search_suggestions",
+                        description="Complete the last word of a partial query with identifiers and file paths from the index, most frequent first",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "partial_query": {
+                                    "type": "string",
+                                    "description": "Query typed so far"
+                                },
+                                "collection_name": {
+                                    "type": "string",
+                                    "description": "Index to draw suggestions from (optional, defaults to all indexes)"
+                                },
+                                "limit": {
+                                    "type": "integer",
+                                    "description": "Maximum number of suggestions (default: 5)"
+                                }
+                            },
+                            "required": ["partial_query"]
+                        }
+                    ),
+                    Tool(
+                        name="callers_of",
+                        description="List the call sites of a function or method from the local code graph, without vector search",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "name": {
+                                    "type": "string",
+                                    "description": "Function or method name (Class.method is matched by method name)"
+                                },
+                                "collection_name": {
+                                    "type": "string",
+                                    "description": "Index to search (optional, defaults to all indexes)"
+                                },
+                                "limit": {
+                                    "type": "integer",
+                                    "description": "Maximum number of call sites (default: 50)"
+                                }
+                            },
+                            "required": ["name"]
+                        }
+                    ),
+                    Tool(
+                        name="callees_of",
+                        description="List the functions a definition calls and where the index defines them, from the local code graph",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "name": {
+                                    "type": "string",
+                                    "description": "Function, method or Class.method name"
+                                },
+                                "collection_name": {
+                                    "type": "string",
+                                    "description": "Index to search (optional, defaults to all indexes)"
+                                },
+                                "limit": {
+                                    "type": "integer",
+                                    "description": "Maximum number of callees (default: 50)"
+                                }
+                            },
+                            "required": ["name"]
+                        }
+                    ),
+                    Tool(
+                        name="dependents_of",
+                        description="List the files that import a file or module, following imports transitively up to a depth",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "target": {
+                                    "type": "string",
+                                    "description": "File path relative to the indexed root, or dotted module name"
+                                },
+                                "collection_name": {
+                                    "type": "string",
+                                    "description": "Index to search (optional, defaults to all indexes)"
+                                },
+                                "depth": {
+                                    "type": "integer",
+                                    "description": "Import hops to follow (default: 1, direct importers only)"
+                                },
+                                "limit": {
+                                    "type": "integer",
+                                    "description": "Maximum number of files (default: 100)"
+                                }
+                            },
+                            "required": ["target"]
+                        }
+                    ),
+                    Tool(
+                        name="find_duplicates",
+                        description="Find clusters of near-duplicate code in an index from its stored vectors; runs as a resumable background job, call again for progress and results",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "collection_name": {
+                                    "type": "string",
+                                    "description": "Index to scan"
+                                },
+                                "similarity_threshold": {
+                                    "type": "number",
+                                    "description": "Minimum similarity of a duplicate pair (default: 0.95)"
+                                },
+                                "restart": {
+                                    "type": "boolean",
+                                    "description": "Discard an earlier scan and start over (default: false)"
+                                },
+                                "limit": {
+                                    "type": "integer",
+                                    "description": "Maximum number of clusters reported (default: 20)"
+                                }
+                            },
+                            "required": ["collection_name"]
                         }
                     ),
                     Tool(
@@ -120,6 +458,73 @@ class CodeSearchMCPServer:
                             },
                             "required": ["collection_name"]
                         }
+                    ),
+                    Tool(
+                        name="set_storage_profile",
+                        description="Change the HNSW and on-disk storage profile of an existing collection",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "collection_name": {
+                                    "type": "string",
+                                    "description": "Name of the collection to update"
+                                },
+                                "storage_profile": {
+                                    "type": "string",
+                                    "enum": ["latency", "balanced", "memory"],
+                                    "description": "Profile to apply"
+                                }
+                            },
+                            "required": ["collection_name", "storage_profile"]
+                        }
+                    ),
+                    Tool(
+                        name="index_export",
+                        description="Export a collection's vectors, payloads and file manifest to a compressed snapshot file",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "collection_name": {
+                                    "type": "string",
+                                    "description": "Collection to export"
+                                },
+                                "output_path": {
+                                    "type": "string",
+                                    "description": "Snapshot file to write (e.g., 'my-app.snapshot.gz')"
+                                }
+                            },
+                            "required": ["collection_name", "output_path"]
+                        }
+                    ),
+                    Tool(
+                        name="index_import",
+                        description="Bulk-load a snapshot, then re-embed only files that changed since it was exported",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "input_path": {
+                                    "type": "string",
+                                    "description": "Snapshot file to import"
+                                },
+                                "path": {
+                                    "type": "string",
+                                    "description": "Local checkout of the codebase to bring the index up to date with (optional)"
+                                },
+                                "collection_name": {
+                                    "type": "string",
+                                    "description": "Collection name (optional, derived from path or the snapshot)"
+                                }
+                            },
+                            "required": ["input_path"]
+                        }
+                    ),
+                    Tool(
+                        name="search_stats",
+                        description="Show search result cache hit rate and memory use, and the queue depth and wait times of the request scheduler",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {}
+                        }
                     )
                 ]
             )
@@ -128,45 +533,102 @@ class CodeSearchMCPServer:
         async def call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
             """Handle tool calls"""
             try:
-                if name == "code_index":
-                    return await self._handle_code_index(arguments)
-                elif name == "code_search":
-                    return await self._handle_code_search(arguments)
-                elif name == "list_collections":
-                    return await self._handle_list_collections(arguments)
-                elif name == "collection_info":
-                    return await self._handle_collection_info(arguments)
-                else:
-                    raise ValueError(f"Unknown tool: {name}")
+                if name in self.UNSCHEDULED_TOOLS:
+                    return await self._dispatch_tool(name, arguments)
+                deadline = None
+                if name in self.DEADLINE_TOOLS:
+                    deadline = self.code_searcher.start_deadline(arguments.get("deadline_ms"))
+                pool = RequestScheduler.BACKGROUND if name in self.BACKGROUND_TOOLS else RequestScheduler.INTERACTIVE
+                key = None
+                if name in self.COALESCED_TOOLS:
+                    key = (name, json.dumps(arguments, sort_keys=True, default=str))
+                return await self.scheduler.run(pool, lambda: self._dispatch_tool(name, arguments, deadline), key)
             except Exception as e:
                 logger.error(f"Error in tool '{name}': {str(e)}")
                 return CallToolResult(
                     content=[TextContent(type="text", text=f"Error: {str(e)}")]
                 )
     
+    async def _dispatch_tool(
+        self,
+        name: str,
+        arguments: Dict[str, Any],
+        deadline: Optional[Deadline] = None
+    ) -> CallToolResult:
+        """Run the handler of a tool, passing searches the deadline started on arrival"""
+        if name == "code_index":
+            return await self._handle_code_index(arguments)
+        elif name == "code_search":
+            return await self._handle_code_search(arguments, deadline)
+        elif name == "code_search_batch":
+            return await self._handle_code_search_batch(arguments, deadline)
+        elif name == "code_scroll":
+            return await self._handle_code_scroll(arguments, deadline)
+        elif name == "find_symbol":
+            return await self._handle_find_symbol(arguments)
+        elif name == "search_suggestions":
+            return await self._handle_search_suggestions(arguments)
+        elif name == "callers_of":
+            return await self._handle_callers_of(arguments)
+        elif name == "callees_of":
+            return await self._handle_callees_of(arguments)
+        elif name == "dependents_of":
+            return await self._handle_dependents_of(arguments)
+        elif name == "find_duplicates":
+            return await self._handle_find_duplicates(arguments)
+        elif name == "list_collections":
+            return await self._handle_list_collections(arguments)
+        elif name == "collection_info":
+            return await self._handle_collection_info(arguments)
+        elif name == "set_storage_profile":
+            return await self._handle_set_storage_profile(arguments)
+        elif name == "index_export":
+            return await self._handle_index_export(arguments)
+        elif name == "index_import":
+            return await self._handle_index_import(arguments)
+        elif name == "search_stats":
+            return await self._handle_search_stats(arguments)
+        else:
+            raise ValueError(f"Unknown tool: {name}")
+    
     async def _handle_code_index(self, arguments: Dict[str, Any]) -> CallToolResult:
         """Handle code indexing requests"""
         path = arguments["path"]
         collection_name = arguments.get("collection_name")
         file_patterns = arguments.get("file_patterns", ["*"])
         exclude_patterns = arguments.get("exclude_patterns", [])
+        storage_profile = arguments.get("storage_profile")
+        incremental = arguments.get("incremental", False)
         
-        logger.info(f"Starting indexing of {path}")
+        logger.info(f"Starting {'incremental ' if incremental else ''}indexing of {path}")
         
         try:
-            result = await self.code_indexer.index_codebase(
-                path=path,
-                collection_name=collection_name,
-                file_patterns=file_patterns,
-                exclude_patterns=exclude_patterns
-            )
+            if incremental:
+                result = await self.code_indexer.update_index(
+                    path=path,
+                    collection_name=collection_name,
+                    file_patterns=arguments.get("file_patterns"),
+                    exclude_patterns=arguments.get("exclude_patterns")
+                )
+            else:
+                result = await self.code_indexer.index_codebase(
+                    path=path,
+                    collection_name=collection_name,
+                    file_patterns=file_patterns,
+                    exclude_patterns=exclude_patterns,
+                    storage_profile=storage_profile
+                )
             
+            failed = ""
+            if result.get('files_failed'):
+                failed = f"Files failed (retried on the next update): {result['files_failed']}\n"
             return CallToolResult(
                 content=[TextContent(
                     type="text",
                     text=f"Successfully indexed codebase!\n\n"
                          f"Collection: {result['collection_name']}\n"
                          f"Files processed: {result['files_processed']}\n"
+                         f"{failed}"
                          f"Chunks created: {result['chunks_created']}\n"
                          f"Time taken: {result['time_taken']:.2f}s"
                 )]
@@ -177,13 +639,44 @@ class CodeSearchMCPServer:
                 content=[TextContent(type="text", text=f"Indexing failed: {str(e)}")]
             )
     
-    async def _handle_code_search(self, arguments: Dict[str, Any]) -> CallToolResult:
+    async def _handle_code_search(
+        self,
+        arguments: Dict[str, Any],
+        deadline: Optional[Deadline] = None
+    ) -> CallToolResult:
         """Handle code search requests"""
+        max_tokens = self._response_budget(arguments)
+        cursor = arguments.get("cursor")
+        if cursor:
+            try:
+                results = await self.code_searcher.search_page(
+                    cursor, deadline=deadline, with_code=max_tokens is None
+                )
+                return CallToolResult(content=[TextContent(
+                    type="text", text=await self._format_search_response(results, max_tokens)
+                )])
+            except Exception as e:
+                logger.error(f"Search failed: {str(e)}")
+                return CallToolResult(
+                    content=[TextContent(type="text", text=f"Search failed: {str(e)}")]
+                )
+        if not arguments.get("query"):
+            return CallToolResult(
+                content=[TextContent(type="text", text="Search failed: either query or cursor is required")]
+            )
+        
         query = arguments["query"]
         collection_name = arguments.get("collection_name")
         file_pattern = arguments.get("file_pattern")
         limit = arguments.get("limit", self.config.search_limit)
         similarity_threshold = arguments.get("similarity_threshold", self.config.similarity_threshold)
+        hnsw_ef = arguments.get("hnsw_ef")
+        exact = arguments.get("exact", False)
+        search_mode = arguments.get("search_mode")
+        rerank = arguments.get("rerank")
+        diversity = arguments.get("diversity")
+        route = arguments.get("route")
+        deadline_ms = arguments.get("deadline_ms")
         
         logger.info(f"Searching for: {query}")
         
@@ -193,31 +686,528 @@ class CodeSearchMCPServer:
                 collection_name=collection_name,
                 file_pattern=file_pattern,
                 limit=limit,
-                similarity_threshold=similarity_threshold
+                similarity_threshold=similarity_threshold,
+                hnsw_ef=hnsw_ef,
+                exact=exact,
+                search_mode=search_mode,
+                rerank=rerank,
+                diversity=diversity,
+                route=route,
+                deadline_ms=deadline_ms,
+                deadline=deadline,
+                with_code=max_tokens is None
+            )
+            
+            return CallToolResult(content=[TextContent(
+                type="text", text=await self._format_search_response(results, max_tokens)
+            )])
+        except Exception as e:
+            logger.error(f"Search failed: {str(e)}")
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"Search failed: {str(e)}")]
+            )
+    
+    def _response_budget(self, arguments: Dict[str, Any]) -> Optional[int]:
+        """Get the token budget of a compact response, or None for a full one"""
+        response_mode = arguments.get("response_mode", self.config.response_mode)
+        if response_mode != "compact" and "max_tokens" not in arguments:
+            return None
+        return arguments.get("max_tokens", self.config.response_token_budget)
+    
+    async def _format_search_response(
+        self,
+        results: List[Dict[str, Any]],
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """Format search results, first loading the code bodies a compact response has room for
+        
+        Compact searches read results without their bodies. Results from
+        indexes without a stored ``codeLength`` are loaded up front, since
+        they cannot be sized otherwise.
+        """
+        if max_tokens is not None and results:
+            unsized = [
+                result for result in results
+                if result.get('code_chunk') is None and result.get('code_length') is None
+            ]
+            if unsized:
+                await self.code_searcher.load_code_chunks(unsized)
+            layout = self._compact_layout(results, max_tokens, self._response_note(results))
+            await self.code_searcher.load_code_chunks(
+                [result for result, with_body in zip(results, layout) if with_body]
+            )
+        return self._format_search_results(results, max_tokens)
+    
+    def _response_note(self, results: List[Dict[str, Any]]) -> Optional[str]:
+        """Notes on partial results, the query plan and the rerank stage"""
+        notes = [
+            getattr(results, 'note', None),
+            self._format_plan(results),
+            self._format_rerank_report(getattr(results, 'rerank', None)),
+        ]
+        return "; ".join(part for part in notes if part) or None
+    
+    def _format_search_results(self, results: List[Dict[str, Any]], max_tokens: Optional[int] = None) -> str:
+        """Format search results as markdown, compactly if a token budget is given"""
+        note = self._response_note(results)
+        
+        if not results:
+            text = "No matching code found."
+            if note:
+                text += f"\n\n_{note}_"
+            return text
+        
+        if max_tokens is not None:
+            return self._format_compact_results(results, max_tokens, note)
+        
+        response_parts = [f"Found {len(results)} relevant code snippets:\n"]
+        if note:
+            response_parts.append(f"_{note}_\n")
+        
+        for i, result in enumerate(results, 1):
+            scores = ""
+            if result.get('score') is not None:
+                scores = f" [score: {result['score']:.3f}]"
+            if 'rerank_score' in result:
+                scores += f" [rerank: {result['rerank_score']:.3f}]"
+            response_parts.append(
+                f"**{i}. {result['file_path']}** (lines {result['start_line']}-{result['end_line']})"
+                f"{scores}{self._format_other_spans(result)}\n"
+                f"```{result.get('language', '')}\n{result['code_chunk']}\n```\n"
+            )
+        
+        next_cursor = getattr(results, 'next_cursor', None)
+        if next_cursor:
+            response_parts.append(f"_More results: pass cursor=\"{next_cursor}\"_")
+        
+        return "\n".join(response_parts)
+    
+    @staticmethod
+    def _compact_footer(results: List[Dict[str, Any]], note: Optional[str]) -> List[str]:
+        """Closing lines of a compact response: the note and the next cursor"""
+        next_cursor = getattr(results, 'next_cursor', None)
+        footer_parts = []
+        if note:
+            footer_parts.append(f"_{note}_")
+        if next_cursor:
+            footer_parts.append(f"_More results: pass cursor=\"{next_cursor}\"_")
+        return footer_parts
+    
+    @staticmethod
+    def _compact_preview(result: Dict[str, Any]) -> str:
+        """One-line preview of a result, stored or taken from its code"""
+        code = result.get('code_chunk')
+        return preview_line(code) if code is not None else result.get('preview') or ""
+    
+    def _compact_layout(self, results: List[Dict[str, Any]], max_tokens: int, note: Optional[str]) -> List[bool]:
+        """Decide which results of a compact response get their code body
+        
+        Returns one flag per listed result: True for a full body, False for a
+        one-line preview; results past the end of the list do not fit. Bodies
+        not loaded yet are sized from their ``code_length``.
+        """
+        remaining = max_tokens * self.CHARS_PER_TOKEN
+        remaining -= sum(len(part) + 1 for part in self._compact_footer(results, note))
+        layout = []
+        filling_bodies = True
+        for result in results:
+            header = self._format_compact_header(len(layout) + 1, result)
+            code = result.get('code_chunk')
+            code_length = len(code) if code is not None else result.get('code_length') or 0
+            # Fenced body: ```<language>\n<code>\n```
+            entry_length = len(header) + 1 + len(result.get('language') or '') + code_length + 8
+            with_body = filling_bodies and entry_length + 1 <= remaining
+            if not with_body:
+                filling_bodies = False
+                preview = self._compact_preview(result)
+                entry_length = len(header) + (len(preview) + 6 if preview else 0)
+                if entry_length + 1 > remaining:
+                    break
+            layout.append(with_body)
+            remaining -= entry_length + 1
+        return layout
+    
+    def _format_compact_results(
+        self,
+        results: List[Dict[str, Any]],
+        max_tokens: int,
+        note: Optional[str] = None
+    ) -> str:
+        """Format results within a token budget
+        
+        Every result gets a one-line header with its span and symbol. Full code
+        bodies are filled in rank order until the next one no longer fits;
+        later results get a one-line preview, and results beyond the budget
+        are only counted (see ``_compact_layout``).
+        """
+        budget_chars = max_tokens * self.CHARS_PER_TOKEN
+        footer_parts = self._compact_footer(results, note)
+        remaining = budget_chars - sum(len(part) + 1 for part in footer_parts)
+        
+        entries = []
+        layout = self._compact_layout(results, max_tokens, note)
+        for result, with_body in zip(results, layout):
+            header = self._format_compact_header(len(entries) + 1, result)
+            if with_body:
+                entry = f"{header}\n```{result.get('language') or ''}\n{result.get('code_chunk') or ''}\n```"
+            else:
+                preview = self._compact_preview(result)
+                entry = f"{header}\n   > {preview}" if preview else header
+            entries.append(entry)
+            remaining -= len(entry) + 1
+        bodies = sum(layout)
+        
+        used_tokens = (budget_chars - remaining) // self.CHARS_PER_TOKEN
+        response_parts = [
+            f"Found {len(results)} results ({bodies} with full code, ~{used_tokens}/{max_tokens} tokens):\n"
+        ]
+        response_parts.extend(entries)
+        if len(entries) < len(results):
+            response_parts.append(
+                f"_{len(results) - len(entries)} more results omitted to stay within the token budget_"
+            )
+        response_parts.extend(footer_parts)
+        return "\n".join(response_parts)
+    
+    @staticmethod
+    def _format_compact_header(rank: int, result: Dict[str, Any]) -> str:
+        """One-line summary of a result: rank, span, symbol and scores"""
+        header = f"{rank}. {result['file_path']}:{result['start_line']}-{result['end_line']}"
+        symbol = ".".join(name for name in (result.get('class_name'), result.get('function_name')) if name)
+        if symbol:
+            header += f" {symbol}"
+        if result.get('chunk_type'):
+            header += f" ({result['chunk_type']})"
+        if result.get('score') is not None:
+            header += f" [score: {result['score']:.3f}]"
+        if 'rerank_score' in result:
+            header += f" [rerank: {result['rerank_score']:.3f}]"
+        return header + CodeSearchMCPServer._format_other_spans(result)
+    
+    @staticmethod
+    def _format_other_spans(result: Dict[str, Any]) -> str:
+        """Mention the other matching spans of a file-grouped result"""
+        if not result.get('other_spans'):
+            return ""
+        spans = ", ".join(f"{span['start_line']}-{span['end_line']}" for span in result['other_spans'])
+        return f" (also lines {spans})"
+    
+    def _format_plan(self, results: List[Dict[str, Any]]) -> Optional[str]:
+        """Describe the query plan that produced the results and its time"""
+        plan = getattr(results, 'plan', None)
+        if not plan:
+            return None
+        elapsed = sum(getattr(results, 'timings', {}).values())
+        text = f"Plan: {plan['kind']} query → {self.ROUTE_LABELS.get(plan['route'], plan['route'])} ({elapsed:.1f} ms)"
+        if plan.get('fallback'):
+            text += f" after {plan['fallback']}"
+        return text
+    
+    def _format_rerank_report(self, report: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Describe how the rerank stage went"""
+        if not report:
+            return None
+        if report["applied"]:
+            return f"Reranked {report['candidates']} candidates in {report['elapsed_ms']} ms"
+        if report["scored"] < report["candidates"]:
+            return (
+                f"Rerank over the {report['budget_ms']:g} ms budget "
+                f"({report['scored']}/{report['candidates']} scored in {report['elapsed_ms']} ms); vector order kept"
+            )
+        return None
+    
+    async def _handle_code_scroll(
+        self,
+        arguments: Dict[str, Any],
+        deadline: Optional[Deadline] = None
+    ) -> CallToolResult:
+        """Handle chunk browsing requests"""
+        if not arguments.get("collection_name") and not arguments.get("cursor"):
+            return CallToolResult(
+                content=[TextContent(type="text", text="Scroll failed: either collection_name or cursor is required")]
+            )
+        
+        max_tokens = self._response_budget(arguments)
+        try:
+            results = await self.code_searcher.scroll(
+                collection_name=arguments.get("collection_name"),
+                file_pattern=arguments.get("file_pattern"),
+                language=arguments.get("language"),
+                chunk_type=arguments.get("chunk_type"),
+                function_name=arguments.get("function_name"),
+                class_name=arguments.get("class_name"),
+                limit=arguments.get("limit", 20),
+                cursor=arguments.get("cursor"),
+                deadline=deadline,
+                with_code=max_tokens is None
+            )
+            return CallToolResult(content=[TextContent(
+                type="text", text=await self._format_search_response(results, max_tokens)
+            )])
+        except Exception as e:
+            logger.error(f"Scroll failed: {str(e)}")
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"Scroll failed: {str(e)}")]
+            )
+    
+    async def _handle_find_symbol(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle symbol lookup requests"""
+        name = arguments["name"]
+        
+        try:
+            symbols = self.code_searcher.find_symbol(
+                name=name,
+                collection_name=arguments.get("collection_name"),
+                match=arguments.get("match", "auto"),
+                kind=arguments.get("kind"),
+                limit=arguments.get("limit", 20)
             )
             
-            if not results:
+            if not symbols:
                 return CallToolResult(
-                    content=[TextContent(type="text", text="No matching code found.")]
+                    content=[TextContent(type="text", text=f"No symbols found matching '{name}'")]
                 )
             
-            # Format results
-            response_parts = [f"Found {len(results)} relevant code snippets:\n"]
+            response_parts = [f"Found {len(symbols)} symbol(s) matching '{name}' ({symbols[0]['match']} match):\n"]
+            for symbol in symbols:
+                qualified = f"{symbol['container']}.{symbol['name']}" if symbol.get('container') else symbol['name']
+                line = (
+                    f"- {qualified} ({symbol['kind']}) "
+                    f"{symbol['file_path']}:{symbol['start_line']}-{symbol['end_line']}"
+                )
+                if len({found['index_name'] for found in symbols}) > 1:
+                    line += f" [{symbol['index_name']}]"
+                if symbol['match'] == "fuzzy":
+                    line += f" (distance {symbol['distance']})"
+                response_parts.append(line)
             
-            for i, result in enumerate(results, 1):
-                response_parts.append(
-                    f"**{i}. {result['file_path']}** (lines {result['start_line']}-{result['end_line']}) "
-                    f"[similarity: {result['score']:.3f}]\n"
-                    f"```{result.get('language', '')}\n{result['code_chunk']}\n```\n"
+            return CallToolResult(
+                content=[TextContent(type="text", text="\n".join(response_parts))]
+            )
+        except Exception as e:
+            logger.error(f"Symbol lookup failed: {str(e)}")
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"Symbol lookup failed: {str(e)}")]
+            )
+    
+    async def _handle_callers_of(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle call site lookups"""
+        name = arguments["name"]
+        
+        try:
+            callers = self.code_searcher.callers_of(
+                name,
+                collection_name=arguments.get("collection_name"),
+                limit=arguments.get("limit", 50)
+            )
+            if not callers:
+                return CallToolResult(
+                    content=[TextContent(type="text", text=f"No calls to '{name}' found")]
                 )
             
+            several_indexes = len({caller['index_name'] for caller in callers}) > 1
+            response_parts = [f"Found {len(callers)} call(s) to '{name}':\n"]
+            for caller in callers:
+                line = f"- {caller['file_path']}:{caller['line']} in {caller['caller']}"
+                if several_indexes:
+                    line += f" [{caller['index_name']}]"
+                response_parts.append(line)
+            
             return CallToolResult(
                 content=[TextContent(type="text", text="\n".join(response_parts))]
             )
         except Exception as e:
-            logger.error(f"Search failed: {str(e)}")
+            logger.error(f"Caller lookup failed: {str(e)}")
             return CallToolResult(
-                content=[TextContent(type="text", text=f"Search failed: {str(e)}")]
+                content=[TextContent(type="text", text=f"Caller lookup failed: {str(e)}")]
+            )
+    
+    async def _handle_callees_of(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle callee lookups"""
+        name = arguments["name"]
+        
+        try:
+            callees = self.code_searcher.callees_of(
+                name,
+                collection_name=arguments.get("collection_name"),
+                limit=arguments.get("limit", 50)
+            )
+            if not callees:
+                return CallToolResult(
+                    content=[TextContent(type="text", text=f"No calls from '{name}' found")]
+                )
+            
+            response_parts = [f"Found {len(callees)} function(s) called from '{name}':\n"]
+            for callee in callees:
+                line = f"- {callee['callee']} (called by {callee['caller']} at {callee['file_path']}:{callee['line']})"
+                definitions = callee['defined_in']
+                if definitions:
+                    line += " -> " + ", ".join(
+                        f"{definition['name']} {definition['file_path']}:{definition['start_line']}"
+                        for definition in definitions[:3]
+                    )
+                    if len(definitions) > 3:
+                        line += f" (+{len(definitions) - 3} more)"
+                else:
+                    line += " -> not defined in the index"
+                response_parts.append(line)
+            
+            return CallToolResult(
+                content=[TextContent(type="text", text="\n".join(response_parts))]
+            )
+        except Exception as e:
+            logger.error(f"Callee lookup failed: {str(e)}")
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"Callee lookup failed: {str(e)}")]
+            )
+    
+    async def _handle_dependents_of(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle reverse import lookups"""
+        target = arguments["target"]
+        
+        try:
+            dependents = self.code_searcher.dependents_of(
+                target,
+                collection_name=arguments.get("collection_name"),
+                depth=arguments.get("depth", 1),
+                limit=arguments.get("limit", 100)
+            )
+            if not dependents:
+                return CallToolResult(
+                    content=[TextContent(type="text", text=f"No files import '{target}'")]
+                )
+            
+            several_indexes = len({dependent['index_name'] for dependent in dependents}) > 1
+            response_parts = [f"Found {len(dependents)} file(s) depending on '{target}':\n"]
+            for dependent in dependents:
+                line = f"- {dependent['file_path']} (depth {dependent['depth']}, imports {dependent['via']})"
+                if several_indexes:
+                    line += f" [{dependent['index_name']}]"
+                response_parts.append(line)
+            
+            return CallToolResult(
+                content=[TextContent(type="text", text="\n".join(response_parts))]
+            )
+        except Exception as e:
+            logger.error(f"Dependent lookup failed: {str(e)}")
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"Dependent lookup failed: {str(e)}")]
+            )
+    
+    async def _handle_find_duplicates(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle near-duplicate scan requests"""
+        collection_name = arguments["collection_name"]
+        
+        try:
+            job = await self.code_searcher.find_duplicates(
+                collection_name,
+                similarity_threshold=arguments.get("similarity_threshold", 0.95),
+                restart=arguments.get("restart", False)
+            )
+            
+            if job.status == "failed":
+                text = f"Duplicate scan of '{collection_name}' failed: {job.error}"
+            elif job.status != "done":
+                progress = job.processed / job.total if job.total else 0.0
+                text = (
+                    f"Duplicate scan of '{collection_name}' running: "
+                    f"{job.processed}/{job.total} chunks ({progress:.0%}), "
+                    f"{len(job.pairs)} pair(s) so far. Call again for results."
+                )
+            else:
+                clusters = job.clusters(arguments.get("limit", 20))
+                if not clusters:
+                    text = (
+                        f"No near-duplicates above {job.similarity_threshold} "
+                        f"in '{collection_name}' ({job.processed} chunks scanned)"
+                    )
+                else:
+                    response_parts = [
+                        f"Found {len(job.pairs)} near-duplicate pair(s) in '{collection_name}' "
+                        f"({job.processed} chunks scanned); {len(clusters)} largest cluster(s):\n"
+                    ]
+                    for i, cluster in enumerate(clusters, 1):
+                        response_parts.append(
+                            f"**Cluster {i}**: {cluster['size']} chunks in {cluster['files']} file(s), "
+                            f"similarity up to {cluster['max_similarity']:.3f}"
+                        )
+                        for member in cluster['members']:
+                            name = f" {member['name']}" if member['name'] else ""
+                            response_parts.append(
+                                f"- {member['file_path']}:{member['start_line']}-{member['end_line']}{name}"
+                            )
+                        response_parts.append("")
+                    text = "\n".join(response_parts)
+            
+            return CallToolResult(content=[TextContent(type="text", text=text)])
+        except Exception as e:
+            logger.error(f"Duplicate scan failed: {str(e)}")
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"Duplicate scan failed: {str(e)}")]
+            )
+    
+    async def _handle_search_suggestions(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle query completion requests"""
+        partial_query = arguments["partial_query"]
+        
+        try:
+            suggestions = await self.code_searcher.get_search_suggestions(
+                partial_query,
+                limit=arguments.get("limit", 5),
+                collection_name=arguments.get("collection_name")
+            )
+            if not suggestions:
+                return CallToolResult(
+                    content=[TextContent(type="text", text=f"No suggestions for '{partial_query}'")]
+                )
+            return CallToolResult(
+                content=[TextContent(type="text", text="\n".join(suggestions))]
+            )
+        except Exception as e:
+            logger.error(f"Suggestions failed: {str(e)}")
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"Suggestions failed: {str(e)}")]
+            )
+    
+    async def _handle_code_search_batch(
+        self,
+        arguments: Dict[str, Any],
+        deadline: Optional[Deadline] = None
+    ) -> CallToolResult:
+        """Handle batched code search requests"""
+        queries = arguments["queries"]
+        
+        logger.info(f"Batch searching for {len(queries)} queries")
+        
+        max_tokens = self._response_budget(arguments)
+        if max_tokens is not None:
+            max_tokens //= max(1, len(queries))
+        
+        try:
+            batch_results = await self.code_searcher.search_many(
+                queries=queries,
+                collection_name=arguments.get("collection_name"),
+                file_pattern=arguments.get("file_pattern"),
+                limit=arguments.get("limit", self.config.search_limit),
+                similarity_threshold=arguments.get("similarity_threshold", self.config.similarity_threshold),
+                search_mode=arguments.get("search_mode"),
+                deadline_ms=arguments.get("deadline_ms"),
+                deadline=deadline,
+                with_code=max_tokens is None
+            )
+            
+            response_parts = []
+            for i, (query, results) in enumerate(zip(queries, batch_results), 1):
+                response_parts.append(f"## Query {i}: {query}\n")
+                response_parts.append(await self._format_search_response(results, max_tokens))
+            
+            return CallToolResult(
+                content=[TextContent(type="text", text="\n".join(response_parts))]
+            )
+        except Exception as e:
+            logger.error(f"Batch search failed: {str(e)}")
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"Batch search failed: {str(e)}")]
             )
     
     async def _handle_list_collections(self, arguments: Dict[str, Any]) -> CallToolResult:
@@ -234,6 +1224,14 @@ class CodeSearchMCPServer:
             for collection in collections:
                 response_parts.append(f"- {collection['name']} ({collection['vectors_count']} vectors)")
             
+            if self.qdrant_service.is_shared_layout and any(
+                c['name'] == self.qdrant_service.shared_collection_name for c in collections
+            ):
+                repos = await self.qdrant_service.list_repos()
+                response_parts.append(f"\nRepos in {self.qdrant_service.shared_collection_name}:\n")
+                for repo in repos:
+                    response_parts.append(f"- {repo['name']} ({repo['vectors_count']} chunks)")
+            
             return CallToolResult(
                 content=[TextContent(type="text", text="\n".join(response_parts))]
             )
@@ -267,6 +1265,103 @@ class CodeSearchMCPServer:
                 content=[TextContent(type="text", text=f"Failed to get collection info: {str(e)}")]
             )
     
+    async def _handle_set_storage_profile(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle storage profile changes"""
+        collection_name = arguments["collection_name"]
+        storage_profile = arguments["storage_profile"]
+        
+        try:
+            await self.qdrant_service.update_storage_profile(collection_name, storage_profile)
+            return CallToolResult(
+                content=[TextContent(
+                    type="text",
+                    text=f"Applied '{storage_profile}' storage profile to {collection_name}. "
+                         f"Index changes are applied by the optimizer in the background."
+                )]
+            )
+        except Exception as e:
+            logger.error(f"Failed to update storage profile: {str(e)}")
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"Failed to update storage profile: {str(e)}")]
+            )
+    
+    async def _handle_index_export(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle index export requests"""
+        try:
+            result = await self.code_indexer.export_index(
+                collection_name=arguments["collection_name"],
+                output_path=arguments["output_path"]
+            )
+            return CallToolResult(
+                content=[TextContent(
+                    type="text",
+                    text=f"Exported index!\n\n"
+                         f"Collection: {result['collection_name']}\n"
+                         f"Snapshot: {result['output_path']} ({result['size_bytes'] / 1024:.1f} KB)\n"
+                         f"Points exported: {result['points_exported']}\n"
+                         f"Time taken: {result['time_taken']:.2f}s"
+                )]
+            )
+        except Exception as e:
+            logger.error(f"Export failed: {str(e)}")
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"Export failed: {str(e)}")]
+            )
+    
+    async def _handle_index_import(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle index import requests"""
+        try:
+            result = await self.code_indexer.import_index(
+                input_path=arguments["input_path"],
+                path=arguments.get("path"),
+                collection_name=arguments.get("collection_name")
+            )
+            text = (
+                f"Imported index!\n\n"
+                f"Collection: {result['collection_name']}\n"
+                f"Points imported: {result['points_imported']}\n"
+            )
+            if "files_processed" in result:
+                text += (
+                    f"Files re-embedded since export: {result['files_processed']}\n"
+                    f"Files removed since export: {result['files_removed']}\n"
+                )
+            text += f"Time taken: {result['time_taken']:.2f}s"
+            return CallToolResult(content=[TextContent(type="text", text=text)])
+        except Exception as e:
+            logger.error(f"Import failed: {str(e)}")
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"Import failed: {str(e)}")]
+            )
+    
+    async def _handle_search_stats(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle search statistics requests"""
+        stats = self.code_searcher.cache.stats()
+        text = (
+            f"Search cache:\n\n"
+            f"Entries: {stats['entries']}\n"
+            f"Memory: {stats['bytes'] / 1024 / 1024:.1f} / {stats['max_bytes'] / 1024 / 1024:.1f} MB\n"
+            f"Hits: {stats['hits']}\n"
+            f"Misses: {stats['misses']}\n"
+            f"Hit rate: {stats['hit_rate']:.1%}\n"
+            f"Evictions: {stats['evictions']}"
+        )
+        
+        scheduler = self.scheduler.stats()
+        parts = [text, "\nScheduler:\n"]
+        for pool, pool_stats in scheduler["pools"].items():
+            parts.append(
+                f"{pool.capitalize()}: {pool_stats['running']}/{pool_stats['limit']} running, "
+                f"{pool_stats['queued']} queued (peak {pool_stats['peak_queued']}), "
+                f"{pool_stats['admitted']} admitted, wait mean {pool_stats['mean_wait_ms']:.1f} ms, "
+                f"p95 {pool_stats['p95_wait_ms']:.1f} ms, max {pool_stats['max_wait_ms']:.1f} ms"
+            )
+        parts.append(f"Coalesced calls: {scheduler['coalesced']} ({scheduler['in_flight']} in flight)")
+        parts.append(
+            f"Background yields to searches: {scheduler['yields']} ({scheduler['yield_seconds']:.1f} s)"
+        )
+        return CallToolResult(content=[TextContent(type="text", text="\n".join(parts))])
+    
     async def run(self):
         """Run the MCP server"""
         async with stdio_server() as (read_stream, write_stream):
@@ -0,0 +1,74 @@
+"""Local sparse lexical vectors for hybrid dense + sparse retrieval"""
+import re
+import zlib
+from collections import Counter
+from typing import List
+
+from qdrant_client.models import SparseVector
+
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+CAMEL_CASE_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize_code(text: str) -> List[str]:
+    """Split code or a query into lowercase lexical tokens
+    
+    Every identifier is kept whole (``parse_config``, ``userservice``) and is
+    also split on snake_case and camelCase boundaries (``parse``, ``config``,
+    ``user``, ``service``), so exact identifiers and their parts both match.
+    """
+    tokens = []
+    for identifier in IDENTIFIER_PATTERN.findall(text):
+        whole = identifier.lower()
+        if len(whole) > 1:
+            tokens.append(whole)
+        parts = []
+        for piece in identifier.split('_'):
+            parts.extend(CAMEL_CASE_PATTERN.findall(piece))
+        if len(parts) > 1:
+            tokens.extend(part.lower() for part in parts if len(part) > 1)
+    return tokens
+
+
+class SparseEncoder:
+    """Encodes text into hashed BM25-style term-frequency sparse vectors
+    
+    Documents get saturated term frequencies; inverse document frequency is
+    applied by Qdrant (the sparse vector is created with the IDF modifier), so
+    no corpus statistics have to be kept locally.
+    """
+    
+    VECTOR_NAME = "lexical"
+    
+    # BM25 parameters; the average length is a typical chunk size in tokens
+    K1 = 1.2
+    B = 0.75
+    AVERAGE_DOCUMENT_LENGTH = 256
+    
+    @staticmethod
+    def _token_index(token: str) -> int:
+        """Map a token to a stable 32-bit sparse dimension"""
+        return zlib.crc32(token.encode('utf-8'))
+    
+    def _to_sparse_vector(self, weights: Counter) -> SparseVector:
+        """Fold token weights into a sparse vector, summing hash collisions"""
+        folded = {}
+        for token, weight in weights.items():
+            index = self._token_index(token)
+            folded[index] = folded.get(index, 0.0) + weight
+        indices = sorted(folded)
+        return SparseVector(indices=indices, values=[folded[i] for i in indices])
+    
+    def encode_document(self, text: str) -> SparseVector:
+        """Encode an indexed chunk with BM25 term-frequency saturation"""
+        term_counts = Counter(tokenize_code(text))
+        length_norm = 1 - self.B + self.B * sum(term_counts.values()) / self.AVERAGE_DOCUMENT_LENGTH
+        weights = Counter({
+            token: count * (self.K1 + 1) / (count + self.K1 * length_norm)
+            for token, count in term_counts.items()
+        })
+        return self._to_sparse_vector(weights)
+    
+    def encode_query(self, text: str) -> SparseVector:
+        """Encode a query; each distinct token counts once"""
+        return self._to_sparse_vector(Counter(set(tokenize_code(text))))
@@ -0,0 +1,151 @@
+"""Prefix index of identifiers and file paths for search-as-you-type suggestions"""
+import bisect
+import heapq
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+SUGGESTION_IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+
+# Language keywords and builtins that would otherwise top every prefix
+COMMON_KEYWORDS = frozenset({
+    "and", "any", "args", "as", "assert", "async", "await", "bool", "break", "case", "catch",
+    "char", "class", "const", "continue", "def", "default", "del", "elif", "else", "enum",
+    "except", "export", "extends", "false", "final", "finally", "float", "for", "from", "func",
+    "function", "get", "if", "impl", "import", "in", "int", "interface", "is", "kwargs", "len",
+    "let", "list", "long", "mut", "new", "nil", "none", "not", "null", "or", "package", "pass",
+    "print", "private", "protected", "pub", "public", "raise", "return", "self", "set", "static",
+    "str", "string", "struct", "super", "switch", "this", "throw", "throws", "true", "try",
+    "type", "undefined", "use", "var", "void", "while", "with", "yield",
+})
+
+
+def extract_identifiers(text: str) -> Counter:
+    """Count the identifiers of a chunk that are worth suggesting"""
+    return Counter(
+        identifier for identifier in SUGGESTION_IDENTIFIER_PATTERN.findall(text)
+        if identifier.lower() not in COMMON_KEYWORDS
+    )
+
+
+class SuggestionIndex:
+    """Frequency-ranked prefix index over identifiers and file paths
+    
+    Terms are kept in a list sorted by lowercased key, so a prefix is a
+    binary-searched slice. An identifier's weight is the number of files it
+    appears in; a file path is indexed under both its full path and its base
+    name. Files are added and removed one at a time, so incremental index
+    updates only touch the terms of changed files.
+    """
+    
+    # Identifiers kept per file, by in-file frequency
+    MAX_TERMS_PER_FILE = 200
+    
+    # Remembered completions; repeated keystroke prefixes are dictionary hits
+    MEMO_SIZE = 4096
+    
+    def __init__(self):
+        self.files: Dict[str, List[str]] = {}
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._keys: List[Tuple[str, str]] = []
+        self._memo: Dict[Tuple[str, int], List[Tuple[str, int]]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    @staticmethod
+    def _file_terms(file_path: str, identifiers: Iterable[str]) -> List[Tuple[str, str]]:
+        """(key, term) pairs contributed by one file"""
+        terms = [(identifier.lower(), identifier) for identifier in identifiers]
+        terms.append((file_path.lower(), file_path))
+        base_name = os.path.basename(file_path)
+        if base_name != file_path:
+            terms.append((base_name.lower(), file_path))
+        return terms
+    
+    def _add_term(self, key: Tuple[str, str]) -> None:
+        """Count one more file for a term"""
+        count = self._counts.get(key, 0)
+        if count == 0:
+            bisect.insort(self._keys, key)
+        self._counts[key] = count + 1
+    
+    def _remove_term(self, key: Tuple[str, str]) -> None:
+        """Count one file less for a term"""
+        count = self._counts.get(key, 0) - 1
+        if count > 0:
+            self._counts[key] = count
+            return
+        self._counts.pop(key, None)
+        position = bisect.bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+    
+    @classmethod
+    def top_terms(cls, identifiers: Counter) -> List[str]:
+        """The identifiers of a file that are kept as suggestion terms"""
+        return [identifier for identifier, _ in identifiers.most_common(cls.MAX_TERMS_PER_FILE)]
+    
+    def add_file(self, file_path: str, identifiers: Counter) -> None:
+        """Index the identifiers of a file, replacing any earlier version of it"""
+        self.remove_file(file_path)
+        kept = self.top_terms(identifiers)
+        self.files[file_path] = kept
+        for key in self._file_terms(file_path, kept):
+            self._add_term(key)
+        self._memo.clear()
+    
+    def remove_file(self, file_path: str) -> None:
+        """Drop the terms a file contributed"""
+        identifiers = self.files.pop(file_path, None)
+        if identifiers is None:
+            return
+        for key in self._file_terms(file_path, identifiers):
+            self._remove_term(key)
+        self._memo.clear()
+    
+    def load_files(self, files: Dict[str, List[str]]) -> None:
+        """Bulk-load saved per-file terms, sorting once"""
+        self.files = dict(files)
+        counts: Counter = Counter()
+        for file_path, identifiers in self.files.items():
+            counts.update(self._file_terms(file_path, identifiers))
+        self._counts = dict(counts)
+        self._keys = sorted(self._counts)
+        self._memo.clear()
+    
+    def complete(self, prefix: str, limit: int = 5) -> List[Tuple[str, int]]:
+        """Most frequent terms starting with a prefix, as (term, file count) pairs"""
+        memo_key = (prefix.lower(), limit)
+        cached = self._memo.get(memo_key)
+        if cached is not None:
+            return cached
+        
+        lo = bisect.bisect_left(self._keys, (memo_key[0],))
+        hi = bisect.bisect_left(self._keys, (memo_key[0] + "\uffff",))
+        totals: Dict[str, int] = {}
+        for key in self._keys[lo:hi]:
+            term = key[1]
+            totals[term] = max(totals.get(term, 0), self._counts[key])
+        completions = heapq.nsmallest(
+            limit, totals.items(), key=lambda item: (-item[1], len(item[0]), item[0])
+        )
+        if len(self._memo) >= self.MEMO_SIZE:
+            self._memo.clear()
+        self._memo[memo_key] = completions
+        return completions
+
+
+def merge_completions(
+    indexes: Iterable[SuggestionIndex],
+    prefix: str,
+    limit: int = 5
+) -> List[str]:
+    """Combine the completions of several indexes, summing file counts"""
+    totals: Counter = Counter()
+    for index in indexes:
+        for term, count in index.complete(prefix, limit):
+            totals[term] += count
+    ranked = sorted(totals.items(), key=lambda item: (-item[1], len(item[0]), item[0]))
+    return [term for term, _ in ranked[:limit]]
@@ -0,0 +1,358 @@
+"""Local symbol table for exact, prefix and fuzzy symbol lookup without embeddings"""
+import bisect
+import json
+import logging
+import os
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from suggestions import SuggestionIndex, extract_identifiers
+
+logger = logging.getLogger(__name__)
+
+# Entry fields, stored as lists to keep the file compact
+FIELDS = ("name", "kind", "container", "file_path", "start_line", "end_line", "language")
+
+MATCH_MODES = ("auto", "exact", "prefix", "fuzzy")
+
+SYMBOL_KINDS = ("function", "method", "class")
+
+
+def symbol_kind(chunk_type: Optional[str]) -> Optional[str]:
+    """Symbol kind of a chunk type; pieces of a split definition count as the definition"""
+    kind = (chunk_type or "").replace("_partial", "")
+    return kind if kind in SYMBOL_KINDS else None
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Levenshtein distance, or ``max_distance + 1`` once it is exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class SymbolIndex:
+    """Sorted on-disk table of the functions, methods and classes of an index
+    
+    Entries are kept sorted by lowercased name, so exact and prefix lookups
+    are two binary searches. Fuzzy lookup scans the distinct names whose
+    length is within the allowed edit distance. The table is rebuilt with the
+    index and patched per file by incremental updates.
+    
+    The file also holds each file's most frequent identifiers, which feed
+    the ``suggestions`` prefix index.
+    """
+    
+    # Version 3 records split definitions (``*_partial`` chunks) as their base kind
+    VERSION = 3
+    
+    # Above this many changed files the suggestion index is rebuilt in one sort
+    BULK_SUGGESTION_FILES = 100
+    
+    # Point payload fields needed to rebuild a table from an index
+    PAYLOAD_FIELDS = (
+        "functionName", "className", "chunkType", "filePath", "startLine", "endLine", "language", "codeChunk"
+    )
+    
+    # Loaded tables, keyed by file path and invalidated by modification time
+    _loaded: Dict[str, Tuple[float, "SymbolIndex"]] = {}
+    
+    def __init__(self, index_name: str, entries: Optional[Iterable[Dict[str, Any]]] = None):
+        self.index_name = index_name
+        self._entries: List[Dict[str, Any]] = []
+        self._keys: List[str] = []
+        self._sorted = True
+        self._suggestions = SuggestionIndex()
+        self._file_identifiers: Dict[str, Counter] = {}
+        self._pending_files: Set[str] = set()
+        for entry in entries or []:
+            self.add_symbol(**entry)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    @staticmethod
+    def path_for(state_dir: str, index_name: str) -> str:
+        """Get the symbol table file path for an index"""
+        return os.path.join(os.path.expanduser(state_dir), f"{index_name}.symbols.json")
+    
+    def add_symbol(
+        self,
+        name: Optional[str],
+        kind: str,
+        file_path: str,
+        start_line: int,
+        end_line: int,
+        container: Optional[str] = None,
+        language: Optional[str] = None
+    ) -> None:
+        """Add one symbol; chunks split from one large definition are merged"""
+        if not name:
+            return
+        self._entries.append({
+            "name": name,
+            "kind": kind,
+            "container": container,
+            "file_path": file_path,
+            "start_line": start_line,
+            "end_line": end_line,
+            "language": language,
+        })
+        self._sorted = False
+    
+    def _add_identifiers(self, file_path: str, text: str) -> None:
+        """Count the identifiers of one chunk towards its file's suggestions"""
+        identifiers = self._file_identifiers.setdefault(file_path, Counter())
+        identifiers.update(extract_identifiers(text))
+    
+    @property
+    def suggestions(self) -> SuggestionIndex:
+        """Prefix index of the identifiers and file paths of the index"""
+        if self._pending_files:
+            if len(self._pending_files) > self.BULK_SUGGESTION_FILES:
+                files = dict(self._suggestions.files)
+                files.update(
+                    (file_path, self._suggestions.top_terms(self._file_identifiers[file_path]))
+                    for file_path in self._pending_files
+                )
+                self._suggestions.load_files(files)
+            else:
+                for file_path in self._pending_files:
+                    self._suggestions.add_file(file_path, self._file_identifiers[file_path])
+            self._pending_files = set()
+        return self._suggestions
+    
+    def add_chunks(self, chunks: Iterable[Any]) -> None:
+        """Add the named definitions and identifiers of indexed code chunks"""
+        file_paths = []
+        for chunk in chunks:
+            self._add_identifiers(chunk.file_path, chunk.content)
+            file_paths.append(chunk.file_path)
+            kind = symbol_kind(chunk.chunk_type)
+            if kind:
+                self.add_symbol(
+                    name=chunk.function_name,
+                    kind=kind,
+                    file_path=chunk.file_path,
+                    start_line=chunk.start_line,
+                    end_line=chunk.end_line,
+                    container=chunk.class_name,
+                    language=chunk.language
+                )
+        self._pending_files.update(file_paths)
+    
+    def add_payloads(self, payloads: Iterable[Dict[str, Any]]) -> None:
+        """Add the named definitions and identifiers of stored point payloads"""
+        file_paths = []
+        for payload in payloads:
+            file_path = payload.get("filePath", "")
+            self._add_identifiers(file_path, payload.get("codeChunk", ""))
+            file_paths.append(file_path)
+            kind = symbol_kind(payload.get("chunkType"))
+            if kind:
+                self.add_symbol(
+                    name=payload.get("functionName"),
+                    kind=kind,
+                    file_path=payload.get("filePath", ""),
+                    start_line=payload.get("startLine", 0),
+                    end_line=payload.get("endLine", 0),
+                    container=payload.get("className"),
+                    language=payload.get("language")
+                )
+        self._pending_files.update(file_paths)
+    
+    def remove_files(self, file_paths: Iterable[str]) -> None:
+        """Drop every symbol defined in the given files"""
+        removed = set(file_paths)
+        for file_path in removed:
+            self._file_identifiers.pop(file_path, None)
+            self._pending_files.discard(file_path)
+            self._suggestions.remove_file(file_path)
+        if removed:
+            self._entries = [entry for entry in self._entries if entry["file_path"] not in removed]
+            self._sorted = False
+    
+    def _ensure_sorted(self) -> None:
+        """Sort entries by name and merge duplicates from split chunks"""
+        if self._sorted:
+            return
+        merged: Dict[Tuple, Dict[str, Any]] = {}
+        for entry in self._entries:
+            key = (entry["name"], entry["kind"], entry["container"], entry["file_path"])
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = dict(entry)
+            elif entry["start_line"] <= existing["end_line"] + 1 and entry["end_line"] >= existing["start_line"] - 1:
+                existing["start_line"] = min(existing["start_line"], entry["start_line"])
+                existing["end_line"] = max(existing["end_line"], entry["end_line"])
+            else:
+                merged[key + (entry["start_line"],)] = dict(entry)
+        self._entries = sorted(
+            merged.values(),
+            key=lambda entry: (entry["name"].lower(), entry["name"], entry["file_path"], entry["start_line"])
+        )
+        self._keys = [entry["name"].lower() for entry in self._entries]
+        self._sorted = True
+    
+    def lookup(
+        self,
+        name: str,
+        match: str = "auto",
+        kind: Optional[str] = None,
+        limit: int = 20,
+        max_distance: int = 2
+    ) -> List[Dict[str, Any]]:
+        """Find symbols by name; see ``lookup_symbols``"""
+        return lookup_symbols([self], name, match, kind, limit, max_distance)
+    
+    def lookup_mode(
+        self,
+        name: str,
+        match: str,
+        container: Optional[str],
+        kind: Optional[str],
+        limit: int,
+        max_distance: int
+    ) -> List[Dict[str, Any]]:
+        """Run one kind of lookup; results carry ``match`` and ``distance``"""
+        self._ensure_sorted()
+        key = name.lower()
+        if match == "exact":
+            lo = bisect.bisect_left(self._keys, key)
+            hi = bisect.bisect_right(self._keys, key)
+            candidates = [(0 if entry["name"] == name else 1, entry) for entry in self._entries[lo:hi]]
+        elif match == "prefix":
+            lo = bisect.bisect_left(self._keys, key)
+            hi = bisect.bisect_left(self._keys, key + "\uffff")
+            candidates = [(len(entry["name"]) - len(name), entry) for entry in self._entries[lo:hi]]
+        elif match == "fuzzy":
+            distances: Dict[str, int] = {}
+            for candidate_key in dict.fromkeys(self._keys):
+                distance = edit_distance(key, candidate_key, max_distance)
+                if distance <= max_distance:
+                    distances[candidate_key] = distance
+            candidates = [
+                (distances[entry_key], entry)
+                for entry_key, entry in zip(self._keys, self._entries)
+                if entry_key in distances
+            ]
+        else:
+            raise ValueError(f"Unknown match mode '{match}'. Available: {', '.join(MATCH_MODES)}")
+        
+        results = []
+        for distance, entry in sorted(candidates, key=lambda item: item[0]):
+            if kind and entry["kind"] != kind:
+                continue
+            if container and (entry["container"] or "").lower() != container.lower():
+                continue
+            results.append(dict(entry, index_name=self.index_name, match=match, distance=distance))
+            if len(results) >= limit:
+                break
+        return results
+    
+    def save(self, state_dir: str) -> str:
+        """Atomically write the sorted table to the state directory"""
+        self._ensure_sorted()
+        path = self.path_for(state_dir, self.index_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": self.VERSION,
+                "index_name": self.index_name,
+                "fields": FIELDS,
+                "symbols": [[entry[field] for field in FIELDS] for entry in self._entries],
+                "terms": self.suggestions.files,
+            }, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        self._loaded[path] = (os.path.getmtime(path), self)
+        return path
+    
+    @classmethod
+    def load(cls, state_dir: str, index_name: str) -> Optional["SymbolIndex"]:
+        """Load the symbol table of an index, reusing the in-memory copy if unchanged"""
+        path = cls.path_for(state_dir, index_name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        cached = cls._loaded.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable symbol table {path}: {str(e)}")
+            return None
+        if data.get("version") != cls.VERSION:
+            logger.info(f"Ignoring symbol table {path} from an older version")
+            return None
+        
+        index = cls(index_name)
+        index._entries = [dict(zip(data["fields"], row)) for row in data["symbols"]]
+        index._keys = [entry["name"].lower() for entry in index._entries]
+        index._suggestions.load_files(data["terms"])
+        cls._loaded[path] = (mtime, index)
+        return index
+    
+    @classmethod
+    def list_indexes(cls, state_dir: str) -> List[str]:
+        """Names of all indexes with a symbol table"""
+        state_dir = os.path.expanduser(state_dir)
+        if not os.path.isdir(state_dir):
+            return []
+        suffix = ".symbols.json"
+        return sorted(name[:-len(suffix)] for name in os.listdir(state_dir) if name.endswith(suffix))
+    
+    @classmethod
+    def delete(cls, state_dir: str, index_name: str) -> None:
+        """Remove the symbol table of an index"""
+        path = cls.path_for(state_dir, index_name)
+        cls._loaded.pop(path, None)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def lookup_symbols(
+    tables: List[SymbolIndex],
+    name: str,
+    match: str = "auto",
+    kind: Optional[str] = None,
+    limit: int = 20,
+    max_distance: int = 2
+) -> List[Dict[str, Any]]:
+    """Find symbols by name in one or more symbol tables
+    
+    ``match`` is ``exact`` (case-insensitive, exact case first), ``prefix``,
+    ``fuzzy`` (edit distance up to ``max_distance``) or ``auto``, which
+    tries them in that order until something matches. ``Class.method``
+    restricts the match to methods of that class.
+    """
+    if match not in MATCH_MODES:
+        raise ValueError(f"Unknown match mode '{match}'. Available: {', '.join(MATCH_MODES)}")
+    container = None
+    if "." in name:
+        container, name = name.rsplit(".", 1)
+    
+    modes = ("exact", "prefix", "fuzzy") if match == "auto" else (match,)
+    for mode in modes:
+        results = []
+        for table in tables:
+            results.extend(table.lookup_mode(name, mode, container, kind, limit, max_distance))
+        if results:
+            results.sort(key=lambda result: result["distance"])
+            return results[:limit]
+    return []
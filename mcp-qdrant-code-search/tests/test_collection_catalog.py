@@ -0,0 +1,100 @@
+"""Tests for the cached collection catalog"""
+import asyncio
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import CreateAlias, CreateAliasOperation, Distance, VectorParams
+
+from config import Config
+from qdrant_service import CollectionCatalog, QdrantService
+
+
+class CountingClient:
+    """Qdrant client wrapper counting ``get_collections`` calls"""
+    
+    def __init__(self):
+        self.client = QdrantClient(":memory:")
+        self.refreshes = 0
+    
+    def get_collections(self):
+        self.refreshes += 1
+        return self.client.get_collections()
+    
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def create(client: CountingClient, name: str) -> None:
+    client.client.create_collection(name, vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+
+
+def test_lookups_within_the_ttl_are_served_from_the_cache():
+    async def run():
+        client = CountingClient()
+        create(client, "a")
+        catalog = CollectionCatalog(client, ttl=60)
+        assert await catalog.get_names() == ["a"]
+        create(client, "b")
+        assert await catalog.get_names() == ["a"]
+        assert client.refreshes == 1
+        
+        # Once the TTL has passed the next lookup refreshes
+        catalog._refreshed_at -= 60
+        assert sorted(await catalog.get_names()) == ["a", "b"]
+        assert client.refreshes == 2
+    
+    asyncio.run(run())
+
+
+def test_invalidate_and_force_refresh_reload_the_catalog():
+    async def run():
+        client = CountingClient()
+        catalog = CollectionCatalog(client, ttl=60)
+        assert await catalog.get_names() == []
+        create(client, "a")
+        catalog.invalidate()
+        assert await catalog.get_names() == ["a"]
+        create(client, "b")
+        assert sorted(await catalog.get_names(force_refresh=True)) == ["a", "b"]
+        assert client.refreshes == 3
+    
+    asyncio.run(run())
+
+
+def test_concurrent_lookups_share_one_refresh():
+    async def run():
+        client = CountingClient()
+        create(client, "a")
+        catalog = CollectionCatalog(client, ttl=60)
+        results = await asyncio.gather(*(catalog.get_names() for _ in range(5)))
+        assert results == [["a"]] * 5
+        assert client.refreshes == 1
+    
+    asyncio.run(run())
+
+
+def test_index_names_hide_generations_and_file_summaries():
+    async def run():
+        client = CountingClient()
+        for name in ("plain", "idx--gen-1", "idx--files"):
+            create(client, name)
+        client.client.update_collection_aliases(change_aliases_operations=[
+            CreateAliasOperation(create_alias=CreateAlias(collection_name="idx--gen-1", alias_name="idx"))
+        ])
+        catalog = CollectionCatalog(client, ttl=60)
+        assert sorted(await catalog.get_index_names()) == ["idx", "plain"]
+        assert await catalog.get_aliases() == {"idx": "idx--gen-1"}
+    
+    asyncio.run(run())
+
+
+def test_service_writes_invalidate_the_catalog(tmp_path):
+    async def run():
+        service = QdrantService(Config(
+            qdrant_mode="memory", vector_size=4, signature_vector_size=0,
+            index_state_dir=str(tmp_path), collection_cache_ttl=60,
+        ))
+        assert await service.catalog.get_names() == []
+        await service.create_collection_if_not_exists("idx")
+        assert await service.catalog.get_names() == ["idx"]
+    
+    asyncio.run(run())
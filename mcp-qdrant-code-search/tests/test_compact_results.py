@@ -0,0 +1,54 @@
+"""Tests for reading compact search results without their code bodies"""
+import asyncio
+
+from qdrant_client.models import PointStruct
+
+from code_chunker import PREVIEW_LENGTH, preview_line
+from config import Config
+from qdrant_service import QdrantService
+
+CODE = "\n\ndef load_user(user_id):\n    return users[user_id]\n"
+
+
+def make_service(tmp_path) -> QdrantService:
+    return QdrantService(Config(
+        qdrant_mode="memory",
+        vector_size=4,
+        signature_vector_size=0,
+        index_state_dir=str(tmp_path),
+    ))
+
+
+def test_preview_line_skips_blank_lines_and_shortens():
+    assert preview_line(CODE) == "def load_user(user_id):"
+    assert preview_line("   \n") == ""
+    assert preview_line("x" * 500) == "x" * PREVIEW_LENGTH + "..."
+
+
+def test_compact_search_leaves_out_the_body_until_it_is_retrieved(tmp_path):
+    async def run():
+        service = make_service(tmp_path)
+        await service.create_collection_if_not_exists("idx")
+        await service.upsert_points("idx", [PointStruct(
+            id=1,
+            vector={"": [1.0, 0.0, 0.0, 0.0]},
+            payload={
+                "filePath": "users.py", "codeChunk": CODE, "startLine": 3, "endLine": 4,
+                "language": "python", "codeLength": len(CODE), "preview": preview_line(CODE),
+            },
+        )])
+        results = await service.search_similar(
+            "idx", [1.0, 0.0, 0.0, 0.0], with_payload=QdrantService.COMPACT_PAYLOAD_FIELDS
+        )
+        assert results[0]["code_chunk"] is None
+        assert results[0]["code_length"] == len(CODE)
+        assert results[0]["preview"] == "def load_user(user_id):"
+        
+        payloads = await service.retrieve_payloads("idx", [1], with_payload=["codeChunk"])
+        assert payloads == {1: {"codeChunk": CODE}}
+        
+        full = await service.search_similar("idx", [1.0, 0.0, 0.0, 0.0])
+        assert full[0]["code_chunk"] == CODE
+        assert "code_length" not in full[0]
+    
+    asyncio.run(run())
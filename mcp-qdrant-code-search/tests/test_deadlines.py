@@ -0,0 +1,61 @@
+"""Tests for request deadlines"""
+import asyncio
+
+import pytest
+
+from deadlines import Deadline, DeadlineExceeded
+
+
+def test_zero_budget_never_expires():
+    deadline = Deadline(0)
+    assert not deadline.enabled
+    assert deadline.remaining() is None
+    assert deadline.cap(5.0) == 5.0
+    assert deadline.report() is None
+    assert asyncio.run(deadline.run(asyncio.sleep(0, result="done"), "search")) == "done"
+
+
+def test_reserve_is_held_back_until_released():
+    deadline = Deadline(1000, reserve_ms=400)
+    assert 0.5 < deadline.remaining() <= 0.6
+    deadline.release_reserve()
+    assert 0.9 < deadline.remaining() <= 1.0
+
+
+def test_cap_takes_the_smaller_of_the_timeout_and_the_time_left():
+    deadline = Deadline(1000)
+    assert deadline.cap(0.25) == 0.25
+    assert 0.9 < deadline.cap(5.0) <= 1.0
+
+
+def test_stage_running_out_of_time_is_reported_once():
+    deadline = Deadline(20)
+    
+    async def run():
+        for _ in range(2):
+            with pytest.raises(DeadlineExceeded) as raised:
+                await deadline.run(asyncio.sleep(1), "embedding")
+            assert raised.value.stage == "embedding"
+    
+    asyncio.run(run())
+    report = deadline.report()
+    assert report["budget_ms"] == 20
+    assert report["exceeded"] == ["embedding"]
+    assert report["elapsed_ms"] >= 20
+
+
+def test_reserve_leaves_time_for_a_fallback():
+    deadline = Deadline(200, reserve_ms=150)
+    
+    async def run():
+        with pytest.raises(DeadlineExceeded):
+            await deadline.run(asyncio.sleep(1), "embedding")
+        deadline.release_reserve()
+        return await deadline.run(asyncio.sleep(0, result="lexical"), "lexical")
+    
+    assert asyncio.run(run()) == "lexical"
+    assert deadline.exceeded == ["embedding"]
+
+
+def test_deadline_exceeded_is_a_timeout():
+    assert issubclass(DeadlineExceeded, asyncio.TimeoutError)
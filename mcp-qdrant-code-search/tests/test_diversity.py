@@ -0,0 +1,62 @@
+"""Tests for merging overlapping chunks and maximal marginal relevance"""
+from diversity import merge_overlapping_spans, mmr_select
+
+
+def chunk(start, end, score, file_path="a.py", **fields):
+    code = "\n".join(f"line {line}" for line in range(start, end + 1))
+    return {
+        "file_path": file_path, "start_line": start, "end_line": end,
+        "code_chunk": code, "score": score, **fields,
+    }
+
+
+def test_overlapping_spans_are_stitched_into_the_better_result():
+    merged = merge_overlapping_spans([chunk(10, 14, 0.9), chunk(12, 18, 0.8), chunk(30, 31, 0.7)])
+    assert [(r["start_line"], r["end_line"], r["score"]) for r in merged] == [(10, 18, 0.9), (30, 31, 0.7)]
+    assert merged[0]["code_chunk"].split("\n") == [f"line {line}" for line in range(10, 19)]
+    assert merged[0]["merged_count"] == 2
+    assert "merged_count" not in merged[1]
+
+
+def test_adjacent_spans_merge_but_other_files_do_not():
+    merged = merge_overlapping_spans([chunk(1, 4, 0.9), chunk(5, 8, 0.8), chunk(1, 4, 0.7, file_path="b.py")])
+    assert [(r["file_path"], r["start_line"], r["end_line"]) for r in merged] == [
+        ("a.py", 1, 8), ("b.py", 1, 4)
+    ]
+
+
+def test_an_enclosing_chunk_lends_its_symbol():
+    method = chunk(5, 7, 0.9, chunk_type="method", function_name="save", class_name="User")
+    cls = chunk(1, 20, 0.6, chunk_type="class", function_name="", class_name="User")
+    [merged] = merge_overlapping_spans([method, cls])
+    assert (merged["start_line"], merged["end_line"], merged["chunk_type"]) == (1, 20, "class")
+    assert merged["score"] == 0.9
+    assert merged["code_chunk"] == cls["code_chunk"]
+
+
+def test_a_grown_span_absorbs_results_kept_earlier():
+    merged = merge_overlapping_spans([chunk(1, 3, 0.9), chunk(10, 12, 0.8), chunk(3, 10, 0.7)])
+    assert [(r["start_line"], r["end_line"], r["merged_count"]) for r in merged] == [(1, 12, 3)]
+
+
+def test_inputs_are_not_modified():
+    first = chunk(1, 3, 0.9)
+    merge_overlapping_spans([first, chunk(2, 5, 0.8)])
+    assert (first["end_line"], "merged_count" in first) == (3, False)
+
+
+def test_mmr_skips_near_duplicates_of_picked_results():
+    results = [
+        {"id": "a", "score": 0.9, "vector": [1.0, 0.0]},
+        {"id": "a-copy", "score": 0.89, "vector": [1.0, 0.01]},
+        {"id": "b", "score": 0.7, "vector": [0.0, 1.0]},
+    ]
+    assert [r["id"] for r in mmr_select(results, 2, 0.5)] == ["a", "b"]
+    # Pure relevance keeps the score order
+    assert [r["id"] for r in mmr_select(results, 2, 1.0)] == ["a", "a-copy"]
+
+
+def test_mmr_treats_results_without_vectors_as_dissimilar():
+    results = [{"id": "a", "score": 0.9}, {"id": "b", "score": 0.5}, {"id": "c", "score": 0.1}]
+    assert [r["id"] for r in mmr_select(results, 3, 0.5)] == ["a", "b", "c"]
+    assert mmr_select(results, 0, 0.5) == []
@@ -0,0 +1,109 @@
+"""Tests for grouping duplicate pairs and checkpointing duplicate scans"""
+import json
+import os
+
+from duplicates import DuplicateJob, UnionFind
+
+
+def test_new_items_are_their_own_representative():
+    sets = UnionFind()
+    assert sets.find("a") == "a"
+    assert sets.groups() == []
+
+
+def test_union_is_transitive():
+    sets = UnionFind()
+    sets.union(1, 2)
+    sets.union(3, 4)
+    sets.union(2, 3)
+    assert sets.find(1) == sets.find(4)
+    assert sorted(map(sorted, sets.groups())) == [[1, 2, 3, 4]]
+
+
+def test_groups_skip_singletons_and_keep_sets_apart():
+    sets = UnionFind()
+    sets.union("a", "b")
+    sets.union("c", "d")
+    sets.find("e")
+    assert sorted(map(sorted, sets.groups())) == [["a", "b"], ["c", "d"]]
+
+
+def test_repeated_union_is_a_no_op():
+    sets = UnionFind()
+    sets.union("a", "b")
+    sets.union("b", "a")
+    assert sets.size[sets.find("a")] == 2
+
+
+def test_smaller_set_joins_the_larger_one():
+    sets = UnionFind()
+    for item in range(1, 5):
+        sets.union(0, item)
+    sets.union("x", "y")
+    sets.union("x", 0)
+    assert sets.find("x") == sets.find(0) == 0
+    assert sets.size[0] == 7
+
+
+def test_long_chains_are_flattened():
+    sets = UnionFind()
+    for item in range(1000):
+        sets.parent[item + 1] = item
+        sets.size[item + 1] = 1
+    sets.parent[0], sets.size[0] = 0, 1001
+    assert sets.find(1000) == 0
+    assert sets.parent[1000] != 999
+
+
+def test_checkpoints_append_only_new_pairs(tmp_path):
+    state_dir = str(tmp_path)
+    job = DuplicateJob("repo", "repo", 0.9)
+    job.save(state_dir)
+    job.add_pair("1|2", 0.95, {"1": ["a.py", 1, 5, "f"], "2": ["b.py", 1, 5, "g"]})
+    job.offset, job.processed = 10, 10
+    job.checkpoint(state_dir)
+    job.add_pair("1|2", 0.97, {})
+    job.add_pair("3|4", 0.92, {"3": ["c.py", 1, 5, "h"], "4": ["d.py", 1, 5, "i"]})
+    job.offset, job.processed = 20, 20
+    job.checkpoint(state_dir)
+    
+    with open(DuplicateJob.log_path_for(state_dir, "repo"), encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    assert [sorted(entry["pairs"]) for entry in entries] == [["1|2"], ["1|2", "3|4"]]
+    
+    loaded = DuplicateJob.load(state_dir, "repo")
+    assert (loaded.offset, loaded.processed) == (20, 20)
+    assert loaded.pairs == {"1|2": 0.97, "3|4": 0.92}
+    assert set(loaded.members) == {"1", "2", "3", "4"}
+
+
+def test_torn_log_line_is_ignored(tmp_path):
+    state_dir = str(tmp_path)
+    job = DuplicateJob("repo", "repo", 0.9)
+    job.save(state_dir)
+    job.add_pair("1|2", 0.95, {"1": ["a.py", 1, 5, ""], "2": ["b.py", 1, 5, ""]})
+    job.offset = 10
+    job.checkpoint(state_dir)
+    with open(DuplicateJob.log_path_for(state_dir, "repo"), "a", encoding="utf-8") as f:
+        f.write('{"offset":20,"pairs":{"3|4"')
+    
+    loaded = DuplicateJob.load(state_dir, "repo")
+    assert loaded.offset == 10
+    assert list(loaded.pairs) == ["1|2"]
+
+
+def test_save_folds_the_log_into_the_job_file(tmp_path):
+    state_dir = str(tmp_path)
+    job = DuplicateJob("repo", "repo", 0.9)
+    job.save(state_dir)
+    job.add_pair("1|2", 0.95, {"1": ["a.py", 1, 5, ""], "2": ["b.py", 1, 5, ""]})
+    job.checkpoint(state_dir)
+    job.status = "done"
+    job.save(state_dir)
+    
+    assert not os.path.exists(DuplicateJob.log_path_for(state_dir, "repo"))
+    loaded = DuplicateJob.load(state_dir, "repo")
+    assert (loaded.status, loaded.pairs) == ("done", {"1|2": 0.95})
+    assert loaded.clusters()[0]["size"] == 2
+    DuplicateJob.delete(state_dir, "repo")
+    assert DuplicateJob.load(state_dir, "repo") is None
@@ -0,0 +1,99 @@
+"""Tests for merging searches fanned out across collections"""
+import asyncio
+
+from config import Config
+from deadlines import Deadline
+from qdrant_service import QdrantService
+
+
+def make_service(tmp_path, **overrides) -> QdrantService:
+    settings = dict(
+        qdrant_mode="memory",
+        vector_size=4,
+        signature_vector_size=0,
+        index_state_dir=str(tmp_path),
+    )
+    settings.update(overrides)
+    return QdrantService(Config(**settings))
+
+
+def hits(*scores):
+    return [{"id": f"{score}", "score": score} for score in scores]
+
+
+def test_merge_keeps_the_top_results_of_every_query(tmp_path):
+    service = make_service(tmp_path)
+    batches = {
+        "a": [hits(0.9, 0.5), hits(0.1)],
+        "b": [hits(0.8, 0.7, 0.2), hits(0.6, 0.3)],
+        "c": [hits(0.95), []],
+    }
+    
+    async def search(collection_name):
+        return batches[collection_name]
+    
+    merged = asyncio.run(service._fan_out_batch_search(list(batches), 3, 2, search))
+    assert [(r["collection"], r["score"]) for r in merged[0]] == [("c", 0.95), ("a", 0.9), ("b", 0.8)]
+    assert [(r["collection"], r["score"]) for r in merged[1]] == [("b", 0.6), ("b", 0.3), ("a", 0.1)]
+    assert not merged[0].partial
+
+
+def test_ties_keep_the_order_results_arrived_in(tmp_path):
+    service = make_service(tmp_path)
+    delays = {"a": 0.0, "b": 0.05, "c": 0.1}
+    
+    async def search(collection_name):
+        await asyncio.sleep(delays[collection_name])
+        return [[{"id": collection_name, "score": 0.5}]]
+    
+    [merged] = asyncio.run(service._fan_out_batch_search(["a", "b", "c"], 2, 1, search))
+    assert [r["id"] for r in merged] == ["a", "b"]
+
+
+def test_slow_and_failing_collections_are_reported_not_raised(tmp_path):
+    service = make_service(tmp_path, collection_search_timeout=0.05)
+    
+    async def search(collection_name):
+        if collection_name == "slow":
+            await asyncio.sleep(1)
+        if collection_name == "broken":
+            raise RuntimeError("boom")
+        return [hits(0.4)]
+    
+    [merged] = asyncio.run(service._fan_out_batch_search(["ok", "slow", "broken"], 5, 1, search))
+    assert [r["collection"] for r in merged] == ["ok"]
+    assert merged.failed_collections == {"slow": "timeout", "broken": "error"}
+    assert merged.partial
+
+
+def test_deadline_shortens_the_collection_timeout(tmp_path):
+    service = make_service(tmp_path, collection_search_timeout=5.0)
+    
+    async def search(collection_name):
+        await asyncio.sleep(1)
+        return [hits(0.4)]
+    
+    async def run():
+        return await service._fan_out_batch_search(["a"], 5, 1, search, Deadline(50))
+    
+    [merged] = asyncio.run(run())
+    assert merged == []
+    assert merged.failed_collections == {"a": "deadline"}
+
+
+def test_search_concurrency_bounds_collections_in_flight(tmp_path):
+    service = make_service(tmp_path, search_concurrency=2)
+    in_flight = 0
+    most_in_flight = 0
+    
+    async def search(collection_name):
+        nonlocal in_flight, most_in_flight
+        in_flight += 1
+        most_in_flight = max(most_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return [hits(0.5)]
+    
+    [merged] = asyncio.run(service._fan_out_batch_search([f"c{i}" for i in range(6)], 10, 1, search))
+    assert len(merged) == 6
+    assert most_in_flight == 2
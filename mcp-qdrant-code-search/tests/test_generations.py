@@ -0,0 +1,132 @@
+"""Tests for blue/green index generations in both collection layouts"""
+import asyncio
+import uuid
+
+from qdrant_client.models import PointStruct
+
+from config import Config
+from qdrant_service import QdrantService
+
+VECTOR_SIZE = 4
+
+
+def make_service(tmp_path, **overrides) -> QdrantService:
+    settings = dict(
+        qdrant_mode="memory",
+        vector_size=VECTOR_SIZE,
+        signature_vector_size=0,
+        index_state_dir=str(tmp_path),
+    )
+    settings.update(overrides)
+    return QdrantService(Config(**settings))
+
+
+def make_points(repo, count, generation=None):
+    return [
+        PointStruct(
+            id=str(uuid.uuid4()),
+            vector={"": [1.0, 0.0, 0.0, float(i)]},
+            payload={"repo": repo, "filePath": f"f{i}.py", "codeChunk": "x", "indexGeneration": generation},
+        )
+        for i in range(count)
+    ]
+
+
+def test_switch_alias_moves_reads_to_the_new_generation(tmp_path):
+    async def run():
+        service = make_service(tmp_path)
+        first = await service.create_generation("idx")
+        await service.upsert_points(first, make_points("idx", 2))
+        await service.switch_alias("idx", first)
+        second = await service.create_generation("idx")
+        await service.upsert_points(second, make_points("idx", 5))
+        assert await service.count_points("idx") == 2
+        await service.switch_alias("idx", second)
+        assert await service.resolve_alias("idx") == second
+        assert await service.count_points("idx") == 5
+    
+    asyncio.run(run())
+
+
+def test_delete_old_generations_keeps_the_live_one_and_the_rollbacks(tmp_path):
+    async def run():
+        service = make_service(tmp_path)
+        for _ in range(4):
+            collection_name = await service.create_generation("idx")
+            await service.switch_alias("idx", collection_name)
+        deleted = await service.delete_old_generations("idx", keep=1)
+        assert sorted(deleted) == ["idx--gen-1", "idx--gen-2"]
+        assert sorted((await service.list_generations("idx", force_refresh=True)).values()) == [
+            "idx--gen-3", "idx--gen-4"
+        ]
+        assert await service.resolve_alias("idx") == "idx--gen-4"
+    
+    asyncio.run(run())
+
+
+def test_shared_layout_hides_a_generation_until_it_is_live(tmp_path):
+    async def run():
+        service = make_service(tmp_path, collection_layout="shared")
+        shared = service.shared_collection_name
+        await service.create_collection_if_not_exists(shared)
+        old = service.begin_generation("repo")
+        await service.upsert_points(shared, make_points("repo", 3, old))
+        service.finish_generation("repo", old)
+        
+        new = service.begin_generation("repo")
+        await service.upsert_points(shared, make_points("repo", 4, new))
+        collection_name, scope = service.resolve_scope("repo")
+        assert await service.count_points(collection_name, scope) == 3
+        
+        service.finish_generation("repo", new)
+        assert await service.count_points(collection_name, scope) == 4
+        await service.delete_repo_points("repo", keep_generation=new)
+        assert await service.count_points(collection_name, scope) == 4
+    
+    asyncio.run(run())
+
+
+def test_shared_layout_discards_a_failed_generation(tmp_path):
+    async def run():
+        service = make_service(tmp_path, collection_layout="shared")
+        shared = service.shared_collection_name
+        await service.create_collection_if_not_exists(shared)
+        await service.upsert_points(shared, make_points("legacy", 2))
+        generation = service.begin_generation("legacy")
+        await service.upsert_points(shared, make_points("legacy", 6, generation))
+        assert await service.count_points(shared) == 2
+        
+        await service.delete_repo_points("legacy", generation=generation)
+        service.finish_generation("legacy", generation, live=False)
+        assert service.live_generation("legacy") is None
+        assert await service.count_points(shared) == 2
+    
+    asyncio.run(run())
+
+
+def test_shared_layout_searches_see_only_live_generations(tmp_path):
+    async def run():
+        service = make_service(tmp_path, collection_layout="shared")
+        shared = service.shared_collection_name
+        await service.create_collection_if_not_exists(shared)
+        for repo in ("a", "b"):
+            generation = service.begin_generation(repo)
+            await service.upsert_points(shared, make_points(repo, 2, generation))
+            service.finish_generation(repo, generation)
+        rebuilding = service.begin_generation("a")
+        await service.upsert_points(shared, make_points("a", 2, rebuilding))
+        
+        results = await service.search_similar(shared, [1.0, 0.0, 0.0, 0.0], limit=10)
+        assert len(results) == 4
+        repos = await service.list_repos()
+        assert {repo["name"]: repo["vectors_count"] for repo in repos} == {"a": 2, "b": 2}
+    
+    asyncio.run(run())
+
+
+def test_live_generations_survive_a_restart(tmp_path):
+    service = make_service(tmp_path, collection_layout="shared")
+    generation = service.begin_generation("repo")
+    service.finish_generation("repo", generation)
+    restarted = make_service(tmp_path, collection_layout="shared")
+    assert restarted.live_generation("repo") == generation
@@ -0,0 +1,29 @@
+"""Tests for opaque paging cursors"""
+import pytest
+
+from pagination import decode_cursor, encode_cursor
+
+
+def test_round_trip_keeps_state():
+    state = {"query": "load user", "offset": 20, "params": {"limit": 10, "exclude_ids": [3, "a-b"]}}
+    token = encode_cursor("search", state)
+    decoded = decode_cursor(token, "search")
+    assert decoded == {"v": 1, "kind": "search", **state}
+
+
+def test_tokens_are_url_safe_without_padding():
+    token = encode_cursor("scroll", {"offset": "ÿ" * 7})
+    assert "=" not in token
+    assert set(token) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+
+
+def test_cursor_of_another_kind_is_rejected():
+    token = encode_cursor("scroll", {"offset": 5})
+    with pytest.raises(ValueError):
+        decode_cursor(token, "search")
+
+
+@pytest.mark.parametrize("token", ["", "not a cursor", "e30", encode_cursor("search", {})[:-3]])
+def test_garbage_is_rejected(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token, "search")
@@ -0,0 +1,71 @@
+"""Tests for compiling file patterns into payload conditions and matchers"""
+import pytest
+
+from path_filters import compile_path_pattern
+
+
+def condition_keys(path_pattern):
+    return [condition.key for condition in path_pattern.conditions]
+
+
+@pytest.mark.parametrize("pattern", [None, "", "  ", "*", "**", "./**/*"])
+def test_patterns_that_filter_nothing_compile_to_none(pattern):
+    assert compile_path_pattern(pattern) is None
+
+
+@pytest.mark.parametrize("pattern, matching, other", [
+    ("*.py", ["a.py", "src/deep/b.py"], ["a.pyc", "a.js"]),
+    ("test_*.py", ["test_a.py", "src/test_b.py"], ["a_test.py", "test_a.js"]),
+    ("src/*.py", ["src/a.py"], ["src/sub/a.py", "lib/src/a.py"]),
+    ("src/**/*.ts", ["src/a.ts", "src/x/y/a.ts"], ["a.ts", "lib/src/a.ts"]),
+    ("lib/", ["lib/a.py", "lib/x/b.go"], ["src/lib.py", "mylib/a.py"]),
+    ("src/?.[ch]", ["src/a.c", "src/b.h"], ["src/ab.c", "src/a.o"]),
+    ("./src/main.py", ["src/main.py"], ["main.py", "src/main.pyc"]),
+])
+def test_matches_follow_gitignore_conventions(pattern, matching, other):
+    path_pattern = compile_path_pattern(pattern)
+    assert all(path_pattern.matches(path) for path in matching)
+    assert not any(path_pattern.matches(path) for path in other)
+
+
+def test_windows_separators_are_normalised():
+    assert compile_path_pattern("src/*.py").matches("src\\a.py")
+
+
+def test_literal_path_is_an_exact_condition():
+    path_pattern = compile_path_pattern("src/main.py")
+    assert condition_keys(path_pattern) == ["filePath"]
+    assert not path_pattern.needs_post_filter
+
+
+def test_prefix_and_extension_are_answered_by_conditions():
+    path_pattern = compile_path_pattern("src/api/**/*.py")
+    assert condition_keys(path_pattern) == ["pathSegments.0", "pathSegments.1", "fileExtension"]
+    assert path_pattern.conditions[-1].match.value == "py"
+    assert not path_pattern.needs_post_filter
+
+
+def test_partial_globs_need_a_post_filter():
+    path_pattern = compile_path_pattern("src/*/handlers/test_*.py")
+    assert condition_keys(path_pattern) == ["pathSegments.0", "filePath", "fileExtension"]
+    assert path_pattern.needs_post_filter
+
+
+def test_extensions_match_case_insensitively():
+    path_pattern = compile_path_pattern("src/*.PY")
+    assert path_pattern.conditions[-1].match.value == "py"
+    assert path_pattern.matches("src/a.py")
+    assert path_pattern.matches("src/a.Py")
+    assert not path_pattern.matches("SRC/a.py")
+
+
+def test_without_extension_field_the_extension_is_post_filtered():
+    path_pattern = compile_path_pattern("src/**/*.py", extension_field=False)
+    assert condition_keys(path_pattern) == ["pathSegments.0"]
+    assert path_pattern.needs_post_filter
+    assert path_pattern.matches("src/a/b.py")
+    assert not path_pattern.matches("src/a/b.js")
+
+
+def test_compiled_patterns_are_cached():
+    assert compile_path_pattern("*.rs") is compile_path_pattern("*.rs")
@@ -0,0 +1,55 @@
+"""Tests for query classification and routing"""
+import pytest
+
+from query_planner import plan_query
+
+
+@pytest.mark.parametrize("query, term", [
+    ("UserService.authenticate", "UserService.authenticate"),
+    ("parse_config", "parse_config"),
+    ("getUserName", "getUserName"),
+    ("Foo::bar", "Foo.bar"),
+    ("Foo#bar", "Foo.bar"),
+    ("run()", "run"),
+])
+def test_identifiers_route_to_symbol_index(query, term):
+    plan = plan_query(query)
+    assert (plan.kind, plan.route, plan.term) == ("identifier", "symbol", term)
+
+
+@pytest.mark.parametrize("query", ["src/auth/", "src/**/*.ts", "server.py", "*.go"])
+def test_paths_and_globs_route_to_scroll(query):
+    plan = plan_query(query)
+    assert (plan.kind, plan.route, plan.term) == ("path", "path", query)
+
+
+def test_regex_routes_to_lexical_search_with_literals():
+    plan = plan_query(r"def\s+handle_\w+")
+    assert (plan.kind, plan.route) == ("regex", "regex")
+    assert plan.literals == ["def", "handle_"]
+
+
+def test_regex_without_literals_is_natural_language():
+    assert plan_query(r"\w+\s+\d+").route == "vector"
+
+
+@pytest.mark.parametrize("query", ["how are users authenticated", "login", "  retry logic  "])
+def test_natural_language_routes_to_vector_search(query):
+    plan = plan_query(query)
+    assert (plan.kind, plan.route, plan.term) == ("natural", "vector", query.strip())
+
+
+def test_requested_route_overrides_classification():
+    plan = plan_query("parse_config", route="vector")
+    assert (plan.kind, plan.route, plan.reason) == ("identifier", "vector", "requested route")
+
+
+def test_requested_regex_route_extracts_literals():
+    plan = plan_query("load_user", route="regex")
+    assert plan.route == "regex"
+    assert plan.literals == ["load_user"]
+
+
+def test_unknown_route_is_rejected():
+    with pytest.raises(ValueError):
+        plan_query("parse_config", route="graph")
@@ -0,0 +1,115 @@
+"""Tests for admission control, priorities and coalescing of tool calls"""
+import asyncio
+
+import pytest
+
+from scheduler import RequestScheduler
+
+INTERACTIVE = RequestScheduler.INTERACTIVE
+BACKGROUND = RequestScheduler.BACKGROUND
+
+
+def test_identical_calls_in_flight_share_one_execution():
+    scheduler = RequestScheduler(4, 1)
+    calls = 0
+    
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return calls
+    
+    async def run():
+        results = await asyncio.gather(*(scheduler.run(INTERACTIVE, call, key="same") for _ in range(3)))
+        # Once finished, the next identical call runs afresh
+        again = await scheduler.run(INTERACTIVE, call, key="same")
+        return results, again
+    
+    results, again = asyncio.run(run())
+    assert results == [1, 1, 1]
+    assert again == 2
+    assert scheduler.stats()["coalesced"] == 2
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_a_caller_giving_up_does_not_cancel_the_shared_call():
+    scheduler = RequestScheduler(4, 1)
+    
+    async def call():
+        await asyncio.sleep(0.05)
+        return "done"
+    
+    async def run():
+        first = asyncio.ensure_future(scheduler.run(INTERACTIVE, call, key="k"))
+        second = asyncio.ensure_future(scheduler.run(INTERACTIVE, call, key="k"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+    
+    assert asyncio.run(run()) == "done"
+
+
+def test_each_pool_runs_at_most_its_limit():
+    scheduler = RequestScheduler(2, 1)
+    running = {INTERACTIVE: 0, BACKGROUND: 0}
+    peak = {INTERACTIVE: 0, BACKGROUND: 0}
+    
+    def call(pool):
+        async def tracked():
+            running[pool] += 1
+            peak[pool] = max(peak[pool], running[pool])
+            await asyncio.sleep(0.01)
+            running[pool] -= 1
+        return tracked
+    
+    async def run():
+        await asyncio.gather(
+            *(scheduler.run(INTERACTIVE, call(INTERACTIVE)) for _ in range(6)),
+            *(scheduler.run(BACKGROUND, call(BACKGROUND)) for _ in range(3)),
+        )
+    
+    asyncio.run(run())
+    assert peak == {INTERACTIVE: 2, BACKGROUND: 1}
+    stats = scheduler.stats()["pools"]
+    assert stats[INTERACTIVE]["admitted"] == 6
+    assert stats[INTERACTIVE]["peak_queued"] >= 4
+    assert stats[BACKGROUND]["max_wait_ms"] > 0
+
+
+def test_unknown_pool_is_rejected():
+    async def run():
+        async with RequestScheduler(1, 1).admit("bulk"):
+            pass
+    
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+def test_background_yields_until_interactive_calls_finish():
+    scheduler = RequestScheduler(2, 1)
+    
+    async def run():
+        assert await scheduler.yield_to_interactive() == 0.0
+        search = asyncio.ensure_future(scheduler.run(INTERACTIVE, lambda: asyncio.sleep(0.05)))
+        await asyncio.sleep(0)
+        waited = await scheduler.yield_to_interactive()
+        assert search.done()
+        return waited
+    
+    assert asyncio.run(run()) >= 0.03
+    assert scheduler.stats()["yields"] == 1
+
+
+def test_background_yield_is_bounded():
+    scheduler = RequestScheduler(2, 1)
+    scheduler.BACKGROUND_MAX_YIELD = 0.05
+    
+    async def run():
+        search = asyncio.ensure_future(scheduler.run(INTERACTIVE, lambda: asyncio.sleep(1)))
+        await asyncio.sleep(0)
+        waited = await scheduler.yield_to_interactive()
+        assert not search.done()
+        search.cancel()
+        return waited
+    
+    assert 0.04 <= asyncio.run(run()) < 0.5
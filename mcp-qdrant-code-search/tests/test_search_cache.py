@@ -0,0 +1,80 @@
+"""Tests for the search result cache and the write versions in its keys"""
+import asyncio
+import uuid
+
+from qdrant_client.models import PointStruct
+
+from config import Config
+from qdrant_service import QdrantService
+from search_cache import SearchCache
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    size = SearchCache.estimate_size("value")
+    cache = SearchCache(max_bytes=size * 2, ttl=0)
+    cache.put("a", "value")
+    cache.put("b", "value")
+    assert cache.get("a") == "value"
+    cache.put("c", "value")
+    assert cache.get("b") is None
+    assert cache.get("a") == "value"
+    assert cache.get("c") == "value"
+    assert cache.stats()["evictions"] == 1
+    assert cache.current_bytes == size * 2
+
+
+def test_values_larger_than_the_cache_are_not_stored():
+    cache = SearchCache(max_bytes=10, ttl=0)
+    cache.put("big", "x" * 100)
+    assert cache.get("big") is None
+    assert cache.current_bytes == 0
+
+
+def test_disabled_cache_stores_nothing():
+    cache = SearchCache(max_bytes=0, ttl=0)
+    cache.put("a", "value")
+    assert cache.get("a") is None
+
+
+def test_expired_entries_are_misses():
+    cache = SearchCache(max_bytes=1000, ttl=60)
+    cache.put("a", "value")
+    value, size, stored_at = cache._entries["a"]
+    cache._entries["a"] = (value, size, stored_at - 61)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_hit_rate_counts_hits_and_misses():
+    cache = SearchCache(max_bytes=1000, ttl=0)
+    cache.put("a", "value")
+    cache.get("a")
+    cache.get("missing")
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_writes_change_the_write_version_of_an_index(tmp_path):
+    async def run():
+        service = QdrantService(Config(
+            qdrant_mode="memory", vector_size=4, signature_vector_size=0, index_state_dir=str(tmp_path)
+        ))
+        await service.create_collection_if_not_exists("idx")
+        await service.create_collection_if_not_exists("other")
+        before = await service.get_write_version("idx")
+        other_before = await service.get_write_version("other")
+        everything_before = await service.get_write_version()
+        
+        await service.upsert_points("idx", [PointStruct(
+            id=str(uuid.uuid4()), vector={"": [1.0, 0.0, 0.0, 0.0]}, payload={"filePath": "a.py"}
+        )])
+        assert await service.get_write_version("idx") != before
+        assert await service.get_write_version("other") == other_before
+        assert await service.get_write_version() != everything_before
+        
+        # A rebuild moves the alias to a new generation
+        rebuilt = await service.get_write_version("idx")
+        generation = await service.create_generation("idx")
+        await service.switch_alias("idx", generation)
+        assert await service.get_write_version("idx") != rebuilt
+    
+    asyncio.run(run())
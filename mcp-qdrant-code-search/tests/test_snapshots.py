@@ -0,0 +1,106 @@
+"""Tests for exporting and importing index snapshots"""
+import asyncio
+import uuid
+
+import pytest
+from qdrant_client.models import PointStruct
+
+pytest.importorskip("sentence_transformers")
+
+from code_indexer import CodeIndexer
+from config import Config
+from index_snapshot import SnapshotWriter, iter_snapshot_points, read_snapshot_header
+from qdrant_service import QdrantService
+
+VECTOR_SIZE = 4
+
+
+def make_indexer(tmp_path, **overrides) -> CodeIndexer:
+    settings = dict(
+        qdrant_mode="memory",
+        embedding_model="openai/text-embedding-3-small",
+        openai_api_key="unused",
+        vector_size=VECTOR_SIZE,
+        signature_vector_size=0,
+        index_state_dir=str(tmp_path / "state"),
+    )
+    settings.update(overrides)
+    config = Config(**settings)
+    return CodeIndexer(config, QdrantService(config))
+
+
+async def add_repo(indexer, repo, count):
+    """Write ``count`` chunks of a repo into the index as one live generation"""
+    qdrant = indexer.qdrant
+    if qdrant.is_shared_layout:
+        target = qdrant.shared_collection_name
+        await qdrant.create_collection_if_not_exists(target)
+        generation = qdrant.begin_generation(repo)
+    else:
+        target = await qdrant.create_generation(repo)
+        generation = None
+    points = [
+        PointStruct(
+            id=str(uuid.uuid4()),
+            vector={"": [1.0, float(i), 0.0, 0.5]},
+            payload={
+                "repo": repo, "filePath": f"src/f{i}.py", "codeChunk": f"def f{i}(): pass",
+                "startLine": 1, "endLine": 1, "language": "python", "chunkType": "function",
+                "functionName": f"f{i}", "indexGeneration": generation,
+            },
+        )
+        for i in range(count)
+    ]
+    await qdrant.upsert_points(target, points)
+    if qdrant.is_shared_layout:
+        qdrant.finish_generation(repo, generation)
+    else:
+        await qdrant.switch_alias(repo, target)
+
+
+async def count_repo(indexer, repo):
+    collection_name, scope = indexer.qdrant.resolve_scope(repo)
+    return await indexer.qdrant.count_points(collection_name, scope)
+
+
+def test_snapshot_round_trip_keeps_vectors_and_payloads(tmp_path):
+    points = [{"id": 1, "vector": [0.25, 0.5, 0.75, 1.0], "payload": {"filePath": "a.py"}}]
+    path = str(tmp_path / "index.snapshot.gz")
+    with SnapshotWriter(path, {"index_name": "idx"}) as writer:
+        writer.write_points(points)
+    assert read_snapshot_header(path)["index_name"] == "idx"
+    assert list(iter_snapshot_points(path)) == points
+
+
+def test_import_under_another_name_leaves_the_source_repo_alone(tmp_path):
+    async def run():
+        indexer = make_indexer(tmp_path, collection_layout="shared")
+        await add_repo(indexer, "fork-a", 5)
+        snapshot = str(tmp_path / "fork-a.snapshot.gz")
+        exported = await indexer.export_index("fork-a", snapshot)
+        assert exported["points_exported"] == 5
+        
+        imported = await indexer.import_index(snapshot, collection_name="fork-b")
+        assert imported["points_imported"] == 5
+        assert await count_repo(indexer, "fork-a") == 5
+        assert await count_repo(indexer, "fork-b") == 5
+        
+        # Re-importing under the same name replaces that repo's points
+        await indexer.import_index(snapshot, collection_name="fork-b")
+        assert await count_repo(indexer, "fork-a") == 5
+        assert await count_repo(indexer, "fork-b") == 5
+    
+    asyncio.run(run())
+
+
+def test_import_in_the_per_repo_layout_builds_a_new_generation(tmp_path):
+    async def run():
+        indexer = make_indexer(tmp_path)
+        await add_repo(indexer, "idx", 3)
+        snapshot = str(tmp_path / "idx.snapshot.gz")
+        await indexer.export_index("idx", snapshot)
+        await indexer.import_index(snapshot, collection_name="copy")
+        assert await count_repo(indexer, "idx") == 3
+        assert await count_repo(indexer, "copy") == 3
+    
+    asyncio.run(run())
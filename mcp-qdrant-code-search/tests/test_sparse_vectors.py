@@ -0,0 +1,43 @@
+"""Tests for lexical tokens and sparse vectors"""
+from sparse_vectors import SparseEncoder, tokenize_code
+
+
+def test_identifiers_are_kept_whole_and_split_into_parts():
+    assert tokenize_code("parse_config(userService)") == [
+        "parse_config", "parse", "config", "userservice", "user", "service"
+    ]
+
+
+def test_acronyms_and_digits_split_at_word_boundaries():
+    assert tokenize_code("HTTPServer v2") == ["httpserver", "http", "server", "v2"]
+
+
+def test_single_characters_are_dropped():
+    assert tokenize_code("x = a_b + 42") == ["a_b", "42"]
+
+
+def test_query_tokens_count_once():
+    vector = SparseEncoder().encode_query("user user service")
+    assert vector.indices == sorted(vector.indices)
+    assert vector.values == [1.0, 1.0]
+
+
+def test_document_weights_saturate_with_repetition():
+    encoder = SparseEncoder()
+    index = SparseEncoder._token_index("token")
+    
+    def weight(text):
+        vector = encoder.encode_document(text)
+        return vector.values[vector.indices.index(index)]
+    
+    once, twice, many = weight("token"), weight("token token"), weight(" ".join(["token"] * 50))
+    assert once < twice < many < SparseEncoder.K1 + 1
+    # The same count weighs less in a longer chunk
+    assert weight("token " + " ".join(f"word{i}" for i in range(500))) < once
+
+
+def test_token_dimensions_are_stable():
+    assert SparseEncoder._token_index("config") == SparseEncoder._token_index("config")
+    first = SparseEncoder().encode_document("load the config")
+    second = SparseEncoder().encode_document("load the config")
+    assert first == second
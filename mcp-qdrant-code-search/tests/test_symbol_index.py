@@ -0,0 +1,131 @@
+"""Tests for the local symbol table"""
+from types import SimpleNamespace
+
+import pytest
+
+from symbol_index import SymbolIndex, edit_distance, lookup_symbols, symbol_kind
+
+
+def payload(name, chunk_type="function", file_path="src/app.py", start=1, end=10, container=None):
+    return {
+        "functionName": name,
+        "className": container,
+        "chunkType": chunk_type,
+        "filePath": file_path,
+        "startLine": start,
+        "endLine": end,
+        "language": "python",
+        "codeChunk": f"def {name}(): pass",
+    }
+
+
+@pytest.fixture
+def table():
+    table = SymbolIndex("repo")
+    table.add_payloads([
+        payload("load_user"),
+        payload("LoadUser", file_path="src/Load.java"),
+        payload("load_users", start=20, end=30),
+        payload("authenticate", "method", container="UserService", start=40, end=60),
+        payload("UserService", "class", start=35, end=90),
+        payload("helper", "block"),
+    ])
+    return table
+
+
+@pytest.mark.parametrize("chunk_type, kind", [
+    ("function", "function"),
+    ("method_partial", "method"),
+    ("class_partial", "class"),
+    ("block", None),
+    (None, None),
+])
+def test_symbol_kind(chunk_type, kind):
+    assert symbol_kind(chunk_type) == kind
+
+
+def test_only_definitions_are_recorded(table):
+    assert len(table) == 5
+    assert table.lookup("helper") == []
+
+
+def test_exact_lookup_is_case_insensitive_with_exact_case_first(table):
+    table.add_payloads([payload("loaduser", file_path="src/a.py")])
+    results = table.lookup("LoadUser", match="exact")
+    assert [(result["name"], result["distance"]) for result in results] == [("LoadUser", 0), ("loaduser", 1)]
+
+
+def test_auto_falls_back_to_prefix_then_fuzzy(table):
+    assert {result["name"] for result in table.lookup("load_u")} == {"load_user", "load_users"}
+    assert all(result["match"] == "prefix" for result in table.lookup("load_u"))
+    fuzzy = table.lookup("authenticat3")
+    assert [(result["name"], result["match"]) for result in fuzzy] == [("authenticate", "fuzzy")]
+
+
+def test_container_and_kind_restrict_matches(table):
+    assert [result["kind"] for result in table.lookup("UserService.authenticate")] == ["method"]
+    assert table.lookup("OtherService.authenticate") == []
+    assert table.lookup("UserService", kind="function") == []
+
+
+def test_split_definitions_merge_into_one_symbol():
+    table = SymbolIndex("repo")
+    table.add_payloads([
+        payload("big", "function_partial", start=1, end=40),
+        payload("big", "function_partial", start=41, end=80),
+    ])
+    [result] = table.lookup("big")
+    assert (result["kind"], result["start_line"], result["end_line"]) == ("function", 1, 80)
+
+
+def test_chunks_and_payloads_record_the_same_symbols():
+    chunk = SimpleNamespace(
+        function_name="parse", class_name=None, chunk_type="function_partial", file_path="a.py",
+        start_line=1, end_line=5, language="python", content="def parse(): pass"
+    )
+    from_chunks = SymbolIndex("repo")
+    from_chunks.add_chunks([chunk])
+    from_payloads = SymbolIndex("repo")
+    from_payloads.add_payloads([payload("parse", "function_partial", "a.py", 1, 5)])
+    assert from_chunks.lookup("parse") == from_payloads.lookup("parse")
+
+
+def test_remove_files_drops_their_symbols(table):
+    table.remove_files(["src/app.py"])
+    assert [result["name"] for result in table.lookup("load", match="prefix")] == ["LoadUser"]
+
+
+def test_save_and_load_round_trip(table, tmp_path):
+    table.save(str(tmp_path))
+    loaded = SymbolIndex.load(str(tmp_path), "repo")
+    assert loaded.lookup("authenticate") == table.lookup("authenticate")
+    assert SymbolIndex.list_indexes(str(tmp_path)) == ["repo"]
+
+
+def test_tables_of_an_older_version_are_ignored(table, tmp_path):
+    path = table.save(str(tmp_path))
+    with open(path, encoding="utf-8") as f:
+        content = f.read().replace(f'"version":{SymbolIndex.VERSION}', '"version":1')
+    SymbolIndex._loaded.clear()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    assert SymbolIndex.load(str(tmp_path), "repo") is None
+
+
+def test_lookup_across_tables_orders_by_distance():
+    first, second = SymbolIndex("a"), SymbolIndex("b")
+    first.add_payloads([payload("fetch_data")])
+    second.add_payloads([payload("fetch_date")])
+    results = lookup_symbols([first, second], "fetch_data", match="fuzzy")
+    assert [(result["index_name"], result["distance"]) for result in results] == [("a", 0), ("b", 1)]
+
+
+def test_edit_distance_stops_past_the_maximum():
+    assert edit_distance("kitten", "sitting", 3) == 3
+    assert edit_distance("kitten", "sitting", 2) == 3
+    assert edit_distance("same", "same", 0) == 0
+
+
+def test_unknown_match_mode_is_rejected(table):
+    with pytest.raises(ValueError):
+        table.lookup("load_user", match="regex")